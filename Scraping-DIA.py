@@ -1,31 +1,61 @@
+import argparse
 import csv
+import hashlib
 import random
-import sys
-import time
+from datetime import datetime
+from pathlib import Path
+from urllib.parse import urlparse
 
 import pandas as pd
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.ui import WebDriverWait
 
+import browser_daemon
+import category_discovery
+import consent
+import crawl_metrics
+import lean_browser
+import price_history
+import product_index
+from crawl_pool import TAB_ARGS
+from site_profile import load_profile, save_profile
+from storage import FORMATS, write_raw
+
 # Path to your ChromeDriver
 CHROMEDRIVER_PATH = (
     r"c:\Users\gerar\Desktop\random\web-scraping\Supermercats\drivers\chromedriver.exe"
 )
 
-# Accept URL from command line
-URL = (
-    sys.argv[1]
-    if len(sys.argv) > 1
-    else "https://www.dia.es/arroz-pastas-y-legumbres/pastas/c/L2044"
-)
-
-
-def setup_driver():
+# Default category URL (override from the command line)
+URL = "https://www.dia.es/arroz-pastas-y-legumbres/pastas/c/L2044"
+
+# Perfil de selectores aprendido (por host) para no re-probar en cada ejecución
+SELECTOR_PROFILE = Path(__file__).with_name("dia_selector_profile.json")
+# Estrategia de banner y cookies de consentimiento (compartido con el scraper de Bonpreu)
+CONSENT_PROFILE = Path(__file__).with_name(consent.CONSENT_PROFILE)
+PROFILE_VERSION = 1
+
+# Selectores múltiples para encontrar productos (basados en debug)
+PRODUCT_SELECTORS = [
+    "div.search-product-card",
+    ".search-product-card",
+    "div[class*='search-product-card']",
+    "li[data-test-id='product-card-list-item']",
+    ".product-card-list-item",
+    "[data-testid='product-card']",
+    ".product-card",
+    ".product-item",
+]
+
+
+def setup_driver(lean=False, headless=False, user_data_dir=None):
+    """user_data_dir: perfil persistente (lo usa browser_daemon.py); None = perfil temporal."""
     options = Options()
+    if headless:
+        options.add_argument("--headless=new")
     options.add_argument("--disable-gpu")
     options.add_argument("--no-sandbox")
     options.add_argument("--window-size=1920,1080")
@@ -36,40 +66,83 @@ def setup_driver():
         "--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
     )
 
+    for a in TAB_ARGS:  # pestañas en segundo plano sin throttling (crawl_all.py --tabs)
+        options.add_argument(a)
+
+    if user_data_dir:
+        options.add_argument(f"--user-data-dir={user_data_dir}")
+
+    if lean:
+        lean_browser.apply_lean_options(options)
+
     service = Service(executable_path=CHROMEDRIVER_PATH)
     driver = webdriver.Chrome(service=service, options=options)
+    prepare_tab(driver, lean)
     return driver
 
 
-def scroll_until_all_loaded(driver, wait_time=1, max_tries=20):
+def prepare_tab(driver, lean=False):
+    """Ajustes por pestaña (el bloqueo por CDP no se hereda entre pestañas)."""
+    if lean:
+        lean_browser.enable_blocking(driver)
+
+
+# Prueba todos los selectores de card en una sola llamada; devuelve el primero
+# que encuentra cards, cuántas hay y una firma estructural de la primera card.
+PROBE_JS = r"""
+  for (const s of arguments[0]) {
+    let cards = [];
+    try { cards = document.querySelectorAll(s); } catch (e) { continue; }
+    if (!cards.length) continue;
+    const c = cards[0];
+    const parts = new Set([c.tagName, c.className]);
+    c.querySelectorAll('[data-test-id],[data-testid],[data-test]').forEach(e =>
+      parts.add(e.getAttribute('data-test-id') || e.getAttribute('data-testid') || e.getAttribute('data-test')));
+    return { selector: s, count: cards.length, signature: Array.from(parts).sort().join('|') };
+  }
+  return null;
+"""
+
+
+def probe_card_selector(driver, selectors=PRODUCT_SELECTORS):
+    """-> {selector, count, signature} o None si ningún selector encuentra cards."""
+    try:
+        return driver.execute_script(PROBE_JS, list(selectors))
+    except Exception:
+        return None
+
+
+@crawl_metrics.timed("wait_cards")
+def wait_for_cards(driver, cached=None, timeout=10):
+    """
+    Espera (hasta `timeout` en total, no por selector) a que aparezcan cards,
+    probando primero el selector cacheado y luego el resto en cada sondeo.
+    """
+    order = PRODUCT_SELECTORS
+    if cached:
+        order = [cached] + [s for s in PRODUCT_SELECTORS if s != cached]
+    try:
+        return WebDriverWait(driver, timeout, poll_frequency=0.25).until(
+            lambda d: probe_card_selector(d, order)
+        )
+    except Exception:
+        return None
+
+
+@crawl_metrics.timed("scroll")
+def scroll_until_all_loaded(driver, wait_time=1, max_tries=20, selector=None):
     last_count = 0
     tries = 0
-
-    # Definir selectores múltiples para encontrar productos (basados en debug)
-    product_selectors = [
-        "div.search-product-card",
-        ".search-product-card",
-        "div[class*='search-product-card']",
-        "li[data-test-id='product-card-list-item']",
-        ".product-card-list-item",
-        "[data-testid='product-card']",
-        ".product-card",
-        ".product-item",
-    ]
+    selectors = [selector] if selector else PRODUCT_SELECTORS
 
     while tries < max_tries:
         driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-        time.sleep(wait_time + random.uniform(0.2, 0.5))
-
-        # Intentar con todos los selectores
-        product_elements = []
-        for selector in product_selectors:
-            elements = driver.find_elements(By.CSS_SELECTOR, selector)
-            if elements:
-                product_elements = elements
-                break
+        crawl_metrics.inc("loops")
+        crawl_metrics.sleep(wait_time + random.uniform(0.2, 0.5))
 
-        current_count = len(product_elements)
+        # Cuenta con el selector aprendido (o prueba todos en una sola llamada)
+        probe = probe_card_selector(driver, selectors)
+        current_count = probe["count"] if probe else 0
         print(f"🔍 Cargados {current_count} productos hasta ahora...")
 
         if current_count == last_count:
@@ -80,78 +153,106 @@ def scroll_until_all_loaded(driver, wait_time=1, max_tries=20):
         tries += 1
 
 
-def extract_product_data(product, index, driver):
-    """Extracts product data. Returns dict and success flag."""
-    try:
-        driver.execute_script("arguments[0].scrollIntoView();", product)
-        time.sleep(0.2)
-
-        # Múltiples selectores para el nombre del producto
-        name_selectors = [
-            "p.search-product-card__product-name",
-            ".product-name",
-            ".product-title",
-            "h3",
-            "h2",
-            "[data-test*='product-name']",
-            "[data-testid*='product-name']",
-        ]
-
-        name = None
-        for selector in name_selectors:
-            try:
-                name_element = product.find_element(By.CSS_SELECTOR, selector)
-                name = name_element.text.strip()
-                if name:
-                    break
-            except Exception:
-                continue
-
-        # Múltiples selectores para el precio
-        price_selectors = [
-            "p[data-test-id='search-product-card-unit-price']",
-            ".price",
-            ".current-price",
-            "[data-test*='price']",
-            "[class*='price']",
-            ".price-current",
-        ]
-
-        price = None
-        for selector in price_selectors:
-            try:
-                price_element = product.find_element(By.CSS_SELECTOR, selector)
-                price = price_element.text.strip()
-                if price:
-                    break
-            except Exception:
-                continue
-
-        # Múltiples selectores para precio por kg
-        price_kg_selectors = [
-            "p[data-test-id='search-product-card-kilo-price']",
-            ".price-per-unit",
-            ".unit-price",
-            "[data-test*='kilo-price']",
-            "[data-test*='unit-price']",
-            "[class*='unit-price']",
-        ]
-
-        price_kg = None
-        for selector in price_kg_selectors:
-            try:
-                price_kg_element = product.find_element(By.CSS_SELECTOR, selector)
-                price_kg = price_kg_element.text.strip()
-                if price_kg:
-                    break
-            except Exception:
-                continue
-
-        print(f"[{index}] {name} | {price} | {price_kg}")
-        return {"name": name, "price": price, "price_per_kg": price_kg}, True
-    except Exception as e:
-        print(f"[{index}] ❌ Failed to extract: {e}")
-        return {"name": None, "price": None, "price_per_kg": None}, False
+# Selectores de campos (en orden de preferencia); se resuelven dentro de la página
+NAME_SELECTORS = [
+    "p.search-product-card__product-name",
+    ".product-name",
+    ".product-title",
+    "h3",
+    "h2",
+    "[data-test*='product-name']",
+    "[data-testid*='product-name']",
+]
+
+PRICE_SELECTORS = [
+    "p[data-test-id='search-product-card-unit-price']",
+    ".price",
+    ".current-price",
+    "[data-test*='price']",
+    "[class*='price']",
+    ".price-current",
+]
+
+PRICE_KG_SELECTORS = [
+    "p[data-test-id='search-product-card-kilo-price']",
+    ".price-per-unit",
+    ".unit-price",
+    "[data-test*='kilo-price']",
+    "[data-test*='unit-price']",
+    "[class*='unit-price']",
+]
+
+# Extrae todas las cards en una sola llamada: para cada campo prueba los
+# selectores en orden y se queda con el primero que tenga texto.
+EXTRACT_JS = r"""
+  const [cardSel, nameSels, priceSels, kgSels, only] = arguments;
+  const cards = Array.from(document.querySelectorAll(cardSel));
+  const hits = { name: {}, price: {}, price_per_kg: {} };
+  const first = (card, sels, field) => {
+    for (const s of sels) {
+      let el = null;
+      try { el = card.querySelector(s); } catch (e) { continue; }
+      const t = el && (el.innerText || el.textContent || '').trim();
+      if (t) { hits[field][s] = (hits[field][s] || 0) + 1; return t; }
+    }
+    return null;
+  };
+  const idx = only || cards.map((_, i) => i);
+  const rows = idx.filter(i => i < cards.length).map(i => {
+    const c = cards[i];
+    const a = c.matches('a[href]') ? c : c.querySelector('a[href]');
+    return {
+      index: i,
+      name: first(c, nameSels, 'name'),
+      price: first(c, priceSels, 'price'),
+      price_per_kg: first(c, kgSels, 'price_per_kg'),
+      href: a ? new URL(a.getAttribute('href'), location.href).href : null,
+    };
+  });
+  return { rows, hits };
+"""
+
+FIELD_SELECTORS = {
+    "name": NAME_SELECTORS,
+    "price": PRICE_SELECTORS,
+    "price_per_kg": PRICE_KG_SELECTORS,
+}
+
+
+@crawl_metrics.timed("parse")
+def extract_all_products(driver, card_selector, only=None, fields=None, hits=None):
+    """
+    Extrae name/price/price_per_kg/href de todas las cards en un único
+    execute_script (o solo de los índices `only`). Devuelve lista de dicts.
+    - fields: selectores por campo (por defecto las listas completas)
+    - hits: dict opcional donde se acumula qué selector acertó en cada campo
+    """
+    fields = fields or FIELD_SELECTORS
+    res = driver.execute_script(
+        EXTRACT_JS,
+        card_selector,
+        fields["name"],
+        fields["price"],
+        fields["price_per_kg"],
+        only,
+    ) or {}
+    if hits is not None:
+        for field, counts in (res.get("hits") or {}).items():
+            for sel, n in counts.items():
+                hits.setdefault(field, {})
+                hits[field][sel] = hits[field].get(sel, 0) + n
+    return res.get("rows") or []
+
+
+def learned_fields(hits):
+    """
+    Selectores que han acertado, del más al menos frecuente, por campo
+    (si un campo no acertó nunca, se mantiene la lista completa).
+    """
+    return {
+        field: sorted(hits.get(field, {}), key=lambda s: -hits[field][s]) or sels
+        for field, sels in FIELD_SELECTORS.items()
+    }
 
 
 def debug_page_structure(driver):
@@ -194,122 +295,228 @@ def debug_page_structure(driver):
             pass
 
 
-def scrape_data(driver):
-    print(f"🌐 Navegando a: {URL}")
-    driver.get(URL)
-    time.sleep(3)  # Esperar que cargue la página
+def scrape_data(driver, url=URL, consent_budget=3.0, navigate=True):
+    """navigate=False: la pestaña ya tiene la URL cargada (o cargándose)."""
+    # Cookies de consentimiento de una sesión anterior: se inyectan antes de navegar
+    restored = consent.restore(driver, url, CONSENT_PROFILE)
+    if navigate:
+        print(f"🌐 Navegando a: {url}")
+        with crawl_metrics.phase("navigate"):
+            driver.get(url)
 
-    # Intentar aceptar cookies si aparecen
-    try:
-        cookie_button = WebDriverWait(driver, 5).until(
-            EC.element_to_be_clickable(
-                (
-                    By.XPATH,
-                    "//button[contains(text(), 'Aceptar') or contains(text(), 'Accept')]",
-                )
-            )
-        )
-        cookie_button.click()
-        print("✅ Cookies aceptadas")
-        time.sleep(2)
-    except Exception:
-        print("ℹ️ No se encontró banner de cookies")
-
-    # Ejecutar función de debug
-    debug_page_structure(driver)
-
-    # Buscar elementos de productos con múltiples selectores basados en el debug
-    product_selectors = [
-        "div.search-product-card",
-        ".search-product-card",
-        "div[class*='search-product-card']",
-        "li[data-test-id='product-card-list-item']",
-        ".product-card-list-item",
-        "[data-testid='product-card']",
-        ".product-card",
-        ".product-item",
-    ]
-
-    products = []
-    for selector in product_selectors:
-        try:
-            wait = WebDriverWait(driver, 10)
-            wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, selector)))
-            products = driver.find_elements(By.CSS_SELECTOR, selector)
-            if products:
-                print(f"✅ Encontrados productos con selector: {selector}")
-                break
-        except Exception as e:
-            print(f"❌ Selector {selector} falló: {e}")
-            continue
-
-    if not products:
+    # Banner de cookies: una consulta por sondeo, como mucho `consent_budget` s
+    consent.accept(driver, url, CONSENT_PROFILE, budget=consent_budget, restored=restored)
+
+    # Selectores aprendidos en ejecuciones anteriores (si la maqueta no ha cambiado)
+    host = urlparse(url).netloc
+    profile = load_profile(SELECTOR_PROFILE, host)
+    if profile.get("version") != PROFILE_VERSION:
+        profile = {}
+
+    probe = wait_for_cards(driver, cached=profile.get("card_selector"))
+    if not probe:
         print("❌ No se encontraron productos con ningún selector")
+        # Ejecutar función de debug
+        debug_page_structure(driver)
         return []
 
-    scroll_until_all_loaded(driver)
-
-    # Buscar productos usando el mismo método de múltiples selectores
-    final_products = []
-    for selector in product_selectors:
-        elements = driver.find_elements(By.CSS_SELECTOR, selector)
-        if elements:
-            final_products = elements
-            print(f"✅ Usando selector final: {selector}")
-            break
+    fingerprint = hashlib.sha1(probe["signature"].encode("utf-8")).hexdigest()[:12]
+    if profile and profile.get("fingerprint") != fingerprint:
+        print("♻️ La maqueta de la página ha cambiado: se vuelven a probar todos los selectores")
+        profile = {}
+    card_selector = probe["selector"]
+    cached_fields = profile.get("fields") if profile.get("card_selector") == card_selector else None
+    print(
+        f"✅ Encontrados productos con selector: {card_selector}"
+        + (" (perfil cacheado)" if cached_fields else "")
+    )
 
-    print(f"\n🔢 Total productos encontrados: {len(final_products)}\n")
+    scroll_until_all_loaded(driver, selector=card_selector)
 
-    results = []
-    failed_indexes = []
+    # Extracción en bloque: una sola llamada para todas las cards
+    hits = {}
+    extracted = extract_all_products(driver, card_selector, fields=cached_fields, hits=hits)
+    print(f"\n🔢 Total productos encontrados: {len(extracted)}\n")
 
-    for index, product in enumerate(final_products, start=1):
-        data, success = extract_product_data(product, index, driver)
-        results.append(data)
-        if not success:
-            failed_indexes.append(index - 1)  # store index for retry (0-based)
+    # Si los selectores cacheados ya no cubren alguna card, sondeo completo solo para esas
+    if cached_fields:
+        misses = [r["index"] for r in extracted if not (r["name"] and r["price"])]
+        if misses:
+            print(f"🔎 {len(misses)} cards sin cubrir con el perfil: sondeo completo de selectores")
+            full = {r["index"]: r for r in extract_all_products(driver, card_selector, misses, hits=hits)}
+            extracted = [full.get(r["index"], r) for r in extracted]
 
-    # Retry failed ones
+    # Reintento solo de las cards sin nombre (p.ej. aún sin renderizar):
+    # las traemos al viewport y las re-extraemos en otra única llamada
+    failed_indexes = [r["index"] for r in extracted if not r["name"]]
     if failed_indexes:
         print(f"\n🔁 Reintentando {len(failed_indexes)} elementos fallidos...\n")
-        time.sleep(1.5)
-
-        # Buscar productos nuevamente para el retry
-        retry_products = []
-        for selector in product_selectors:
-            elements = driver.find_elements(By.CSS_SELECTOR, selector)
-            if elements:
-                retry_products = elements
-                break
-
-        for retry_index in failed_indexes:
-            if retry_index < len(retry_products):
-                product = retry_products[retry_index]
-                data, success = extract_product_data(product, retry_index + 1, driver)
-                results[retry_index] = data  # Overwrite
+        driver.execute_script(
+            """
+            const cards = document.querySelectorAll(arguments[0]);
+            for (const i of arguments[1]) { if (cards[i]) cards[i].scrollIntoView(); }
+            """,
+            card_selector,
+            failed_indexes,
+        )
+        crawl_metrics.inc("retried_cards", len(failed_indexes))
+        crawl_metrics.sleep(1.5)
+        retried = {
+            r["index"]: r
+            for r in extract_all_products(driver, card_selector, failed_indexes, hits=hits)
+        }
+        extracted = [retried.get(r["index"], r) for r in extracted]
+
+    if extracted:
+        save_profile(
+            SELECTOR_PROFILE,
+            host,
+            {
+                "version": PROFILE_VERSION,
+                "fingerprint": fingerprint,
+                "card_selector": card_selector,
+                "fields": learned_fields(hits),
+                "updated": datetime.now().isoformat(timespec="seconds"),
+            },
+        )
+
+    results = []
+    for r in extracted:
+        print(f"[{r['index'] + 1}] {r['name']} | {r['price']} | {r['price_per_kg']}")
+        results.append(
+            {
+                "name": r["name"],
+                "price": r["price"],
+                "price_per_kg": r["price_per_kg"],
+                "href": r["href"],
+            }
+        )
 
     # Summary
     success_count = sum(1 for r in results if r["name"])
     fail_count = len(results) - success_count
+    crawl_metrics.inc("rows", success_count)
+    crawl_metrics.inc("rows_without_name", fail_count)
     print(f"\n✅ Scraping completed. {success_count} succeeded, {fail_count} failed.\n")
 
     return results
 
 
+def category_from_url(url):
+    """'/arroz-pastas-y-legumbres/pastas/c/L2044' -> 'pastas'."""
+    parts = [p for p in urlparse(url).path.split("/") if p]
+    if "c" in parts and parts.index("c") > 0:
+        return parts[parts.index("c") - 1]
+    return parts[-1] if parts else "dia"
+
+
 def save_to_csv(data, filename="products.csv"):
     df = pd.DataFrame(data)
     df.to_csv(filename, index=False, encoding="utf-8-sig")
     print(f"💾 Data saved to {filename}")
 
 
+def save_data(data, url, fmt="csv", out=None, out_dir=None):
+    """
+    CSV (como siempre) o Parquet particionado store=dia/category=/date= bajo `out`.
+    Con out_dir (varias categorías) cada CSV se llama dia_<categoría>_<timestamp>_<hash>.csv
+    (hash corto de la URL: dos categorías con la misma etiqueta no se pisan).
+    -> ruta escrita
+    """
+    if fmt == "csv":
+        if not out and out_dir:
+            ts = datetime.now().strftime("%Y%m%d-%H%M%S")
+            Path(out_dir).mkdir(parents=True, exist_ok=True)
+            out = Path(out_dir) / f"dia_{category_from_url(url)}_{ts}_{category_discovery.url_hash(url)}.csv"
+        out = out or "products.csv"
+        save_to_csv(data, out)
+        return out
+    path = write_raw(data, "parquet", out or out_dir or ".", store="dia", category=category_from_url(url))
+    print(f"💾 Data saved to {path}")
+    return path
+
+
+def build_parser():
+    p = argparse.ArgumentParser(description="Scraper de una categoría de DIA.")
+    p.add_argument("url", nargs="?", default=URL, help="URL de la categoría.")
+    p.add_argument(
+        "-o",
+        "--out",
+        help="CSV de salida (por defecto products.csv) o raíz del dataset Parquet (por defecto: actual).",
+    )
+    p.add_argument("--out-dir", help="Carpeta de salida: un CSV por categoría con timestamp (lo usa crawl_all.py).")
+    p.add_argument("--format", choices=FORMATS, default="csv", help="Formato de salida: 'csv' o 'parquet'.")
+    p.add_argument("--history", metavar="DB", help="Registra los precios en el histórico SQLite (solo cambios).")
+    p.add_argument("--product-index", metavar="DB", help="Índice SQLite de productos: ids estables (product_index.py).")
+    p.add_argument(
+        "--lean", action="store_true", help="Chrome ligero: bloquea imágenes, fuentes, vídeo y trackers."
+    )
+    p.add_argument("--headless", action="store_true", help="Ejecutar Chrome en modo headless.")
+    p.add_argument(
+        "--attach",
+        nargs="?",
+        const=str(browser_daemon.DEFAULT_STATE),
+        metavar="STATE",
+        help="Usa un Chrome ya caliente de browser_daemon.py en lugar de lanzar uno (STATE: su fichero de estado).",
+    )
+    p.add_argument(
+        "--consent-budget", type=float, default=3.0, help="Segundos máximos esperando el banner de cookies."
+    )
+    p.add_argument(
+        "--report", metavar="PATH.json", help="Informe JSON de la ejecución (tiempo por fase, llamadas WebDriver)."
+    )
+    p.add_argument("--prom", metavar="PATH", help="Las mismas métricas en formato de texto Prometheus.")
+    return p
+
+
+# ---------- UNA CATEGORÍA (también lo usa crawl_all.py) ----------
+def scrape_one(driver, url, session, args):
+    """Scrapea y guarda una categoría con un driver ya abierto. -> {rows, out}"""
+    navigate = session.pop("preloaded", None) != url
+    data = scrape_data(driver, url, consent_budget=args.consent_budget, navigate=navigate)
+    if args.product_index:
+        # ids estables; fuera lo que ya guardó otra categoría de este crawl
+        with crawl_metrics.phase("product_index"):
+            kept = product_index.crawl_index(args.product_index, "dia").claim(data)
+        if len(kept) < len(data):
+            crawl_metrics.inc("known_skipped", len(data) - len(kept))
+            print(f"🔁 {len(data) - len(kept)} productos ya guardados en otra categoría de este crawl")
+        data = kept
+    if args.lean:
+        print(f"📶 Red: {lean_browser.format_report(lean_browser.transfer_report(driver))}")
+    with crawl_metrics.phase("write"):
+        out = save_data(data, url, fmt=args.format, out=args.out, out_dir=args.out_dir)
+    if args.history:
+        n = price_history.record_scrape(args.history, "dia", data, source=out)
+        print(f"📈 Histórico: {n} cambios de precio en {args.history}")
+    return {"rows": len(data), "out": str(out)}
+
+
+def make_driver(args):
+    with crawl_metrics.phase("driver_start"):
+        if args.attach:
+            driver = browser_daemon.attach("dia", args.attach, net_log=args.lean)
+            prepare_tab(driver, args.lean)
+        else:
+            driver = setup_driver(lean=args.lean, headless=args.headless)
+    return crawl_metrics.instrument_driver(driver)
+
+
 def main():
-    driver = setup_driver()
+    args = build_parser().parse_args()
+    run = crawl_metrics.start_run("dia")
+    driver = make_driver(args)
+    res = {"rows": 0}
     try:
         print("🚀 Starting scraping...")
-        data = scrape_data(driver)
-        save_to_csv(data)
+        res = scrape_one(driver, args.url, {}, args)
     finally:
         driver.quit()
+        run.add_category(url=args.url, status="ok" if res["rows"] else "failed", rows=res["rows"])
+        if args.report:
+            run.save_json(args.report)
+        if args.prom:
+            run.save_prometheus(args.prom)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,128 @@
+# basket.py
+# Cesta de la compra más barata: una lista entera (términos + cantidades) contra
+# el ProductIndex en una sola pasada vectorizada.
+#
+#   items = read_shopping_list("lista.txt")    # "2 leche entera", "0,5kg arroz basmati"...
+#   res = optimize_basket(index, items)
+#   res["stores"]   # total por tienda (solo esa tienda)
+#   res["split"]    # producto más barato de cada línea entre tiendas
+#
+# Coste de una línea: price * unidades, o price_per_kg * kg si la línea pide un peso.
+
+import re
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+LINE_RE = re.compile(r"^\s*(?:(?P<qty>\d+(?:[.,]\d+)?)\s*(?P<unit>kg|g)?\s*x?\s+)?(?P<term>.+?)\s*$", re.I)
+
+
+def parse_item(line):
+    """'2 leche' -> 2 unidades; '500g arroz' / '0,5 kg arroz' -> 0.5 kg; 'pan' -> 1 unidad."""
+    m = LINE_RE.match(line)
+    qty = float(m["qty"].replace(",", ".")) if m["qty"] else 1.0
+    unit = (m["unit"] or "").lower()
+    if unit == "g":
+        return {"term": m["term"], "qty": 1.0, "kg": qty / 1000}
+    if unit == "kg":
+        return {"term": m["term"], "qty": 1.0, "kg": qty}
+    return {"term": m["term"], "qty": qty, "kg": None}
+
+
+def read_shopping_list(path):
+    """Una línea por producto; se ignoran vacías y comentarios (#)."""
+    lines = Path(path).read_text(encoding="utf-8").splitlines()
+    return [parse_item(s) for s in lines if s.strip() and not s.lstrip().startswith("#")]
+
+
+def _as_items(items):
+    out = []
+    for it in items:
+        if isinstance(it, str):
+            it = parse_item(it)
+        elif isinstance(it, (tuple, list)):
+            it = {"term": it[0], "qty": it[1] if len(it) > 1 else 1.0, "kg": it[2] if len(it) > 2 else None}
+        out.append({"term": it["term"], "qty": float(it.get("qty") or 1.0), "kg": it.get("kg")})
+    return out
+
+
+def candidates(index, items, all_words=False):
+    """
+    Todas las filas candidatas de todas las líneas en arrays planos:
+    item, fila, tienda y coste de la línea con ese producto (NaN si no se puede calcular).
+    """
+    rows, item_ids = [], []
+    for i, it in enumerate(items):
+        r = index.search(it["term"], all_words=all_words)
+        rows.append(r)
+        item_ids.append(np.full(len(r), i, dtype=np.int32))
+    rows = np.concatenate(rows) if rows else np.empty(0, dtype=np.intp)
+    item = np.concatenate(item_ids) if item_ids else np.empty(0, dtype=np.int32)
+
+    qty = np.array([it["qty"] for it in items], dtype=float)
+    kg = np.array([np.nan if it["kg"] is None else it["kg"] for it in items], dtype=float)
+    by_weight = ~np.isnan(kg[item])
+    cost = np.where(by_weight, index.ppk[rows] * kg[item], index.price[rows] * qty[item])
+    ok = ~np.isnan(cost)
+    return item[ok], rows[ok], index.store_codes[rows[ok]], cost[ok]
+
+
+def optimize_basket(index, items, all_words=False):
+    """
+    -> dict con:
+      lines:  mejor producto de cada línea en cada tienda (item, term, store, name, cost)
+      stores: total por tienda, líneas encontradas y las que faltan
+      split:  la opción más barata de cada línea sin importar la tienda
+      split_total: total de la cesta repartida
+    """
+    items = _as_items(items)
+    item, rows, store, cost = candidates(index, items, all_words=all_words)
+    n_items, n_stores = len(items), len(index.stores)
+
+    # mínimo por (línea, tienda): orden por (item, store, coste) y primera fila de cada grupo
+    order = np.lexsort((cost, store, item))
+    item, rows, store, cost = item[order], rows[order], store[order], cost[order]
+    first = np.ones(len(item), dtype=bool)
+    first[1:] = (item[1:] != item[:-1]) | (store[1:] != store[:-1])
+    item, rows, store, cost = item[first], rows[first], store[first], cost[first]
+
+    terms = np.array([it["term"] for it in items], dtype=object)
+    lines = pd.DataFrame(
+        {
+            "item": item,
+            "term": terms[item],
+            "store": np.asarray(index.stores, dtype=object)[store],
+            "name": index.display_names[rows],
+            "price (€)": index.price[rows],
+            "price_per_kg": index.ppk[rows],
+            "cost": cost,
+        }
+    )
+
+    # totales por tienda (matriz línea x tienda)
+    grid = np.full((n_items, n_stores), np.nan)
+    grid[item, store] = cost
+    found = ~np.isnan(grid)
+    stores = pd.DataFrame(
+        {
+            "store": list(index.stores),
+            "total": np.round(np.nansum(grid, axis=0), 2),
+            "found": found.sum(axis=0),
+            "missing": [list(terms[~found[:, s]]) for s in range(n_stores)],
+        }
+    )
+    stores["complete"] = stores["found"] == n_items
+    stores = stores.sort_values(["complete", "total"], ascending=[False, True]).reset_index(drop=True)
+
+    # cesta repartida: la tienda más barata de cada línea
+    cheapest = np.lexsort((lines["cost"].to_numpy(), lines["item"].to_numpy()))
+    split = lines.iloc[cheapest].drop_duplicates("item", keep="first").reset_index(drop=True)
+
+    return {
+        "lines": lines,
+        "stores": stores,
+        "split": split,
+        "split_total": round(float(split["cost"].sum()), 2),
+        "split_missing": [it["term"] for i, it in enumerate(items) if not found[i].any()],
+    }
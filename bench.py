@@ -0,0 +1,214 @@
+# bench.py
+# Benchmark offline de los scrapers sobre las páginas locales de bench_pages.py:
+# mide tiempo, round-trips WebDriver y recall (productos recogidos / productos
+# de la página) sin tocar las webs reales. Sirve para detectar regresiones y
+# comparar modos de captura o políticas de scroll.
+#
+#   python bench.py                                  # todos los casos
+#   python bench.py --cases bonpreu-poll bonpreu-observer --latency 600 --products 800
+#   python bench.py --out bench_results.json
+#   python bench.py --baseline bench_results.json    # sale con 1 si hay regresión
+#
+# Casos:
+#   bonpreu-poll / bonpreu-observer  robust_scroll_and_collect (lista virtualizada)
+#   dia                              scroll_until_all_loaded + extract_all_products
+#   parse                            limpieza de merge.py (€ y €/kg) sobre filas crudas
+
+import argparse
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+
+import consent
+import crawl_metrics
+from bench_pages import bonpreu_cards, dia_cards, load_catalogs, serve, synthetic_catalog
+from crawl_all import load_dia_module
+
+CASES = ("bonpreu-poll", "bonpreu-observer", "dia", "parse")
+
+
+def bench_driver(headless=True, lean=False):
+    """Chrome local (Selenium Manager resuelve el driver); sin red no hace falta stealth."""
+    from selenium import webdriver
+
+    opts = webdriver.ChromeOptions()
+    if headless:
+        opts.add_argument("--headless=new")
+    opts.add_argument("--window-size=1920,1080")
+    opts.add_argument("--no-sandbox")
+    opts.add_argument("--disable-gpu")
+    if lean:
+        import lean_browser
+
+        lean_browser.apply_lean_options(opts)
+    return webdriver.Chrome(options=opts)
+
+
+def recall(got, truth):
+    truth = set(truth)
+    return round(len(truth & set(got)) / len(truth), 4) if truth else 1.0
+
+
+# ---------- CASOS ----------
+def run_bonpreu(d, base, catalog, args, capture):
+    import scraping_bonpreu2 as bp
+    from scroll_policy import make_policy
+
+    url = f"{base}/bonpreu?n={len(catalog)}&seed={args.seed}&batch={args.batch}&latency={args.latency}"
+    d.get(url)
+    consent.accept(d, url, path=None, budget=2)
+    policy = make_policy(args.policy, step_px=args.step, idle_wait=(0.35, 0.55), no_growth_rounds=3, bottom_passes=3)
+    rows = bp.robust_scroll_and_collect(d, max_total_loops=args.max_loops, capture=capture, policy=policy)
+    return [r.get("href") for r in rows], [base + c["href"] for c in bonpreu_cards(catalog)]
+
+
+def run_dia(d, base, catalog, args):
+    dia = load_dia_module()
+    url = f"{base}/dia?n={len(catalog)}&seed={args.seed}&page={args.page}&latency={args.latency}"
+    d.get(url)
+    probe = dia.wait_for_cards(d)
+    if not probe:
+        return [], [base + c["href"] for c in dia_cards(catalog)]
+    dia.scroll_until_all_loaded(d, selector=probe["selector"])
+    rows = dia.extract_all_products(d, probe["selector"])
+    return [r.get("href") for r in rows], [base + c["href"] for c in dia_cards(catalog)]
+
+
+def run_parse(n, seed):
+    """Limpieza de merge.py sobre n filas crudas sintéticas. recall = €/kg correcto."""
+    from merge import CLEANERS
+
+    catalog = synthetic_catalog(n, seed)
+    truth = pd.Series([p["price_per_kg"] for p in catalog], dtype=float)
+    raw_bp = pd.DataFrame(bonpreu_cards(catalog)).rename(columns={"ppu": "price_per_unit"})
+    raw_dia = pd.DataFrame(dia_cards(catalog)).rename(columns={"ppk": "price_per_kg"})
+    raw_dia["size"] = raw_bp["size"]
+    hits, total = 0, 0
+    for store, raw in (("bonpreu", raw_bp), ("dia", raw_dia)):
+        clean, finalize = CLEANERS[store]
+        with crawl_metrics.phase(f"clean_{store}"):
+            df = clean(raw.copy())
+        with crawl_metrics.phase(f"finalize_{store}"):
+            finalize(df)
+        ok = (df["price_per_kg"] - truth.loc[df.index]).abs() <= 0.011
+        hits += int(ok.sum())
+        total += int(truth.notna().sum())
+    return hits / total if total else 1.0
+
+
+def run_case(case, args, base, catalogs, driver_box):
+    """Una repetición de `case` -> {seconds, webdriver_calls, rows, recall, phases}"""
+    run = crawl_metrics.start_run("bench", case=case)
+    t0 = time.perf_counter()
+    if case == "parse":
+        rec, n_rows = run_parse(args.parse_rows, args.seed), args.parse_rows
+    else:
+        if driver_box.get("d") is None:
+            driver_box["d"] = bench_driver(headless=not args.headed, lean=args.lean)
+        d = crawl_metrics.instrument_driver(driver_box["d"])
+        t0 = time.perf_counter()  # el arranque de Chrome no cuenta
+        store = case.split("-")[0]
+        catalog = catalogs.get(store) or synthetic_catalog(args.products, args.seed)
+        if store == "bonpreu":
+            got, truth = run_bonpreu(d, base, catalog, args, case.split("-")[1])
+        else:
+            got, truth = run_dia(d, base, catalog, args)
+        rec, n_rows = recall(got, truth), len(got)
+    seconds = time.perf_counter() - t0
+    rep = run.report()
+    return {
+        "seconds": round(seconds, 3),
+        "webdriver_calls": sum(rep["webdriver_calls"].values()),
+        "rows": n_rows,
+        "recall": round(rec, 4),
+        "phases": {k: v["seconds"] for k, v in rep["phases"].items()},
+    }
+
+
+def summarize(reps):
+    """Mediana de tiempo; round-trips y recall del peor intento (lo que vigilamos)."""
+    return {
+        "seconds": round(statistics.median(r["seconds"] for r in reps), 3),
+        "webdriver_calls": max(r["webdriver_calls"] for r in reps),
+        "rows": min(r["rows"] for r in reps),
+        "recall": min(r["recall"] for r in reps),
+        "phases": reps[len(reps) // 2]["phases"],
+        "repeat": len(reps),
+    }
+
+
+def compare(results, baseline, tolerance):
+    """-> lista de regresiones (texto) respecto a un JSON anterior de bench.py"""
+    out = []
+    for case, base in baseline.get("cases", {}).items():
+        cur = results["cases"].get(case)
+        if not cur:
+            continue
+        if cur["seconds"] > base["seconds"] * (1 + tolerance):
+            out.append(f"{case}: {base['seconds']}s -> {cur['seconds']}s")
+        if cur["webdriver_calls"] > base["webdriver_calls"] * (1 + tolerance):
+            out.append(f"{case}: {base['webdriver_calls']} -> {cur['webdriver_calls']} llamadas WebDriver")
+        if cur["recall"] < base["recall"] - 0.005:
+            out.append(f"{case}: recall {base['recall']} -> {cur['recall']}")
+    return out
+
+
+def build_parser():
+    p = argparse.ArgumentParser(description="Benchmark offline de los scrapers (sin red).")
+    p.add_argument("--cases", nargs="+", choices=CASES, default=list(CASES))
+    p.add_argument("--products", type=int, default=400, help="Productos por página (por defecto: 400).")
+    p.add_argument("--batch", type=int, default=40, help="Bonpreu: productos por lote cargado.")
+    p.add_argument("--page", type=int, default=24, help="DIA: productos por página del scroll infinito.")
+    p.add_argument("--latency", type=float, default=300, help="Latencia de cada carga en ms (por defecto: 300).")
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--policy", choices=("fixed", "adaptive"), default="fixed")
+    p.add_argument("--step", type=int, default=100)
+    p.add_argument("--max-loops", type=int, default=400)
+    p.add_argument("--parse-rows", type=int, default=20000, help="Filas crudas para el caso parse.")
+    p.add_argument("--repeat", type=int, default=3)
+    p.add_argument("--catalog", action="append", metavar="STORE=CSV", help="Usa un CSV crudo grabado como página.")
+    p.add_argument("--lean", action="store_true", help="Chrome con el perfil lean de lean_browser.")
+    p.add_argument("--headed", action="store_true", help="Muestra el navegador.")
+    p.add_argument("--out", help="Guarda los resultados en JSON.")
+    p.add_argument("--baseline", help="JSON anterior con el que comparar.")
+    p.add_argument("--tolerance", type=float, default=0.25, help="Margen de regresión relativo (por defecto: 0.25).")
+    return p
+
+
+def main():
+    args = build_parser().parse_args()
+    catalogs = load_catalogs(args.catalog)
+    server, base = serve(0, catalogs)
+    driver_box = {"d": None}
+    results = {"params": {k: v for k, v in vars(args).items() if k not in ("out", "baseline")}, "cases": {}}
+    try:
+        for case in args.cases:
+            reps = [run_case(case, args, base, catalogs, driver_box) for _ in range(args.repeat)]
+            res = results["cases"][case] = summarize(reps)
+            print(
+                f"⏱️  {case:<17} {res['seconds']:>8.2f}s | WebDriver={res['webdriver_calls']:>5} | "
+                f"filas={res['rows']:>6} | recall={res['recall']:.3f}"
+            )
+    finally:
+        if driver_box["d"] is not None:
+            driver_box["d"].quit()
+        server.shutdown()
+
+    if args.out:
+        Path(args.out).write_text(json.dumps(results, ensure_ascii=False, indent=1), encoding="utf-8")
+        print(f"💾 Resultados guardados en {args.out}")
+    if args.baseline:
+        regressions = compare(results, json.loads(Path(args.baseline).read_text(encoding="utf-8")), args.tolerance)
+        for r in regressions:
+            print(f"❌ Regresión: {r}")
+        if regressions:
+            sys.exit(1)
+        print("✅ Sin regresiones respecto a", args.baseline)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,296 @@
+# bench_pages.py
+# Páginas de listado de Bonpreu y DIA para benchmarks offline (bench.py): un
+# servidor local sirve la misma maqueta que leen los scrapers, con carga por
+# lotes, latencia configurable y, en Bonpreu, lista virtualizada.
+#
+#   python bench_pages.py --port 8765
+#   -> http://127.0.0.1:8765/bonpreu?n=400&batch=40&latency=300
+#   -> http://127.0.0.1:8765/dia?n=200&page=24&latency=400
+#
+# Los productos son sintéticos (deterministas por semilla) o se reproducen desde
+# un CSV crudo grabado con los scrapers (--catalog bonpreu=Data/Bonpreu/x.csv).
+
+import argparse
+import json
+import random
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# ---------- CATÁLOGO ----------
+BRANDS = ["Bonpreu", "Gallo", "Brillante", "Barilla", "Hacendado", "Dia", "Nomen", "La Fallera", "Buitoni", "Garofalo"]
+PRODUCTS = ["arròs", "espaguetis", "macarrons", "fideus", "llenties", "cigrons", "mongetes", "quinoa", "cuscús", "tallarines"]
+VARIANTS = ["integral", "rodó", "llarg", "bomba", "ecològic", "extra", "basmati", "vidre", "fresc", "clàssic"]
+SIZES = [("500 g", 0.5), ("1 kg", 1.0), ("250 g", 0.25), ("2 x 125 g", 0.25), ("750 g", 0.75), ("6 ud", None)]
+
+
+def _slug(s):
+    return "".join(c if c.isalnum() else "-" for c in s.lower()).strip("-")
+
+
+def _eur(x):
+    return f"{x:.2f}".replace(".", ",")
+
+
+def synthetic_catalog(n, seed=0):
+    """
+    n productos con la verdad de referencia: name, size, price, price_per_kg
+    (None si el tamaño no es peso) y path (href relativo).
+    """
+    rnd = random.Random(seed)
+    out = []
+    for i in range(n):
+        size, kg = SIZES[rnd.randrange(len(SIZES))]
+        price = round(rnd.uniform(0.6, 6.5), 2)
+        name = f"{rnd.choice(PRODUCTS).capitalize()} {rnd.choice(VARIANTS)} {rnd.choice(BRANDS)} {size}"
+        out.append(
+            {
+                "name": name,
+                "size": size,
+                "price": price,
+                "price_per_kg": round(price / kg, 2) if kg else None,
+                "path": f"/products/{_slug(name)}/{100000 + i}",
+            }
+        )
+    return out
+
+
+def recorded_catalog(path):
+    """Catálogo a partir de un CSV crudo de los scrapers (mismos textos que la web)."""
+    from merge import read_raw
+
+    df = read_raw(path)
+    out = []
+    for i, r in enumerate(df.to_dict("records")):
+        href = r.get("href") or ""
+        out.append(
+            {
+                "name": r.get("name") or "",
+                "size": r.get("size") or "",
+                "price": r.get("price") or "",
+                "price_per_kg": r.get("price_per_unit") or r.get("price_per_kg") or "",
+                "path": urlparse(href).path or f"/products/p/{100000 + i}",
+                "raw": True,
+            }
+        )
+    return out
+
+
+def bonpreu_cards(catalog):
+    """Textos tal cual los pinta la web de Bonpreu (con espacios no separables)."""
+    return [
+        {
+            "name": p["name"],
+            "price": p["price"] if p.get("raw") else f"{_eur(p['price'])}\u00a0€",
+            "ppu": p["price_per_kg"] if p.get("raw") else (
+                f"({_eur(p['price_per_kg'])}\u00a0€ per quilo)" if p["price_per_kg"] else "(1 u)"
+            ),
+            "size": p["size"],
+            "href": p["path"],
+        }
+        for p in catalog
+    ]
+
+
+def dia_cards(catalog):
+    return [
+        {
+            "name": p["name"],
+            "price": p["price"] if p.get("raw") else f"{_eur(p['price'])} €",
+            "ppk": p["price_per_kg"] if p.get("raw") else (
+                f"({_eur(p['price_per_kg'])} €/KG)" if p["price_per_kg"] else ""
+            ),
+            "href": p["path"].replace("/products/", "/p/"),
+        }
+        for p in catalog
+    ]
+
+
+def _data_tag(cards):
+    return '<script type="application/json" id="data">' + json.dumps(cards).replace("</", "<\\/") + "</script>"
+
+
+# ---------- PÁGINAS ----------
+# Lista virtualizada: solo hay en el DOM las filas cercanas al viewport del
+# contenedor; al acercarse al final aparecen skeletons y, tras `latency` ms, un
+# lote nuevo de `batch` productos.
+BONPREU_JS = r"""
+const D = JSON.parse(document.getElementById('data').textContent);
+const CFG = JSON.parse(document.getElementById('cfg').textContent);
+const COLS = 4, ROW = 320, BUF = CFG.buffer;
+const grid = document.querySelector('[data-retailer-anchor="product-list"]');
+const inner = grid.querySelector('.inner');
+const esc = s => String(s == null ? '' : s).replace(/&/g, '&amp;').replace(/</g, '&lt;').replace(/"/g, '&quot;');
+let loaded = Math.min(CFG.batch, D.length), loading = false, nLoads = 0;
+const card = i => {
+  const p = D[i], top = Math.floor(i / COLS) * ROW, left = (i % COLS) * 25;
+  return `<div data-retailer-anchor="fop" data-test="fop-wrapper:${i}" style="position:absolute;top:${top}px;left:${left}%;width:25%;height:${ROW - 20}px">
+    <a data-test="fop-product-link" aria-hidden="false" href="${esc(p.href)}"><h3 data-test="fop-title">${esc(p.name)}</h3></a>
+    <span data-test="fop-price">${esc(p.price)}</span>
+    <span data-test="fop-price-per-unit">${esc(p.ppu)}</span>
+    <span data-test="fop-size">${esc(p.size)}</span></div>`;
+};
+const skeleton = (row, col) =>
+  `<div data-test="fop-skeleton" style="position:absolute;top:${row * ROW}px;left:${col * 25}%;width:25%;height:${ROW - 20}px"></div>`;
+function render() {
+  const rows = Math.ceil(loaded / COLS);
+  inner.style.height = ((rows + (loading ? 1 : 0)) * ROW) + 'px';
+  const top = grid.scrollTop, bottom = top + grid.clientHeight;
+  const r0 = CFG.virtual ? Math.max(0, Math.floor((top - BUF) / ROW)) : 0;
+  const r1 = CFG.virtual ? Math.min(rows, Math.ceil((bottom + BUF) / ROW)) : rows;
+  let out = '';
+  for (let i = r0 * COLS; i < Math.min(loaded, r1 * COLS); i++) out += card(i);
+  if (loading) for (let c = 0; c < COLS; c++) out += skeleton(rows, c);
+  inner.innerHTML = out;
+  if (!loading && loaded < D.length && bottom + ROW >= rows * ROW) {
+    loading = true;
+    const lat = CFG.latency * (0.75 + 0.5 * ((nLoads++ * 37) % 100) / 100);
+    setTimeout(() => { loaded = Math.min(loaded + CFG.batch, D.length); loading = false; render(); }, lat);
+    render();
+  }
+}
+grid.addEventListener('scroll', render);
+render();
+"""
+
+# Scroll infinito sobre la ventana: páginas de `page` cards añadidas al final.
+DIA_JS = r"""
+const D = JSON.parse(document.getElementById('data').textContent);
+const CFG = JSON.parse(document.getElementById('cfg').textContent);
+const list = document.getElementById('list');
+const esc = s => String(s == null ? '' : s).replace(/&/g, '&amp;').replace(/</g, '&lt;').replace(/"/g, '&quot;');
+let loaded = 0, loading = false, nLoads = 0;
+function append() {
+  const end = Math.min(loaded + CFG.page, D.length);
+  let out = '';
+  for (let i = loaded; i < end; i++) {
+    const p = D[i];
+    out += `<li data-test-id="product-card-list-item"><div class="search-product-card" style="height:380px">
+      <a href="${esc(p.href)}"><p class="search-product-card__product-name">${esc(p.name)}</p></a>
+      <p data-test-id="search-product-card-unit-price">${esc(p.price)}</p>
+      <p data-test-id="search-product-card-kilo-price">${esc(p.ppk)}</p></div></li>`;
+  }
+  list.insertAdjacentHTML('beforeend', out);
+  loaded = end;
+}
+window.addEventListener('scroll', () => {
+  if (loading || loaded >= D.length) return;
+  if (window.innerHeight + window.scrollY < document.body.scrollHeight - 600) return;
+  loading = true;
+  const lat = CFG.latency * (0.75 + 0.5 * ((nLoads++ * 37) % 100) / 100);
+  setTimeout(() => { append(); loading = false; }, lat);
+});
+append();
+"""
+
+PAGE = """<!doctype html>
+<html><head><meta charset="utf-8"><title>{title}</title></head>
+<body style="margin:0">
+{cookies}
+{body}
+{data}
+<script type="application/json" id="cfg">{cfg}</script>
+<script>{js}</script>
+</body></html>
+"""
+
+
+def bonpreu_page(cards, batch=40, latency=300, virtual=True, buffer=1200):
+    body = (
+        f'<h1>Arròs i pasta <span data-test="product-count">{len(cards)}\u00a0productes</span></h1>\n'
+        '<div data-retailer-anchor="product-list" style="height:900px;overflow-y:auto">'
+        '<div class="inner" style="position:relative"></div></div>'
+    )
+    cookies = (
+        '<div id="onetrust-banner-sdk"><button id="onetrust-accept-btn-handler" '
+        'onclick="this.parentNode.remove()">Acceptar-ho tot</button></div>'
+    )
+    cfg = {"batch": batch, "latency": latency, "virtual": virtual, "buffer": buffer}
+    return PAGE.format(
+        title="Bonpreu bench", cookies=cookies, body=body, data=_data_tag(cards), cfg=json.dumps(cfg), js=BONPREU_JS
+    )
+
+
+def dia_page(cards, page=24, latency=400):
+    body = f'<h1>Pastas <span>{len(cards)} productos</span></h1>\n<ul id="list"></ul>'
+    cookies = '<button onclick="this.remove()">Aceptar</button>'
+    cfg = {"page": page, "latency": latency}
+    return PAGE.format(
+        title="DIA bench", cookies=cookies, body=body, data=_data_tag(cards), cfg=json.dumps(cfg), js=DIA_JS
+    )
+
+
+# ---------- SERVIDOR ----------
+def _params(query):
+    q = {k: v[-1] for k, v in parse_qs(query).items()}
+    return {
+        "n": int(q.get("n", 400)),
+        "seed": int(q.get("seed", 0)),
+        "batch": int(q.get("batch", 40)),
+        "page": int(q.get("page", 24)),
+        "latency": float(q.get("latency", 300)),
+        "virtual": q.get("virtual", "1") != "0",
+    }
+
+
+def make_handler(catalogs=None):
+    """Handler con catálogos grabados opcionales {'bonpreu': [...], 'dia': [...]}."""
+    catalogs = catalogs or {}
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlparse(self.path)
+            store = url.path.strip("/")
+            if store not in ("bonpreu", "dia"):
+                self.send_error(404)
+                return
+            p = _params(url.query)
+            catalog = catalogs.get(store) or synthetic_catalog(p["n"], p["seed"])
+            if store == "bonpreu":
+                page = bonpreu_page(bonpreu_cards(catalog), p["batch"], p["latency"], p["virtual"])
+            else:
+                page = dia_page(dia_cards(catalog), p["page"], p["latency"])
+            body = page.encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass  # sin ruido en la salida del benchmark
+
+    return Handler
+
+
+def serve(port=0, catalogs=None):
+    """Arranca el servidor en un hilo. -> (server, base_url); server.shutdown() para pararlo."""
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(catalogs))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def load_catalogs(specs):
+    """['bonpreu=Data/Bonpreu/x.csv', ...] -> {'bonpreu': catálogo grabado}"""
+    out = {}
+    for spec in specs or ():
+        store, _, path = spec.partition("=")
+        out[store] = recorded_catalog(path)
+    return out
+
+
+def main():
+    p = argparse.ArgumentParser(description="Servidor local de páginas de listado para benchmarks.")
+    p.add_argument("--port", type=int, default=8765)
+    p.add_argument("--catalog", action="append", metavar="STORE=CSV", help="Reproduce un CSV crudo grabado.")
+    args = p.parse_args()
+    server, base = serve(args.port, load_catalogs(args.catalog))
+    print(f"🧪 Sirviendo {base}/bonpreu y {base}/dia (Ctrl+C para parar)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
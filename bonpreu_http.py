@@ -0,0 +1,302 @@
+# bonpreu_http.py
+# Motor sin navegador: descarga los listados de Bonpreu por HTTP (keep-alive)
+# y los parsea directamente al mismo esquema que parse_cards_in_dom:
+#   name, price, price_per_unit, size, href
+
+import json
+from html.parser import HTMLParser
+from urllib.parse import parse_qsl, urlencode, urljoin, urlparse, urlunparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/127.0 Safari/537.36"
+
+# Estado que el front-end deja embebido en el HTML servido
+STATE_MARKERS = ("window.__INITIAL_STATE__", "window.__PRELOADED_STATE__", "__NEXT_DATA__")
+
+
+# ---------- SESIÓN ----------
+class HttpSession(requests.Session):
+    """
+    Sesión con la interfaz de driver que usan los pools (crawl_pool, crawl_all):
+    quit() la cierra y current_url siempre responde, porque un error HTTP no es
+    un navegador muerto y no hay nada que recrear.
+    """
+
+    current_url = None
+
+    def quit(self):
+        self.close()
+
+
+def make_session(pool_size=8, retries=3):
+    """Sesión HTTP con pool de conexiones keep-alive y reintentos con backoff."""
+    s = HttpSession()
+    retry = Retry(
+        total=retries,
+        backoff_factor=0.5,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=("GET",),
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    s.mount("http://", adapter)
+    s.mount("https://", adapter)
+    s.headers.update(
+        {
+            "User-Agent": USER_AGENT,
+            "Accept-Language": "ca-ES,ca;q=0.9,es-ES;q=0.8",
+        }
+    )
+    return s
+
+
+# ---------- HTML ----------
+def _abs_url(base, href):
+    """Como `new URL(href, BASE).href` en el DOM: absoluta y con %XX."""
+    return requests.utils.requote_uri(urljoin(base, href))
+
+
+def _norm(s):
+    return s.strip().replace("\u00a0", " ") if s else None
+
+
+class _CardParser(HTMLParser):
+    """
+    Recorre el HTML servido y extrae las cards [data-retailer-anchor="fop"]
+    con los mismos data-test que usa parse_cards_in_dom.
+    """
+
+    FIELDS = {
+        "fop-title": "name",
+        "fop-price": "price",
+        "fop-price-now": "price",
+        "fop-price-current": "price",
+        "fop-price-per-unit": "price_per_unit",
+        "fop-size": "size",
+    }
+    VOID = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"}
+
+    def __init__(self, base):
+        super().__init__(convert_charrefs=True)
+        self.base = base
+        self.cards = []
+        self._card = None  # card en curso
+        self._card_depth = 0
+        self._depth = 0
+        self._field = None  # (campo, profundidad) cuyo texto estamos capturando
+        self._text = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.VOID:
+            return
+        self._depth += 1
+        a = dict(attrs)
+        if self._card is None:
+            if a.get("data-retailer-anchor") == "fop":
+                self._card = {"links": []}
+                self._card_depth = self._depth
+            return
+        dt = a.get("data-test")
+        if tag == "a" and dt == "fop-product-link" and a.get("href"):
+            self._card["links"].append((a.get("aria-hidden") == "false", a["href"]))
+        field = self.FIELDS.get(dt)
+        if field and self._field is None and field not in self._card:
+            self._field = (field, self._depth)
+            self._text = []
+
+    def handle_endtag(self, tag):
+        if tag in self.VOID:
+            return
+        if self._field and self._depth == self._field[1]:
+            self._card[self._field[0]] = _norm("".join(self._text))
+            self._field = None
+        if self._card is not None and self._depth == self._card_depth:
+            self._finish_card()
+        self._depth -= 1
+
+    def handle_data(self, data):
+        if self._field:
+            self._text.append(data)
+
+    def _finish_card(self):
+        c = self._card
+        self._card = None
+        # Preferimos el enlace visible (aria-hidden=false), como en el DOM
+        links = sorted(c["links"], key=lambda x: not x[0])
+        href = _abs_url(self.base, links[0][1]) if links else None
+        row = {
+            "name": c.get("name"),
+            "price": c.get("price"),
+            "price_per_unit": c.get("price_per_unit"),
+            "size": c.get("size"),
+            "href": href,
+        }
+        if row["name"] or row["price"]:
+            self.cards.append(row)
+
+
+def parse_listing_html(html, base):
+    p = _CardParser(base)
+    p.feed(html)
+    p.close()
+    return p.cards
+
+
+# ---------- JSON ----------
+def _eur(amount):
+    """'1.95' / 1.95 -> '1,95 €' (mismo formato que el texto del DOM)."""
+    try:
+        return f"{float(amount):.2f}".replace(".", ",") + " €"
+    except (TypeError, ValueError):
+        return _norm(str(amount)) if amount else None
+
+
+def _amount(v):
+    if isinstance(v, dict):
+        for k in ("amount", "value", "current", "price"):
+            if k in v:
+                return _amount(v[k])
+        return None
+    return v
+
+
+def _product_row(p, base):
+    """Mapea una entidad de producto del JSON del front-end a una fila."""
+    name = p.get("name") or p.get("title")
+    price = p.get("price")
+    ppu = None
+    if isinstance(price, dict):
+        unit = price.get("unit") or price.get("unitPrice") or {}
+        price = _amount(price.get("current", price))
+        if isinstance(unit, dict) and _amount(unit) is not None:
+            label = str(unit.get("label") or unit.get("unit") or "").lower()
+            per = "quilo" if "kg" in label or "quilo" in label else (label.rsplit(".", 1)[-1] or "unitat")
+            ppu = f"({_eur(_amount(unit))} per {per})"
+    unit_price = p.get("unitPrice")
+    if ppu is None and unit_price is not None:
+        ppu = _norm(str(unit_price)) if isinstance(unit_price, str) else f"({_eur(_amount(unit_price))})"
+    size = p.get("size")
+    if isinstance(size, dict):
+        size = size.get("value") or size.get("label")
+    href = p.get("productUrl") or p.get("url") or p.get("href")
+    if not href and p.get("retailerProductId"):
+        href = f"/products/{p['retailerProductId']}"
+    return {
+        "name": _norm(name),
+        "price": _eur(price) if price is not None else None,
+        "price_per_unit": ppu,
+        "size": _norm(str(size)) if size else None,
+        "href": _abs_url(base, href) if href else None,
+    }
+
+
+def _walk_products(obj, out):
+    """Busca recursivamente dicts con pinta de producto (nombre + precio)."""
+    if isinstance(obj, dict):
+        if (obj.get("name") or obj.get("title")) and "price" in obj:
+            out.append(obj)
+            return
+        for v in obj.values():
+            _walk_products(v, out)
+    elif isinstance(obj, list):
+        for v in obj:
+            _walk_products(v, out)
+
+
+def parse_listing_json(payload, base):
+    found = []
+    _walk_products(payload, found)
+    rows = [_product_row(p, base) for p in found]
+    return [r for r in rows if r["name"] or r["price"]]
+
+
+def extract_embedded_state(html):
+    """Devuelve el JSON de estado embebido en el HTML (o None)."""
+    dec = json.JSONDecoder()
+    for marker in STATE_MARKERS:
+        i = html.find(marker)
+        if i < 0:
+            continue
+        j = html.find("{", i)
+        if j < 0:
+            continue
+        try:
+            obj, _ = dec.raw_decode(html, j)
+            return obj
+        except ValueError:
+            continue
+    return None
+
+
+def parse_listing(text, base, content_type=""):
+    """Parsea una respuesta (JSON o HTML) al esquema de filas."""
+    if "json" in content_type or text.lstrip().startswith(("{", "[")):
+        try:
+            return parse_listing_json(json.loads(text), base)
+        except ValueError:
+            pass
+    rows = parse_listing_html(text, base)
+    if rows:
+        return rows
+    state = extract_embedded_state(text)
+    return parse_listing_json(state, base) if state is not None else []
+
+
+# ---------- PAGINADO ----------
+def page_url(url, page, page_param="page"):
+    u = urlparse(url)
+    q = [(k, v) for k, v in parse_qsl(u.query, keep_blank_values=True) if k != page_param]
+    if page > 1:
+        q.append((page_param, str(page)))
+    return urlunparse(u._replace(query=urlencode(q)))
+
+
+def fetch_category(session, url, api_template=None, max_pages=100, page_param="page", timeout=20):
+    """
+    Descarga todas las páginas de una categoría y devuelve filas únicas.
+    - api_template: plantilla opcional del endpoint JSON que usa el front-end,
+      p.ej. "https://.../api/products?category={url}&page={page}"
+      ({url} es la URL de la categoría escapada; {path} su ruta).
+      Si no se indica, se pagina la propia URL de la categoría con ?page=N.
+    Para cuando una página no aporta filas nuevas.
+    """
+    base = f"{urlparse(url).scheme}://{urlparse(url).netloc}"
+    collected = {}
+    for page in range(1, max_pages + 1):
+        if api_template:
+            target = api_template.format(
+                url=requests.utils.quote(url, safe=""), path=urlparse(url).path, page=page
+            )
+        else:
+            target = page_url(url, page, page_param)
+        r = session.get(target, timeout=timeout)
+        if r.status_code == 404 and page > 1:
+            break
+        r.raise_for_status()
+        if "charset" not in r.headers.get("Content-Type", "").lower():
+            r.encoding = "utf-8"  # requests asume latin-1 en text/html sin charset
+        rows = parse_listing(r.text, base, r.headers.get("Content-Type", ""))
+        new = 0
+        for row in rows:
+            key = row["href"] or f"{row.get('name', '')}|{row.get('size', '')}"
+            if key and key not in collected:
+                collected[key] = row
+                new += 1
+        print(f"🌐 Página {page}: filas={len(rows)} | nuevas={new} | únicos={len(collected)}")
+        if new == 0:
+            break
+    return list(collected.values())
+
+
+# Uso: python bonpreu_http.py respuesta.html [...]  (parsea respuestas capturadas)
+if __name__ == "__main__":
+    import sys
+
+    for path in sys.argv[1:]:
+        with open(path, encoding="utf-8") as f:
+            rows = parse_listing(f.read(), "https://www.compraonline.bonpreuesclat.cat")
+        print(f"{path}: {len(rows)} filas")
+        for r in rows[:5]:
+            print("  ", r)
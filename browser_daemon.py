@@ -0,0 +1,309 @@
+# browser_daemon.py
+# Navegadores precalentados para refrescos frecuentes: un proceso de larga vida
+# arranca los Chrome (perfil persistente, página de la tienda cargada y cookies
+# aceptadas) y los deja escuchando en su puerto de depuración. Los scrapers con
+# --attach se conectan a uno libre en lugar de lanzar Chrome: sin arranque, sin
+# parcheo de chromedriver y sin banner de cookies.
+#
+#   python browser_daemon.py start --bonpreu 2 --dia 1 --headless   # en primer plano
+#   python browser_daemon.py status
+#   python browser_daemon.py stop
+#   python scraping_bonpreu2.py URL --attach
+#
+# Cada navegador se presta en exclusiva mediante un fichero de lease (el pid del
+# cliente, enlazado con os.link: aparece ya escrito o no aparece); los leases de
+# procesos muertos se recuperan solos.
+
+import argparse
+import json
+import os
+import signal
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+import consent
+
+DEFAULT_STATE = Path(__file__).with_name("browser_daemon.json")
+PROFILES_DIR = Path(__file__).with_name("browser_profiles")
+CONSENT_PROFILE = Path(__file__).with_name(consent.CONSENT_PROFILE)
+HOMES = {
+    "bonpreu": "https://www.compraonline.bonpreuesclat.cat/",
+    "dia": "https://www.dia.es/",
+}
+
+
+# ---------- ESTADO Y LEASES ----------
+def load_state(path=DEFAULT_STATE):
+    try:
+        return json.loads(Path(path).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+
+def _save_state(path, state):
+    path = Path(path)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=path.name, suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False, indent=1)
+    os.replace(tmp, path)
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def leases_dir(state_path):
+    return Path(str(state_path).removesuffix(".json") + ".leases")
+
+
+def acquire(state_path, sid):
+    """Lease exclusivo del navegador `sid`. -> ruta del lease o None si está ocupado."""
+    d = leases_dir(state_path)
+    d.mkdir(parents=True, exist_ok=True)
+    lease = d / f"{sid}.lease"
+    # el pid se escribe en un temporal y se enlaza: otro cliente nunca ve el lease vacío
+    fd, tmp = tempfile.mkstemp(dir=d, prefix=f"{sid}.", suffix=".tmp")
+    with os.fdopen(fd, "w") as f:
+        f.write(str(os.getpid()))
+    try:
+        for _ in range(2):
+            try:
+                os.link(tmp, lease)  # falla si ya existe, como O_EXCL
+                return lease
+            except FileExistsError:
+                try:
+                    owner = int(lease.read_text() or 0)
+                except FileNotFoundError:
+                    continue  # lo acaban de soltar
+                except (OSError, ValueError):
+                    return None  # ilegible: mejor darlo por ocupado
+                if _pid_alive(owner):
+                    return None
+                lease.unlink(missing_ok=True)  # lease huérfano: el cliente murió sin soltarlo
+        return None
+    finally:
+        os.unlink(tmp)
+
+
+def release(lease):
+    if lease:
+        Path(lease).unlink(missing_ok=True)
+
+
+# ---------- CLIENTE ----------
+def attach(store, state_path=DEFAULT_STATE, wait=60, net_log=False):
+    """
+    Toma prestado un navegador caliente de `store` y devuelve un driver conectado
+    por su debuggerAddress. driver.quit() suelta el lease sin cerrar Chrome.
+    net_log: pide el log de red de esta sesión (informe de bytes de --lean).
+    """
+    from selenium import webdriver
+    from selenium.webdriver.chrome.service import Service
+
+    state = load_state(state_path)
+    if not state or not _pid_alive(state.get("pid", 0)):
+        raise RuntimeError(f"No hay daemon de navegadores activo ({state_path}); arráncalo con 'browser_daemon.py start'.")
+    mine = [s for s in state["sessions"] if s["store"] == store]
+    if not mine:
+        raise RuntimeError(f"El daemon no tiene navegadores de {store}.")
+
+    deadline = time.time() + wait
+    while True:
+        for s in mine:
+            lease = acquire(state_path, s["id"])
+            if lease:
+                break
+        else:
+            if time.time() >= deadline:
+                raise RuntimeError(f"Todos los navegadores de {store} están ocupados.")
+            time.sleep(0.5)
+            continue
+        break
+
+    opts = webdriver.ChromeOptions()
+    opts.debugger_address = s["address"]
+    if net_log:
+        opts.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+    try:
+        d = webdriver.Chrome(service=Service(s.get("chromedriver")), options=opts)
+    except Exception:
+        release(lease)
+        raise
+    orig_quit = d.quit
+
+    def quit():
+        # en modo attach chromedriver no cierra el navegador: solo se desconecta
+        try:
+            orig_quit()
+        finally:
+            release(lease)
+
+    d.quit = quit
+    print(f"🔌 Conectado al navegador {s['id']} ({s['address']})")
+    return d
+
+
+# ---------- DAEMON ----------
+def launch(store, sid, args):
+    """Arranca un Chrome de `store` con perfil persistente y lo deja caliente."""
+    profile = Path(args.profiles_dir) / sid
+    if store == "bonpreu":
+        import scraping_bonpreu2 as bp
+
+        d = bp.setup_driver(headless=args.headless, lean=args.lean, user_data_dir=str(profile))
+        chromedriver = d.patcher.executable_path  # el parcheado por uc (vive mientras el daemon)
+    else:
+        from crawl_all import load_dia_module
+
+        dia = load_dia_module()
+        d = dia.setup_driver(lean=args.lean, headless=args.headless, user_data_dir=str(profile))
+        chromedriver = dia.CHROMEDRIVER_PATH
+    warm(d, store)
+    return d, {
+        "id": sid,
+        "store": store,
+        "address": d.capabilities["goog:chromeOptions"]["debuggerAddress"],
+        "chromedriver": chromedriver,
+        "profile": str(profile),
+        "warmed": datetime.now().isoformat(timespec="seconds"),
+    }
+
+
+def warm(d, store):
+    """Carga la portada (caché HTTP) y acepta las cookies (se guardan para restore)."""
+    home = HOMES[store]
+    d.get(home)
+    consent.accept(d, home, CONSENT_PROFILE, budget=10)
+
+
+def _alive(d):
+    try:
+        d.execute_script("return 1;")
+        return True
+    except Exception:
+        return False
+
+
+def run_daemon(args):
+    state_path = Path(args.state)
+    old = load_state(state_path)
+    if old and _pid_alive(old.get("pid", 0)):
+        raise SystemExit(f"❌ Ya hay un daemon activo (pid {old['pid']}).")
+
+    drivers = {}
+    state = {"pid": os.getpid(), "started": datetime.now().isoformat(timespec="seconds"), "sessions": []}
+    stop = {"flag": False}
+    signal.signal(signal.SIGTERM, lambda *_: stop.update(flag=True))
+    try:
+        for store, n in (("bonpreu", args.bonpreu), ("dia", args.dia)):
+            for k in range(1, n + 1):
+                sid = f"{store}-{k}"
+                t0 = time.time()
+                drivers[sid], info = launch(store, sid, args)
+                state["sessions"].append(info)
+                print(f"🔥 {sid} listo en {info['address']} ({time.time() - t0:.1f}s)")
+        _save_state(state_path, state)
+        print(f"✅ {len(drivers)} navegadores calientes. Estado en {state_path} (Ctrl+C para parar)")
+
+        # Bucle de mantenimiento: revisa los navegadores libres, relanza los caídos
+        # y re-calienta los que llevan mucho sin refrescar
+        last_warm = {sid: time.time() for sid in drivers}
+        next_check = time.time() + args.check_every
+        while not stop["flag"]:
+            time.sleep(1)
+            if time.time() < next_check:
+                continue
+            next_check = time.time() + args.check_every
+            for i, info in enumerate(state["sessions"]):
+                sid = info["id"]
+                lease = acquire(state_path, sid)
+                if not lease:
+                    continue  # prestado: no se toca
+                try:
+                    if not _alive(drivers[sid]):
+                        print(f"♻️ {sid} no responde: se relanza")
+                        try:
+                            drivers[sid].quit()
+                        except Exception:
+                            pass
+                        drivers[sid], state["sessions"][i] = launch(info["store"], sid, args)
+                        last_warm[sid] = time.time()
+                        _save_state(state_path, state)
+                    elif time.time() - last_warm[sid] >= args.rewarm * 60:
+                        warm(drivers[sid], info["store"])
+                        last_warm[sid] = time.time()
+                        state["sessions"][i]["warmed"] = datetime.now().isoformat(timespec="seconds")
+                        _save_state(state_path, state)
+                except Exception as e:
+                    print(f"⚠️ Mantenimiento de {sid}: {e}")
+                finally:
+                    release(lease)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for d in drivers.values():
+            try:
+                d.quit()
+            except Exception:
+                pass
+        state_path.unlink(missing_ok=True)
+        print("👋 Daemon parado.")
+
+
+def status(state_path):
+    state = load_state(state_path)
+    if not state or not _pid_alive(state.get("pid", 0)):
+        print("ℹ️ No hay daemon activo.")
+        return
+    print(f"🟢 Daemon pid {state['pid']} desde {state['started']}")
+    for s in state["sessions"]:
+        lease = leases_dir(state_path) / f"{s['id']}.lease"
+        owner = lease.read_text().strip() if lease.exists() else ""
+        busy = f"prestado a pid {owner}" if owner else "libre"
+        print(f"   • {s['id']:<10} {s['address']:<18} {busy} | calentado {s['warmed']}")
+
+
+def build_parser():
+    p = argparse.ArgumentParser(description="Daemon de navegadores precalentados para los scrapers.")
+    p.add_argument("--state", default=str(DEFAULT_STATE), help="Fichero de estado (por defecto junto al script).")
+    sub = p.add_subparsers(dest="cmd", required=True)
+
+    s = sub.add_parser("start", help="Arranca los navegadores y los mantiene (primer plano).")
+    s.add_argument("--bonpreu", type=int, default=1, help="Navegadores de Bonpreu (por defecto: 1).")
+    s.add_argument("--dia", type=int, default=0, help="Navegadores de DIA (por defecto: 0).")
+    s.add_argument("--headless", action="store_true")
+    s.add_argument("--lean", action="store_true", help="Chrome sin imágenes/fuentes/vídeo ni trackers.")
+    s.add_argument("--profiles-dir", default=str(PROFILES_DIR), help="Perfiles persistentes de Chrome.")
+    s.add_argument("--check-every", type=int, default=30, help="Segundos entre revisiones (por defecto: 30).")
+    s.add_argument("--rewarm", type=float, default=30, help="Minutos entre re-calentados (por defecto: 30).")
+
+    sub.add_parser("status", help="Navegadores del daemon y quién los tiene prestados.")
+    sub.add_parser("stop", help="Para el daemon.")
+    return p
+
+
+def main():
+    args = build_parser().parse_args()
+    if args.cmd == "start":
+        run_daemon(args)
+    elif args.cmd == "status":
+        status(args.state)
+    else:
+        state = load_state(args.state)
+        if not state or not _pid_alive(state.get("pid", 0)):
+            print("ℹ️ No hay daemon activo.")
+            return
+        os.kill(state["pid"], signal.SIGTERM)
+        print(f"🛑 Señal enviada al daemon (pid {state['pid']}).")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,340 @@
+# category_discovery.py
+# Descubre las categorías de cada tienda recorriendo su navegación una vez y
+# construye el árbol (padre -> hijas) con las mismas etiquetas que los CSV. El
+# árbol se guarda en caché con caducidad y alimenta a los scrapers con las hojas:
+# así no se scrapea a la vez una categoría y sus subcategorías (mismos productos).
+#
+#   python category_discovery.py bonpreu dia --headless            # árbol (caché 24h)
+#   python category_discovery.py bonpreu --refresh --depth 2 --write-dir .
+#   python crawl_all.py --discover --out-dir Data                  # todo el catálogo
+#   python scraping_bonpreu2.py --discover --discover-match "^frescos/" --out-dir Data/Bonpreu
+#
+# Jerarquía: primero por el path de la URL (sin UUIDs ni el '/c/<código>' de DIA);
+# si la URL no la refleja, la hija es el enlace que aparece en la página de la
+# categoría y no en la portada.
+
+import argparse
+import hashlib
+import re
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from urllib.parse import unquote, urlparse
+
+import browser_daemon
+import consent
+import crawl_metrics
+from site_profile import load_profile, save_profile
+
+CATEGORY_CACHE = Path(__file__).with_name("category_tree.json")
+CONSENT_PROFILE = Path(__file__).with_name(consent.CONSENT_PROFILE)
+
+UUID_RE = re.compile(r"[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}", re.I)
+
+STORES = {
+    "bonpreu": {
+        "home": "https://www.compraonline.bonpreuesclat.cat/",
+        "link_re": r"/categories/",
+    },
+    "dia": {
+        "home": "https://www.dia.es/",
+        "link_re": r"/c/L\w+/?$",
+    },
+}
+
+# Todos los enlaces de categoría de la página (también los de menús ocultos)
+LINKS_JS = r"""
+  const re = new RegExp(arguments[0]);
+  const out = [];
+  for (const a of document.querySelectorAll('a[href]')) {
+    let u;
+    try { u = new URL(a.href, location.href); } catch (e) { continue; }
+    if (u.host !== location.host || !re.test(u.pathname)) continue;
+    out.push({ href: u.origin + u.pathname, text: (a.textContent || '').trim().replace(/\s+/g, ' ').slice(0, 80) });
+  }
+  return out;
+"""
+
+
+# ---------- CLAVES Y ETIQUETAS ----------
+def canonical_url(url):
+    """Sin query, fragmento ni barra final: la misma categoría enlazada de dos formas."""
+    u = urlparse(url)
+    return f"{u.scheme}://{u.netloc}{u.path.rstrip('/')}"
+
+
+def url_hash(url, n=8):
+    """Hash corto de la URL canónica: distingue categorías con la misma etiqueta en ficheros."""
+    return hashlib.sha1(canonical_url(url).encode("utf-8")).hexdigest()[:n]
+
+
+def category_key(url):
+    """
+    Ruta jerárquica de la categoría: segmentos del path sin UUIDs, sin el prefijo
+    '/categories' (Bonpreu) ni el '/c/<código>' final (DIA). -> 'frescos/fruita'
+    """
+    parts = [p.lower() for p in unquote(urlparse(url).path).split("/") if p]
+    if "c" in parts and parts.index("c") > 0:
+        parts = parts[: parts.index("c")]
+    if parts[:1] == ["categories"]:
+        parts = parts[1:]
+    return "/".join(p for p in parts if not UUID_RE.fullmatch(p))
+
+
+def category_label(store, url):
+    """La etiqueta que ya usan los nombres de fichero de cada scraper."""
+    if store == "bonpreu":
+        from scraping_bonpreu2 import category_label_from_url
+
+        return category_label_from_url(url)
+    from crawl_all import load_dia_module  # import circular; el módulo se carga una vez (caché)
+
+    return load_dia_module().category_from_url(url)
+
+
+def _is_below(key, parent):
+    return bool(parent) and key.startswith(parent + "/")
+
+
+# ---------- DESCUBRIMIENTO ----------
+def harvest_links(d, store, wait=8.0):
+    """Enlaces de categoría de la página actual; espera a que el menú deje de crecer."""
+    t0, last, links = time.time(), -1, []
+    while True:
+        links = d.execute_script(LINKS_JS, STORES[store]["link_re"]) or []
+        if (links and len(links) == last) or time.time() - t0 >= wait:
+            return links
+        last = len(links)
+        crawl_metrics.sleep(0.5)
+
+
+@crawl_metrics.timed("discover")
+def discover(d, store, depth=1, consent_budget=3.0):
+    """
+    Recorre la navegación de `store`: portada y, hasta `depth` niveles, la página
+    de cada categoría (ahí suelen aparecer las subcategorías).
+    -> lista de nodos {key, url, label, name, parent, leaf}
+    """
+    home = STORES[store]["home"]
+    restored = consent.restore(d, home, CONSENT_PROFILE)
+    d.get(home)
+    consent.accept(d, home, CONSENT_PROFILE, budget=consent_budget, restored=restored)
+
+    nodes, found_on = {}, {}
+
+    def add(links, page_key):
+        for l in links:
+            url = canonical_url(l["href"])
+            key = category_key(url)
+            if key and key not in nodes:
+                nodes[key] = {"key": key, "url": url, "name": l.get("text") or ""}
+                found_on[key] = page_key
+
+    add(harvest_links(d, store), None)
+    print(f"🧭 {store}: {len(nodes)} categorías en la portada")
+    visited = set()
+    for level in range(1, depth + 1):
+        todo = [k for k in nodes if k not in visited and _level(k, nodes, found_on) == level]
+        for key in todo:
+            visited.add(key)
+            try:
+                d.get(nodes[key]["url"])
+                add(harvest_links(d, store, wait=4.0), key)
+            except Exception as e:
+                print(f"⚠️  No se pudo abrir {nodes[key]['url']}: {e}")
+        print(f"🧭 {store}: nivel {level} -> {len(nodes)} categorías ({len(todo)} páginas visitadas)")
+    return build_tree(store, list(nodes.values()), found_on)
+
+
+def _level(key, nodes, found_on):
+    """Profundidad de `key` en el árbol (1 = categoría de primer nivel)."""
+    seen = {key}
+    while True:
+        parent = _parent(key, nodes, found_on)
+        if not parent or parent in seen:
+            return len(seen)
+        seen.add(parent)
+        key = parent
+
+
+def _parent(key, nodes, found_on):
+    # el antecesor más cercano por path; si no hay, la página donde apareció el enlace
+    best = max((k for k in nodes if _is_below(key, k)), key=len, default=None)
+    return best or found_on.get(key)
+
+
+def build_tree(store, nodes, found_on=None):
+    """Completa cada nodo con etiqueta, padre y si es hoja."""
+    found_on = found_on or {}
+    by_key = {n["key"]: n for n in nodes}
+    for n in nodes:
+        n["label"] = category_label(store, n["url"])
+        n["parent"] = _parent(n["key"], by_key, found_on)
+    parents = {n["parent"] for n in nodes}
+    for n in nodes:
+        n["leaf"] = n["key"] not in parents
+    return sorted(nodes, key=lambda n: n["key"])
+
+
+# ---------- CACHÉ ----------
+def load_tree(store, path=CATEGORY_CACHE, max_age=24):
+    """Árbol en caché si tiene menos de `max_age` horas, si no None."""
+    prof = load_profile(path, urlparse(STORES[store]["home"]).hostname)
+    try:
+        fetched = datetime.fromisoformat(prof["fetched"])
+    except (KeyError, TypeError, ValueError):
+        return None
+    if datetime.now() - fetched > timedelta(hours=max_age):
+        return None
+    return prof.get("nodes") or None
+
+
+def save_tree(store, nodes, path=CATEGORY_CACHE):
+    save_profile(
+        path,
+        urlparse(STORES[store]["home"]).hostname,
+        {"fetched": datetime.now().isoformat(timespec="seconds"), "nodes": nodes},
+    )
+
+
+def get_tree(store, make_driver, path=CATEGORY_CACHE, max_age=24, depth=1, refresh=False):
+    """Árbol de `store` desde la caché o, si caducó, recorriendo la web con make_driver()."""
+    nodes = None if refresh else load_tree(store, path, max_age)
+    if nodes:
+        print(f"🗂️  {store}: {len(nodes)} categorías de la caché ({path})")
+        return nodes
+    d = make_driver()
+    try:
+        nodes = discover(d, store, depth=depth)
+    finally:
+        try:
+            d.quit()
+        except Exception:
+            pass
+    if nodes:
+        save_tree(store, nodes, path)
+    crawl_metrics.inc("categories_discovered", len(nodes))
+    return nodes
+
+
+# ---------- URLS PARA SCRAPEAR ----------
+def leaf_urls(nodes, match=None):
+    """URLs de las hojas (cubren todo el catálogo sin solaparse). match: regex sobre la clave."""
+    rx = re.compile(match) if match else None
+    return [n["url"] for n in nodes if n["leaf"] and (not rx or rx.search(n["key"]))]
+
+
+def _url_key(url):
+    """(host, ruta jerárquica); sin ruta reconocible, la URL canónica entera."""
+    return urlparse(url).netloc.lower(), category_key(url) or canonical_url(url)
+
+
+def dedupe_overlaps(urls, nodes=(), keep=()):
+    """
+    Quita categorías repetidas (mismo host y clave) y las que ya cubre otra de la
+    lista por ser subcategoría suya: el listado del padre ya incluye sus productos.
+    keep: URLs que no se quitan nunca (las que pidió el usuario); sí cubren a otras.
+    """
+    found_on = {n["key"]: n["parent"] for n in nodes if n.get("parent")}
+    keep = set(keep)
+    keys = {}
+    for u in sorted(urls, key=lambda u: u not in keep):  # a igual clave, manda la pedida
+        keys.setdefault(_url_key(u), u)
+
+    def covered(host, key):
+        seen = set()
+        while key and key not in seen:
+            seen.add(key)
+            below = (k for h, k in keys if h == host and _is_below(key, k))
+            parent = max(below, key=len, default=None) or found_on.get(key)
+            if (host, parent) in keys:
+                return keys[(host, parent)]
+            key = parent
+        return None
+
+    out = []
+    for u in urls:
+        if u in keep:
+            out.append(u)
+            continue
+        host, key = _url_key(u)
+        parent = keys[(host, key)] if keys[(host, key)] != u else covered(host, key)
+        if parent:
+            print(f"✂️  {u} ya está incluida en {parent}")
+        else:
+            out.append(u)
+    dropped = len(urls) - len(out)
+    if dropped:
+        print(f"✂️  {dropped} categorías solapadas fuera ({len(out)} por scrapear)")
+    return out
+
+
+# ---------- CLI ----------
+def make_store_driver(store, headless=False, attach=None):
+    if attach:
+        return browser_daemon.attach(store, attach)
+    if store == "bonpreu":
+        import scraping_bonpreu2 as bp
+
+        return bp.setup_driver(headless=headless)
+    from crawl_all import load_dia_module
+
+    return load_dia_module().setup_driver(headless=headless)
+
+
+def print_tree(nodes):
+    children = {}
+    for n in nodes:
+        children.setdefault(n["parent"], []).append(n)
+
+    def walk(parent, indent):
+        for n in children.get(parent, ()):
+            mark = "•" if n["leaf"] else "▸"
+            print(f"{'  ' * indent}{mark} {n['label']}  ({n['name'] or n['key']})")
+            walk(n["key"], indent + 1)
+
+    walk(None, 0)
+
+
+def build_parser():
+    p = argparse.ArgumentParser(description="Descubre y cachea el árbol de categorías de cada tienda.")
+    p.add_argument("stores", nargs="+", choices=tuple(STORES))
+    p.add_argument("--cache", default=str(CATEGORY_CACHE), help="Fichero de caché del árbol.")
+    p.add_argument("--max-age", type=float, default=24, help="Horas de validez de la caché (por defecto: 24).")
+    p.add_argument("--refresh", action="store_true", help="Ignora la caché y recorre la web.")
+    p.add_argument("--depth", type=int, default=1, help="Niveles de categorías a visitar (por defecto: 1).")
+    p.add_argument("--match", help="Regex sobre la ruta de la categoría (p.ej. '^frescos/').")
+    p.add_argument("--write-dir", help="Escribe <tienda>_categories.txt con las hojas (para --urls-file).")
+    p.add_argument("--headless", action="store_true")
+    p.add_argument(
+        "--attach",
+        nargs="?",
+        const=str(browser_daemon.DEFAULT_STATE),
+        metavar="STATE",
+        help="Descubre con un Chrome caliente de browser_daemon.py.",
+    )
+    return p
+
+
+def main():
+    args = build_parser().parse_args()
+    for store in args.stores:
+        nodes = get_tree(
+            store,
+            lambda: make_store_driver(store, args.headless, args.attach),
+            path=args.cache,
+            max_age=args.max_age,
+            depth=args.depth,
+            refresh=args.refresh,
+        )
+        print_tree(nodes)
+        urls = leaf_urls(nodes, args.match)
+        print(f"📋 {store}: {len(nodes)} categorías, {len(urls)} hojas por scrapear")
+        if args.write_dir:
+            out = Path(args.write_dir) / f"{store}_categories.txt"
+            out.write_text("\n".join(urls) + "\n", encoding="utf-8")
+            print(f"💾 {out}")
+
+
+if __name__ == "__main__":
+    main()
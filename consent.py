@@ -0,0 +1,217 @@
+# consent.py
+# Banner de cookies sin esperas largas:
+# - una sola consulta en la página prueba todos los botones conocidos (y hace clic)
+# - la estrategia que funcionó se recuerda por host (o que no hay banner: solo se
+#   recorta la espera cuando se ha confirmado varias veces y no ha caducado)
+# - las cookies de consentimiento se guardan y se restauran por CDP antes de
+#   navegar, así otros workers / ejecuciones ya no ven el banner
+# - nunca se espera más de un presupuesto corto (segundos, no minutos)
+#
+#   restored = consent.restore(d, url)      # antes del primer d.get(url)
+#   d.get(url)
+#   consent.accept(d, url, restored=restored)
+
+import re
+import threading
+import time
+from datetime import datetime
+from urllib.parse import urlparse
+
+from selenium.webdriver.common.by import By
+
+import crawl_metrics
+from site_profile import load_profile, save_profile
+
+CONSENT_PROFILE = "consent_profile.json"
+
+# "Sin banner" solo recorta la espera tras NONE_CONFIRM ejecuciones seguidas sin
+# verlo y caduca a las NONE_TTL horas: un banner que tarda más que el presupuesto
+# corto en una ejecución no queda sin aceptar para siempre
+NONE_CONFIRM = 3
+NONE_TTL = 24
+
+# Estrategias: selector CSS o texto del botón (minúsculas). El orden importa poco:
+# la que funciona en cada host pasa delante en la siguiente ejecución.
+STRATEGIES = [
+    {"name": "onetrust", "css": "#onetrust-accept-btn-handler"},
+    {"name": "usercentrics", "css": '[data-testid="uc-accept-all-button"]'},
+    {"name": "didomi", "css": "#didomi-notice-agree-button"},
+    {"name": "cookiebot", "css": "#CybotCookiebotDialogBodyLevelButtonLevelOptinAllowAll"},
+    {"name": "text:acceptar-ho tot", "text": "acceptar-ho tot"},
+    {"name": "text:aceptar todas", "text": "aceptar todas"},
+    {"name": "text:accept all", "text": "accept all"},
+    {"name": "text:acceptar", "text": "acceptar"},
+    {"name": "text:aceptar", "text": "aceptar"},
+]
+
+IFRAME_SELECTOR = (
+    'iframe[src*="consent"],iframe[id*="consent"],iframe[src*="cmp"],iframe[id*="ot-"],iframe[src*="didomi"]'
+)
+
+# Cookies que guardan el consentimiento (OneTrust, Didomi, TCF, Usercentrics, Cookiebot...)
+CONSENT_COOKIE_RE = re.compile(r"optanon|consent|didomi|euconsent|^uc_|cookielaw|cookiebot|cmp", re.I)
+
+CONSENT_JS = r"""
+  const [strategies, preferred, iframeSel] = arguments;
+  const visible = el => !!(el && (el.offsetWidth || el.offsetHeight || el.getClientRects().length));
+  const order = preferred
+    ? strategies.filter(s => s.name === preferred).concat(strategies.filter(s => s.name !== preferred))
+    : strategies;
+  let buttons = null;
+  for (const s of order) {
+    let el = null;
+    if (s.css) {
+      el = document.querySelector(s.css);
+    } else {
+      buttons = buttons || Array.from(document.querySelectorAll('button, [role="button"], a.button'));
+      el = buttons.find(b => visible(b) && (b.textContent || '').trim().toLowerCase().startsWith(s.text));
+    }
+    if (el && visible(el)) { el.click(); return { clicked: s.name }; }
+  }
+  return { clicked: null, frames: document.querySelectorAll(iframeSel).length, ready: document.readyState };
+"""
+
+_lock = threading.Lock()
+
+
+def _host(url):
+    return urlparse(url).hostname or ""
+
+
+def _profile(path, host):
+    return load_profile(path, host) if path else {}
+
+
+def _none_trusted(prof):
+    """True si el "sin banner" del host está confirmado y vigente."""
+    if prof.get("strategy") != "none" or prof.get("none_runs", 0) < NONE_CONFIRM:
+        return False
+    try:
+        since = datetime.fromisoformat(prof["none_since"])
+    except (KeyError, TypeError, ValueError):
+        return False
+    return (datetime.now() - since).total_seconds() < NONE_TTL * 3600
+
+
+def _update(path, host, **changes):
+    if not path:
+        return
+    with _lock:  # varios workers del pool comparten el fichero
+        prof = load_profile(path, host)
+        prof.update(changes, updated=datetime.now().isoformat(timespec="seconds"))
+        save_profile(path, host, prof)
+
+
+# ---------- COOKIES PERSISTIDAS ----------
+def restore(d, url, path=CONSENT_PROFILE):
+    """
+    Inyecta por CDP las cookies de consentimiento guardadas para el host de `url`
+    (sin navegar). -> True si había cookies vigentes.
+    """
+    cookies = [
+        c for c in _profile(path, _host(url)).get("cookies") or ()
+        if not c.get("expiry") or c["expiry"] > time.time()
+    ]
+    if not cookies:
+        return False
+    try:
+        for c in cookies:
+            params = {
+                "name": c["name"],
+                "value": c["value"],
+                "domain": c.get("domain") or _host(url),
+                "path": c.get("path") or "/",
+                "secure": bool(c.get("secure")),
+                "httpOnly": bool(c.get("httpOnly")),
+            }
+            if c.get("sameSite"):
+                params["sameSite"] = c["sameSite"]
+            if c.get("expiry"):
+                params["expires"] = c["expiry"]
+            d.execute_cdp_cmd("Network.setCookie", params)
+    except Exception as e:
+        print(f"⚠️  No se pudieron restaurar las cookies de consentimiento: {e}")
+        return False
+    crawl_metrics.inc("consent_restored")
+    return True
+
+
+def _save_cookies(d, path, host, wait=1.0):
+    """Guarda las cookies de consentimiento (espera un poco a que el CMP las escriba)."""
+    t0 = time.time()
+    while True:
+        cookies = [c for c in d.get_cookies() if CONSENT_COOKIE_RE.search(c.get("name", ""))]
+        if cookies or time.time() - t0 >= wait:
+            break
+        time.sleep(0.2)
+    _update(path, host, cookies=cookies)
+
+
+# ---------- BANNER ----------
+def _try_frames(d, max_frames=3):
+    """Banner dentro de iframes (otro origen: hay que entrar en cada uno)."""
+    try:
+        frames = d.find_elements(By.CSS_SELECTOR, IFRAME_SELECTOR)[:max_frames]
+    except Exception:
+        return None
+    for fr in frames:
+        try:
+            d.switch_to.frame(fr)
+            res = d.execute_script(CONSENT_JS, STRATEGIES, None, IFRAME_SELECTOR) or {}
+            if res.get("clicked"):
+                return "iframe:" + res["clicked"]
+        except Exception:
+            pass
+        finally:
+            d.switch_to.default_content()
+    return None
+
+
+@crawl_metrics.timed("cookies")
+def accept(d, url, path=CONSENT_PROFILE, budget=3.0, poll=0.25, restored=False):
+    """
+    Acepta el banner de cookies si aparece, sin pasar de `budget` segundos.
+    - Si ya se restauraron cookies o el host no tiene banner (confirmado varias
+      veces y no caducado), basta con una comprobación rápida.
+    -> nombre de la estrategia que hizo clic, o None
+    """
+    host = _host(url)
+    prof = _profile(path, host)
+    preferred = prof.get("strategy")
+    if restored:
+        budget = 0
+    elif _none_trusted(prof):
+        budget = min(budget, 1.0)
+
+    t0 = time.time()
+    frames_tried = False
+    while True:
+        try:
+            res = d.execute_script(CONSENT_JS, STRATEGIES, preferred, IFRAME_SELECTOR) or {}
+        except Exception:
+            res = {}
+        clicked = res.get("clicked")
+        if not clicked and res.get("frames") and not frames_tried:
+            frames_tried = True
+            clicked = _try_frames(d)
+        if clicked:
+            print(f"✅ Cookies aceptadas ({clicked}, {time.time() - t0:.1f}s).")
+            crawl_metrics.inc("consent_clicked")
+            if clicked != preferred:
+                _update(path, host, strategy=clicked, none_runs=0, none_since=None)
+            _save_cookies(d, path, host)
+            return clicked
+        if time.time() - t0 >= budget:
+            break
+        time.sleep(poll)
+
+    crawl_metrics.inc("consent_none")
+    if restored:
+        print("✅ Consentimiento restaurado de una sesión anterior.")
+    else:
+        print(f"ℹ️ Sin banner de cookies ({time.time() - t0:.1f}s, seguimos).")
+        if preferred == "none" and (_none_trusted(prof) or prof.get("none_runs", 0) < NONE_CONFIRM):
+            _update(path, host, none_runs=prof.get("none_runs", 0) + 1)
+        else:  # primera vez sin banner (o el "sin banner" caducó): se vuelve a contar
+            _update(path, host, strategy="none", none_runs=1, none_since=datetime.now().isoformat(timespec="seconds"))
+    return None
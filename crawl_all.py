@@ -0,0 +1,283 @@
+# crawl_all.py
+# Orquestador asyncio: scrapea Bonpreu y DIA a la vez en una sola ejecución.
+# Cada navegador es un worker con su cola; las llamadas bloqueantes de Selenium
+# (scroll, esperas de carga, parseo) corren en hilos (asyncio.to_thread), así que
+# mientras una página espera su lazy-load las demás siguen trabajando y el total
+# tarda lo que la tienda más lenta, no la suma.
+#
+#   python crawl_all.py --bonpreu-file bonpreu.txt --dia-file dia.txt --out-dir Data
+#   python crawl_all.py --bonpreu URL1 URL2 --dia URL3 --bonpreu-workers 3 --headless
+#   python crawl_all.py --bonpreu-file bonpreu.txt --bonpreu-args "--capture observer --skip-unchanged"
+#   python crawl_all.py --bonpreu-file bonpreu.txt --dia-file dia.txt --tabs 3   # un Chrome por tienda
+#   python crawl_all.py --discover --headless                   # catálogo completo de ambas tiendas
+#
+# Bonpreu escribe en <out-dir>/Bonpreu y DIA en <out-dir>/DIA (lo que espera merge.py).
+
+import argparse
+import asyncio
+import functools
+import importlib.util
+import shlex
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import browser_daemon
+import category_discovery
+import crawl_metrics
+from crawl_pool import _driver_alive, _quit, read_urls, run_tabs
+
+
+@functools.lru_cache(maxsize=None)
+def load_dia_module():
+    """
+    Scraping-DIA.py no es importable por nombre (guion): se carga por ruta, una
+    sola vez por proceso (todos los que lo usan comparten el mismo módulo).
+    """
+    spec = importlib.util.spec_from_file_location("scraping_dia", Path(__file__).with_name("Scraping-DIA.py"))
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+
+# ---------- WORKERS ----------
+async def store_worker(store, wid, queue, job, results, retries):
+    """
+    Un navegador de larga vida de `store`: saca URLs de su cola y las scrapea en
+    un hilo. Si el navegador muere se recrea; reintentos con backoff no bloqueante.
+    """
+    d, session = None, {}
+    tag = f"{store}/w{wid}"
+    try:
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            i, url = item
+            t0 = time.time()
+            res = {"store": store, "url": url, "ok": False, "result": None, "attempts": 0, "error": None}
+            for attempt in range(1, retries + 2):
+                res["attempts"] = attempt
+                try:
+                    if d is None:
+                        d = await asyncio.to_thread(job["make_driver"])
+                        session = {}
+                    res["result"] = await asyncio.to_thread(job["scrape_one"], d, url, session)
+                    res["ok"], res["error"] = True, None
+                    break
+                except Exception as e:
+                    res["error"] = f"{type(e).__name__}: {e}"
+                    print(f"⚠️ [{tag}] Intento {attempt} fallido en {url}: {res['error']}")
+                    if d is not None and not await asyncio.to_thread(_driver_alive, d):
+                        await asyncio.to_thread(_quit, d)
+                        d = None
+                    if attempt <= retries:
+                        await asyncio.sleep(min(2**attempt, 10))
+            res["seconds"] = round(time.time() - t0, 2)
+            results[(store, i)] = res
+            status = "✅" if res["ok"] else "❌"
+            print(f"{status} [{tag}] {url} ({res['attempts']} intento/s, {res['seconds']}s)")
+    finally:
+        if d is not None:
+            await asyncio.to_thread(_quit, d)
+
+
+async def store_tabs(store, job, results, retries, prefetch):
+    """Un solo navegador para la tienda, una pestaña por categoría (crawl_pool.run_tabs)."""
+    res = await asyncio.to_thread(
+        run_tabs,
+        job["urls"],
+        job["make_driver"],
+        job["scrape_one"],
+        prefetch=prefetch,
+        retries=retries,
+        prepare_tab=job.get("prepare_tab"),
+    )
+    for i, r in enumerate(res):
+        results[(store, i)] = dict(r, store=store)
+
+
+async def crawl(jobs, retries=2, tabs=0):
+    """
+    jobs: {store: {urls, workers, make_driver(), scrape_one(d, url, session)[, prepare_tab(d)]}}
+    Lanza todos los workers de todas las tiendas a la vez. Con tabs > 0 cada
+    tienda usa un único navegador con `tabs` pestañas precargadas.
+    -> lista de resultados {store, url, ok, result, attempts, error, seconds}
+    """
+    n_threads = sum(max(1, min(j["workers"], len(j["urls"]))) for j in jobs.values() if j["urls"])
+    asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=max(1, n_threads)))
+    results, tasks = {}, []
+    for store, job in jobs.items():
+        if not job["urls"]:
+            continue
+        if tabs:
+            tasks.append(store_tabs(store, job, results, retries, tabs))
+            continue
+        workers = max(1, min(job["workers"], len(job["urls"])))
+        queue = asyncio.Queue()
+        for i, url in enumerate(job["urls"]):
+            queue.put_nowait((i, url))
+        for _ in range(workers):
+            queue.put_nowait(None)
+        tasks += [store_worker(store, w, queue, job, results, retries) for w in range(1, workers + 1)]
+    await asyncio.gather(*tasks)
+    return [results[k] for k in sorted(results)]
+
+
+# ---------- TIENDAS ----------
+def bonpreu_job(args):
+    import scraping_bonpreu2 as bp
+
+    argv = ["--out-dir", str(Path(args.out_dir) / "Bonpreu"), "--format", args.format]
+    argv += _common_flags(args) + shlex.split(args.bonpreu_args or "")
+    bp_args = bp.build_parser().parse_args(argv)
+    if args.tabs and bp_args.engine == "http":
+        raise SystemExit("❌ --tabs solo tiene sentido con --engine browser (quítalo de --bonpreu-args)")
+    urls = store_urls("bonpreu", args, read_urls(args.bonpreu, args.bonpreu_file), lambda: bp.make_driver(bp_args))
+    bad = [u for u in urls if not bp.valid_url(u)]
+    if bad:
+        raise SystemExit(f"❌ URLs que no son de Bonpreu: {', '.join(bad)}")
+    Path(bp_args.out_dir).mkdir(parents=True, exist_ok=True)
+    return {
+        "urls": urls,
+        "workers": args.bonpreu_workers,
+        "make_driver": lambda: bp.make_driver(bp_args, restore_url=urls[0] if args.tabs else None),
+        "scrape_one": lambda d, url, session: bp.scrape_one(d, url, session, bp_args),
+        "prepare_tab": lambda d: bp.prepare_tab(d, bp_args.lean),
+    }
+
+
+def dia_job(args):
+    dia = load_dia_module()
+    argv = ["--out-dir", str(Path(args.out_dir) / "DIA"), "--format", args.format]
+    argv += _common_flags(args) + shlex.split(args.dia_args or "")
+    dia_args = dia.build_parser().parse_args(argv)
+    urls = store_urls("dia", args, read_urls(args.dia, args.dia_file), lambda: dia.make_driver(dia_args))
+    return {
+        "urls": urls,
+        "workers": args.dia_workers,
+        "make_driver": lambda: dia.make_driver(dia_args),
+        "scrape_one": lambda d, url, session: dia.scrape_one(d, url, session, dia_args),
+        "prepare_tab": lambda d: dia.prepare_tab(d, dia_args.lean),
+    }
+
+
+def store_urls(store, args, urls, make_driver):
+    """URLs dadas + (con --discover) las hojas del árbol de la tienda que no solapan."""
+    if args.discover is not None and (not args.discover or store in args.discover):
+        nodes = category_discovery.get_tree(store, make_driver, max_age=args.discover_max_age)
+        found = read_urls(urls + category_discovery.leaf_urls(nodes, args.discover_match))
+        # solo se recortan las descubiertas: las URLs pedidas se scrapean siempre
+        urls = category_discovery.dedupe_overlaps(found, nodes, keep=urls)
+    return urls
+
+
+def _common_flags(args):
+    flags = []
+    if args.headless:
+        flags.append("--headless")
+    if args.lean:
+        flags.append("--lean")
+    if args.history:
+        flags += ["--history", args.history]
+    if args.attach:
+        flags += ["--attach", args.attach]
+    if args.product_index:
+        flags += ["--product-index", args.product_index]
+    return flags
+
+
+def build_parser():
+    p = argparse.ArgumentParser(description="Scrapea Bonpreu y DIA a la vez (asyncio + un hilo por navegador).")
+    p.add_argument("--bonpreu", nargs="*", default=[], metavar="URL", help="Categorías de Bonpreu.")
+    p.add_argument("--bonpreu-file", action="append", default=[], help="Fichero con URLs de Bonpreu. Repetible.")
+    p.add_argument("--dia", nargs="*", default=[], metavar="URL", help="Categorías de DIA.")
+    p.add_argument("--dia-file", action="append", default=[], help="Fichero con URLs de DIA. Repetible.")
+    p.add_argument(
+        "--discover",
+        nargs="*",
+        choices=("bonpreu", "dia"),
+        metavar="STORE",
+        help="Añade las categorías hoja descubiertas (todas las tiendas o las indicadas; árbol en caché).",
+    )
+    p.add_argument("--discover-match", metavar="REGEX", help="Con --discover, solo rutas que casen con REGEX.")
+    p.add_argument(
+        "--discover-max-age", type=float, default=24, help="Horas de validez del árbol en caché (por defecto: 24)."
+    )
+    p.add_argument("--out-dir", default="Data", help="Raíz de salida: <out-dir>/Bonpreu y <out-dir>/DIA.")
+    p.add_argument("--bonpreu-workers", type=int, default=2, help="Navegadores para Bonpreu (por defecto: 2).")
+    p.add_argument("--dia-workers", type=int, default=1, help="Navegadores para DIA (por defecto: 1).")
+    p.add_argument(
+        "--tabs",
+        type=int,
+        default=0,
+        metavar="N",
+        help="Un solo Chrome por tienda, una pestaña por categoría con N precargadas (ignora --*-workers).",
+    )
+    p.add_argument("--retries", type=int, default=2, help="Reintentos por categoría (por defecto: 2).")
+    p.add_argument("--format", choices=("csv", "parquet"), default="csv")
+    p.add_argument("--history", metavar="DB", help="Histórico SQLite de precios (solo cambios).")
+    p.add_argument(
+        "--product-index",
+        metavar="DB",
+        help="Índice SQLite de productos: ids estables y cada producto se guarda una sola vez por crawl.",
+    )
+    p.add_argument("--headless", action="store_true")
+    p.add_argument("--lean", action="store_true", help="Chrome sin imágenes/fuentes/vídeo ni trackers.")
+    p.add_argument(
+        "--attach",
+        nargs="?",
+        const=str(browser_daemon.DEFAULT_STATE),
+        metavar="STATE",
+        help="Workers sobre los Chrome calientes de browser_daemon.py (uno por worker).",
+    )
+    p.add_argument("--bonpreu-args", help='Flags extra para scraping_bonpreu2.py, p.ej. "--capture observer".')
+    p.add_argument("--dia-args", help="Flags extra para Scraping-DIA.py.")
+    p.add_argument("--report", metavar="PATH.json", help="Informe JSON conjunto de la ejecución.")
+    p.add_argument("--prom", metavar="PATH", help="Las mismas métricas en formato Prometheus.")
+    return p
+
+
+def main():
+    parser = build_parser()
+    args = parser.parse_args()
+    jobs = {"bonpreu": bonpreu_job(args), "dia": dia_job(args)}
+    if not any(j["urls"] for j in jobs.values()):
+        parser.error("indica al menos una URL de Bonpreu o de DIA")
+
+    run = crawl_metrics.start_run("all")
+    t0 = time.time()
+    results = asyncio.run(crawl(jobs, retries=args.retries, tabs=args.tabs))
+    for r in results:
+        res = r["result"] or {}
+        status = "skipped" if res.get("skipped") else ("ok" if r["ok"] else "failed")
+        crawl_metrics.inc(f"categories_{status}")
+        run.add_category(
+            store=r["store"], url=r["url"], status=status, rows=res.get("rows", 0),
+            attempts=r["attempts"], seconds=r["seconds"], error=r["error"],
+        )
+    if args.report:
+        run.save_json(args.report)
+    if args.prom:
+        run.save_prometheus(args.prom)
+
+    failed = [r for r in results if not r["ok"]]
+    for store in jobs:
+        mine = [r for r in results if r["store"] == store]
+        if mine:
+            ok = [r for r in mine if r["ok"]]
+            busy = sum(r["seconds"] for r in mine)
+            print(
+                f"📦 {store}: {len(ok)}/{len(mine)} categorías OK | "
+                f"{sum(r['result']['rows'] for r in ok)} productos | {busy:.0f}s de trabajo"
+            )
+    print(f"⏱️  Total: {time.time() - t0:.0f}s")
+    for r in failed:
+        print(f"   • falló: [{r['store']}] {r['url']} ({r['error']})")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+# crawl_metrics.py
+# Instrumentación de los scrapers: tiempos por fase, contadores y llamadas
+# WebDriver, volcados al final como informe JSON y/o texto Prometheus.
+#
+# Un único "run" activo por proceso (compartido por los workers del pool):
+#
+#   run = crawl_metrics.start_run("bonpreu")
+#   with crawl_metrics.phase("navigate"):
+#       d.get(url)
+#   crawl_metrics.inc("loops")
+#   run.save_json("report.json"); run.save_prometheus("crawl.prom")
+#
+# Sin run activo todo es un no-op. Las fases pueden anidarse (son inclusivas:
+# "scroll" incluye el "settle" y el "sleep" que ocurren dentro).
+
+import functools
+import json
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+_RUN = None
+
+
+class RunMetrics:
+    def __init__(self, scraper, **labels):
+        self.scraper = scraper
+        self.labels = labels
+        self.started = datetime.now()
+        self.t0 = time.perf_counter()
+        self.phases = defaultdict(lambda: {"calls": 0, "seconds": 0.0})
+        self.counters = Counter()
+        self.webdriver = Counter()
+        self.categories = []
+        self._lock = threading.Lock()
+
+    def add_phase(self, name, seconds):
+        with self._lock:
+            p = self.phases[name]
+            p["calls"] += 1
+            p["seconds"] += seconds
+
+    def inc(self, name, n=1):
+        with self._lock:
+            self.counters[name] += n
+
+    def add_category(self, **info):
+        with self._lock:
+            self.categories.append(info)
+
+    def report(self):
+        with self._lock:
+            return {
+                "scraper": self.scraper,
+                "labels": self.labels,
+                "started": self.started.isoformat(timespec="seconds"),
+                "seconds": round(time.perf_counter() - self.t0, 3),
+                "phases": {
+                    k: {"calls": v["calls"], "seconds": round(v["seconds"], 3)}
+                    for k, v in sorted(self.phases.items(), key=lambda kv: -kv[1]["seconds"])
+                },
+                "counters": dict(self.counters),
+                "webdriver_calls": dict(self.webdriver.most_common()),
+                "categories": list(self.categories),
+            }
+
+    def save_json(self, path):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(self.report(), ensure_ascii=False, indent=1), encoding="utf-8")
+        print(f"📊 Informe de ejecución guardado en {path}")
+
+    def prometheus(self):
+        """Formato de texto de Prometheus (node_exporter textfile collector)."""
+        rep = self.report()
+        base = {"scraper": self.scraper, **self.labels}
+
+        def lbl(**extra):
+            items = {**base, **extra}
+            return "{" + ",".join(f'{k}="{str(v)}"' for k, v in items.items()) + "}"
+
+        out = [
+            "# TYPE crawl_run_seconds gauge",
+            f"crawl_run_seconds{lbl()} {rep['seconds']}",
+            "# TYPE crawl_phase_seconds_total counter",
+        ]
+        out += [f"crawl_phase_seconds_total{lbl(phase=k)} {v['seconds']}" for k, v in rep["phases"].items()]
+        out.append("# TYPE crawl_phase_calls_total counter")
+        out += [f"crawl_phase_calls_total{lbl(phase=k)} {v['calls']}" for k, v in rep["phases"].items()]
+        out.append("# TYPE crawl_events_total counter")
+        out += [f"crawl_events_total{lbl(event=k)} {v}" for k, v in sorted(rep["counters"].items())]
+        out.append("# TYPE crawl_webdriver_calls_total counter")
+        out += [f"crawl_webdriver_calls_total{lbl(command=k)} {v}" for k, v in rep["webdriver_calls"].items()]
+        return "\n".join(out) + "\n"
+
+    def save_prometheus(self, path):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(path.suffix + ".tmp")
+        tmp.write_text(self.prometheus(), encoding="utf-8")
+        tmp.replace(path)  # el collector nunca ve un fichero a medias
+        print(f"📊 Métricas Prometheus guardadas en {path}")
+
+
+# ---------- API DE MÓDULO ----------
+def start_run(scraper, **labels):
+    global _RUN
+    _RUN = RunMetrics(scraper, **labels)
+    return _RUN
+
+
+def current():
+    return _RUN
+
+
+@contextmanager
+def phase(name):
+    if _RUN is None:
+        yield
+        return
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        _RUN.add_phase(name, time.perf_counter() - t0)
+
+
+def timed(name):
+    """Decorador: cuenta el tiempo de la función como fase `name`."""
+
+    def deco(fn):
+        @functools.wraps(fn)
+        def wrapper(*a, **kw):
+            with phase(name):
+                return fn(*a, **kw)
+
+        return wrapper
+
+    return deco
+
+
+def inc(name, n=1):
+    if _RUN is not None and n:
+        _RUN.inc(name, n)
+
+
+def sleep(seconds):
+    """time.sleep contabilizado como fase 'sleep'."""
+    with phase("sleep"):
+        time.sleep(seconds)
+
+
+def instrument_driver(d):
+    """
+    Cuenta las llamadas WebDriver (una por round-trip) por comando, envolviendo
+    d.execute en la instancia. Devuelve el mismo driver.
+    """
+    if _RUN is None or getattr(d, "_metrics_wrapped", False):
+        return d
+    orig = d.execute
+
+    def execute(driver_command, params=None):
+        run = _RUN  # el run activo en cada llamada (un mismo driver puede servir a varios)
+        if run is not None:
+            with run._lock:
+                run.webdriver[driver_command] += 1
+        return orig(driver_command, params)
+
+    d.execute = execute
+    d._metrics_wrapped = True
+    return d
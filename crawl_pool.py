@@ -0,0 +1,244 @@
+# crawl_pool.py
+# Pool de workers con navegador para scrapear muchas categorías en una sola ejecución.
+# - run_pool: varios navegadores en paralelo (uno por worker)
+# - run_tabs: un solo navegador, una pestaña por categoría con precarga
+
+import queue
+import threading
+import time
+from collections import deque
+from pathlib import Path
+
+
+def read_urls(urls=(), files=()):
+    """
+    Junta URLs de la línea de comandos y de ficheros (una por línea).
+    Ignora líneas vacías y comentarios (#) y quita duplicados manteniendo el orden.
+    """
+    out = []
+    for u in urls or ():
+        out.append(u.strip())
+    for f in files or ():
+        for line in Path(f).read_text(encoding="utf-8").splitlines():
+            line = line.strip()
+            if line and not line.startswith("#"):
+                out.append(line)
+    seen = set()
+    return [u for u in out if u and not (u in seen or seen.add(u))]
+
+
+def _driver_alive(d):
+    try:
+        _ = d.current_url  # cualquier comando sirve de ping
+        return True
+    except Exception:
+        return False
+
+
+def _quit(d):
+    try:
+        d.quit()
+    except Exception:
+        pass
+
+
+def run_pool(urls, make_driver, scrape_one, workers=2, retries=2, queue_size=None):
+    """
+    Reparte las URLs entre `workers` navegadores de larga vida.
+    - make_driver(): crea un driver (una vez por worker; se recrea si muere)
+    - scrape_one(d, url, session): scrapea una URL; `session` es un dict por worker
+      que sobrevive entre categorías (p.ej. para recordar que ya aceptamos cookies)
+    - retries: reintentos por categoría (además del primer intento)
+    - queue_size: tamaño máximo de la cola de trabajo (por defecto 2×workers)
+    Devuelve una lista de dicts {url, ok, result, attempts, error, seconds} en el orden de entrada.
+    """
+    workers = max(1, min(workers, len(urls) or 1))
+    q = queue.Queue(maxsize=queue_size or 2 * workers)
+    results = {}
+    lock = threading.Lock()
+
+    def producer():
+        for i, u in enumerate(urls):
+            q.put((i, u))  # bloquea si la cola está llena
+        for _ in range(workers):
+            q.put(None)
+
+    def worker(wid):
+        d = None
+        session = {}
+        try:
+            while True:
+                item = q.get()
+                if item is None:
+                    return
+                i, url = item
+                t0 = time.time()
+                res = {"url": url, "ok": False, "result": None, "attempts": 0, "error": None}
+                for attempt in range(1, retries + 2):
+                    res["attempts"] = attempt
+                    try:
+                        if d is None:
+                            d = make_driver()
+                            session = {}
+                        res["result"] = scrape_one(d, url, session)
+                        res["ok"] = True
+                        res["error"] = None
+                        break
+                    except Exception as e:
+                        res["error"] = f"{type(e).__name__}: {e}"
+                        print(f"⚠️ [w{wid}] Intento {attempt} fallido en {url}: {res['error']}")
+                        # Si el navegador ha muerto, lo recreamos en el siguiente intento
+                        if d is not None and not _driver_alive(d):
+                            _quit(d)
+                            d = None
+                        if attempt <= retries:
+                            time.sleep(min(2**attempt, 10))
+                res["seconds"] = round(time.time() - t0, 2)
+                with lock:
+                    results[i] = res
+                status = "✅" if res["ok"] else "❌"
+                print(f"{status} [w{wid}] {url} ({res['attempts']} intento/s, {res['seconds']}s)")
+        finally:
+            if d is not None:
+                _quit(d)
+
+    threads = [threading.Thread(target=producer, daemon=True)]
+    threads += [
+        threading.Thread(target=worker, args=(w,), daemon=True) for w in range(1, workers + 1)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return [results[i] for i in sorted(results)]
+
+
+# ---------- PESTAÑAS ----------
+# Chrome frena las pestañas en segundo plano (timers, renderer); para que las
+# precargadas avancen de verdad mientras se scrapea la activa
+TAB_ARGS = [
+    "--disable-background-timer-throttling",
+    "--disable-renderer-backgrounding",
+    "--disable-backgrounding-occluded-windows",
+]
+
+
+def run_tabs(urls, make_driver, scrape_one, prefetch=2, retries=2, prepare_tab=None):
+    """
+    Un solo navegador para todas las URLs: cada categoría se abre en su pestaña y
+    las `prefetch` siguientes se van cargando en segundo plano mientras se
+    scrapea la actual (misma sesión: cookies y caché HTTP compartidas).
+    - scrape_one(d, url, session): como en run_pool; si la pestaña ya tiene la
+      URL cargada, session["preloaded"] == url y no hace falta navegar
+    - prepare_tab(d): se llama en cada pestaña nueva antes de navegar (p.ej.
+      bloqueo de recursos por CDP, que es por pestaña)
+    Devuelve lo mismo que run_pool.
+    """
+    todo = deque(enumerate(urls))
+    ahead = deque()  # (i, url, handle) ya abiertas
+    results = []
+    st = {"d": None, "home": None, "session": {}}
+
+    def start():
+        st["d"] = make_driver()
+        st["home"] = st["d"].current_window_handle  # pestaña base: nunca se cierra
+        st["session"] = {}
+
+    def open_tab(url=None):
+        d = st["d"]
+        d.switch_to.new_window("tab")
+        if prepare_tab:
+            prepare_tab(d)
+        if url:
+            # navegación sin bloquear: la página carga mientras seguimos
+            d.execute_script("window.location.href = arguments[0];", url)
+        return d.current_window_handle
+
+    def close_tab(h):
+        d = st["d"]
+        try:
+            d.switch_to.window(h)
+            d.close()
+            d.switch_to.window(st["home"])
+        except Exception:
+            pass
+
+    def restart():
+        # el navegador ha muerto: las pestañas precargadas se pierden -> a la cola
+        _quit(st["d"])
+        st["d"] = None
+        while ahead:
+            i, u, _ = ahead.pop()
+            todo.appendleft((i, u))
+
+    def fill():
+        # arranca el navegador si hace falta y precarga las siguientes pestañas;
+        # la URL solo sale de la cola cuando su pestaña quedó abierta
+        if st["d"] is None:
+            start()
+        while todo and len(ahead) < prefetch + 1:
+            i, u = todo[0]
+            h = open_tab(u)
+            todo.popleft()
+            ahead.append((i, u, h))
+
+    fails = 0
+    try:
+        while todo or ahead:
+            try:
+                fill()
+                fails = 0
+            except Exception as e:
+                # Chrome murió (o no arrancó) al abrir pestañas: mismos reintentos que por URL
+                fails += 1
+                error = f"{type(e).__name__}: {e}"
+                print(f"⚠️ [tab] Intento {fails} fallido al abrir pestañas: {error}")
+                if st["d"] is not None and not _driver_alive(st["d"]):
+                    restart()
+                if not ahead:
+                    if fails <= retries:
+                        time.sleep(min(2**fails, 10))
+                        continue
+                    # sin navegador tras todos los reintentos: la siguiente URL falla y seguimos
+                    i, url = todo.popleft()
+                    res = {"url": url, "ok": False, "result": None, "attempts": fails, "error": error, "seconds": 0}
+                    results.append((i, res))
+                    print(f"❌ [tab] {url} ({fails} intento/s)")
+                    fails = 0
+                    continue
+            i, url, h = ahead.popleft()
+            t0 = time.time()
+            res = {"url": url, "ok": False, "result": None, "attempts": 0, "error": None}
+            for attempt in range(1, retries + 2):
+                res["attempts"] = attempt
+                try:
+                    if st["d"] is None:
+                        start()
+                    if h is None:
+                        h = open_tab()
+                    elif attempt == 1:
+                        st["session"]["preloaded"] = url
+                    st["d"].switch_to.window(h)
+                    res["result"] = scrape_one(st["d"], url, st["session"])
+                    res["ok"] = True
+                    res["error"] = None
+                    break
+                except Exception as e:
+                    res["error"] = f"{type(e).__name__}: {e}"
+                    print(f"⚠️ [tab] Intento {attempt} fallido en {url}: {res['error']}")
+                    st["session"].pop("preloaded", None)  # el reintento navega de nuevo
+                    if not _driver_alive(st["d"]):
+                        restart()
+                        h = None
+                    if attempt <= retries:
+                        time.sleep(min(2**attempt, 10))
+            if st["d"] is not None and h is not None:
+                close_tab(h)
+            res["seconds"] = round(time.time() - t0, 2)
+            results.append((i, res))
+            status = "✅" if res["ok"] else "❌"
+            print(f"{status} [tab] {url} ({res['attempts']} intento/s, {res['seconds']}s)")
+    finally:
+        if st["d"] is not None:
+            _quit(st["d"])
+    return [r for _, r in sorted(results, key=lambda x: x[0])]
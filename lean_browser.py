@@ -0,0 +1,108 @@
+# lean_browser.py
+# Modo "lean" para los Chrome de los scrapers: solo leemos texto del DOM, así que
+# no hace falta descargar imágenes, vídeo, fuentes ni scripts de terceros.
+# - opciones de arranque (sin imágenes, sin features de fondo, log de red)
+# - bloqueo por CDP (Network.setBlockedURLs) de recursos pesados y trackers
+# - informe de tráfico: peticiones, bytes descargados y bloqueados por tipo
+
+import json
+from collections import Counter
+
+# Recursos pesados que el scraping no necesita
+BLOCKED_RESOURCES = [
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.avif", "*.svg", "*.ico",
+    "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot",
+    "*.mp4", "*.webm", "*.m3u8", "*.mp3",
+]
+
+# Analítica / publicidad de terceros (el banner de cookies NO se bloquea: lo
+# necesitamos para aceptar y que la página deje de taparse)
+BLOCKED_DOMAINS = [
+    "*googletagmanager.com*", "*google-analytics.com*", "*doubleclick.net*",
+    "*googlesyndication.com*", "*googleadservices.com*", "*facebook.net*",
+    "*connect.facebook.com*", "*hotjar.com*", "*clarity.ms*", "*bat.bing.com*",
+    "*criteo.com*", "*criteo.net*", "*tiktok.com*", "*analytics.tiktok.com*",
+    "*pinterest.com*", "*snapchat.com*", "*taboola.com*", "*outbrain.com*",
+    "*newrelic.com*", "*nr-data.net*", "*sentry.io*", "*datadoghq.com*",
+]
+
+LEAN_ARGS = [
+    "--blink-settings=imagesEnabled=false",
+    "--disable-background-networking",
+    "--disable-background-timer-throttling",
+    "--disable-default-apps",
+    "--disable-sync",
+    "--disable-notifications",
+    "--mute-audio",
+    "--no-first-run",
+    "--disable-features=Translate,MediaRouter,OptimizationHints,AutofillServerCommunication",
+]
+
+LEAN_PREFS = {
+    "profile.managed_default_content_settings.images": 2,
+    "profile.default_content_setting_values.notifications": 2,
+    "profile.managed_default_content_settings.media_stream": 2,
+}
+
+
+def apply_lean_options(opts):
+    """Añade a unas ChromeOptions (selenium o undetected-chromedriver) el perfil lean."""
+    for a in LEAN_ARGS:
+        opts.add_argument(a)
+    opts.add_experimental_option("prefs", LEAN_PREFS)
+    # log de red para el informe de bytes (get_log("performance"))
+    opts.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+    return opts
+
+
+def enable_blocking(driver, extra=()):
+    """Bloquea por CDP los recursos pesados y los dominios de terceros. -> nº de patrones."""
+    urls = BLOCKED_RESOURCES + BLOCKED_DOMAINS + list(extra)
+    try:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": urls})
+    except Exception as e:
+        print(f"⚠️  No se pudo activar el bloqueo por CDP: {e}")
+        return 0
+    return len(urls)
+
+
+def transfer_report(driver):
+    """
+    Tráfico desde la última llamada (el log de performance se vacía al leerlo):
+    {requests, bytes, blocked, blocked_by_type}
+    """
+    try:
+        entries = driver.get_log("performance")
+    except Exception:
+        return None
+    types, n_req, n_bytes, blocked = {}, 0, 0, Counter()
+    for e in entries:
+        try:
+            msg = json.loads(e["message"])["message"]
+        except (KeyError, ValueError):
+            continue
+        method, params = msg.get("method"), msg.get("params") or {}
+        if method == "Network.requestWillBeSent":
+            n_req += 1
+            types[params.get("requestId")] = params.get("type") or "Other"
+        elif method == "Network.loadingFinished":
+            n_bytes += int(params.get("encodedDataLength") or 0)
+        elif method == "Network.loadingFailed" and params.get("blockedReason"):
+            blocked[params.get("type") or types.get(params.get("requestId"), "Other")] += 1
+    return {
+        "requests": n_req,
+        "bytes": n_bytes,
+        "blocked": sum(blocked.values()),
+        "blocked_by_type": dict(blocked),
+    }
+
+
+def format_report(rep):
+    if not rep:
+        return "sin datos de red"
+    by_type = ", ".join(f"{k}={v}" for k, v in sorted(rep["blocked_by_type"].items()))
+    return (
+        f"{rep['requests']} peticiones | {rep['bytes'] / 1e6:.2f} MB descargados | "
+        f"{rep['blocked']} bloqueadas" + (f" ({by_type})" if by_type else "")
+    )
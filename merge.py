@@ -0,0 +1,310 @@
+# merge.py
+# Merge incremental de los crudos de cada tienda (CSV o Parquet particionado)
+# en su dataset limpio. Guarda un manifiesto (ruta, tamaño, mtime, hash) de los
+# ficheros ya ingeridos y solo parsea los nuevos o modificados.
+#
+#   python merge.py bonpreu Data/Bonpreu
+#   python merge.py dia Data/DIA --full     # reconstruye desde cero
+#   python merge.py bonpreu Data/Bonpreu --format parquet
+#   python merge.py bonpreu Data/Bonpreu --index product_index.sqlite   # dedupe por id estable
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+import tempfile
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import product_index
+from price_parsing import euro_to_float, parse_eur, price_per_kg_dia, price_per_kg_from_cols
+from storage import FORMATS, clean_columns, clean_exists, read_table, typed_clean, write_clean
+
+MANIFEST_VERSION = 1
+
+# Timestamp del scrape en el nombre del crudo (bonpreu_arros_20250920-101010.csv, part-20250920-...)
+TS_RE = re.compile(r"(\d{8}-\d{6})")
+
+STORES = {
+    "bonpreu": {"pattern": "bonpreu_*.csv", "store": "bonpreu", "out": "bonpreu_merged_clean"},
+    "dia": {"pattern": "*.csv", "store": "dia", "out": "dia_merged_clean"},
+}
+
+
+# ---------- LIMPIEZA POR TIENDA ----------
+def clean_bonpreu(df):
+    """CSV crudo de scraping_bonpreu2.py -> name, price (€), price_per_kg, size, href."""
+    df = df.rename(columns={c: c.lower() for c in df.columns})
+    out = pd.DataFrame(
+        {
+            "name": df["name"],
+            "price (€)": parse_eur(df["price"]).astype(np.float32),
+            "price_per_kg": price_per_kg_from_cols(
+                df["price"], df.get("price_per_unit"), df.get("size")
+            ).astype(np.float32),
+            "size": df.get("size"),
+            "href": df.get("href"),
+        },
+        index=df.index,
+    )
+    return out
+
+
+def clean_dia(df):
+    """CSV crudo de DIA (columnas flexibles) -> name, price (€), price_per_kg, size, href."""
+    df = df.rename(columns={c: c.strip().lower() for c in df.columns})
+    # map flexible (por si vienen de distintos scrapers)
+    col_name = next((c for c in df.columns if c in ("name", "nombre", "título", "titulo")), None)
+    col_price = next((c for c in df.columns if c in ("price", "precio", "price (€)", "preu", "preu (€)")), None)
+    col_ppu = next(
+        (c for c in df.columns if c in ("price_per_unit", "ppu", "price_per_kg", "€/kg", "per_kg", "price per unit")),
+        None,
+    )
+    col_size = next((c for c in df.columns if c in ("size", "tamaño", "tamano", "format", "peso")), None)
+    if col_name is None or col_price is None:
+        return None
+
+    price_raw = df[col_price].astype(str)
+    out = pd.DataFrame(
+        {
+            "name": df[col_name].astype(str),
+            "price (€)": euro_to_float(price_raw),
+            "price_per_kg": price_per_kg_dia(
+                price_raw,
+                df[col_ppu].astype(str) if col_ppu else None,
+                df[col_size].astype(str) if col_size else None,
+            ),
+            "size": df[col_size].astype(str) if col_size else None,
+            "href": df.get("href"),
+        },
+        index=df.index,
+    )
+    # quita filas sin precio o sin €/kg calculable
+    return out.dropna(subset=["price (€)", "price_per_kg"])
+
+
+def finalize_bonpreu(df):
+    # prefiere primero los registros con ambos precios no nulos
+    has = df["price_per_kg"].notna().astype(int) * 2 + df["price (€)"].notna().astype(int)
+    return df.iloc[np.argsort(-has.to_numpy(), kind="stable")].reset_index(drop=True)
+
+
+def finalize_dia(df):
+    # dedupe conservando el más barato por (name, size) y orden por €/kg
+    df = df.sort_values(["name", "size", "price_per_kg"]).drop_duplicates(subset=["name", "size"], keep="first")
+    return df.sort_values("price_per_kg", ascending=True).reset_index(drop=True)
+
+
+def dedupe_ids(df):
+    """
+    Una fila por product_id (hash, O(n)): la observación más reciente según el
+    timestamp del fichero de origen. Las filas sin id se quedan.
+    """
+    if "product_id" not in df:
+        return df
+    if "source" in df:
+        ts = df["source"].astype(str).str.extract(TS_RE, expand=False).fillna("")
+        df = df.iloc[np.argsort(ts.to_numpy(), kind="stable")]
+    ids = df["product_id"]
+    return df[(ids.isna() | ~ids.duplicated(keep="last")).to_numpy()].reset_index(drop=True)
+
+
+def with_ids(conn, store, df):
+    """Añade product_id (índice persistente) a un DataFrame limpio."""
+    df = df.copy()
+    df["product_id"] = pd.array(product_index.assign_frame(conn, store, df), dtype="Int64")
+    return df
+
+
+CLEANERS = {"bonpreu": (clean_bonpreu, finalize_bonpreu), "dia": (clean_dia, finalize_dia)}
+
+
+# ---------- MANIFIESTO ----------
+def file_hash(path, chunk=1 << 20):
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def load_manifest(path):
+    try:
+        m = json.loads(Path(path).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {"version": MANIFEST_VERSION, "files": {}}
+    if m.get("version") != MANIFEST_VERSION:
+        return {"version": MANIFEST_VERSION, "files": {}}
+    return m
+
+
+def save_manifest(path, manifest):
+    manifest["updated"] = datetime.now().isoformat(timespec="seconds")
+    _atomic_write_text(path, json.dumps(manifest, ensure_ascii=False, indent=1))
+
+
+def _atomic_write_text(path, text):
+    path = Path(path)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=path.name, suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+def pending_files(files, manifest, root):
+    """
+    Ficheros nuevos o modificados respecto al manifiesto (clave: ruta relativa a `root`).
+    Tamaño+mtime iguales -> no se toca; si difieren, el hash decide.
+    -> (lista de (path, clave, entrada_manifiesto), nº sin cambios)
+    """
+    todo, unchanged = [], 0
+    for p in files:
+        key = p.relative_to(root).as_posix()
+        st = p.stat()
+        entry = {"size": st.st_size, "mtime": st.st_mtime}
+        old = manifest["files"].get(key)
+        if old and old["size"] == entry["size"] and old["mtime"] == entry["mtime"]:
+            unchanged += 1
+            continue
+        entry["sha1"] = file_hash(p)
+        if old and old.get("sha1") == entry["sha1"]:
+            manifest["files"][key] = entry  # solo ha cambiado el mtime
+            unchanged += 1
+            continue
+        todo.append((p, key, entry))
+    return todo, unchanged
+
+
+def raw_files(raw_dir, conf, out=None):
+    """CSV crudos de la carpeta + part-*.parquet de store=<tienda>/ (sin la salida)."""
+    out = Path(out).resolve() if out else None
+    files = [p for p in raw_dir.glob(conf["pattern"]) if p.resolve() != out and "merged" not in p.name]
+    for p in raw_dir.glob(f"store={conf['store']}/**/part-*.parquet"):
+        if out is None or out not in p.resolve().parents:
+            files.append(p)
+    return sorted(files)
+
+
+def read_raw(path):
+    if path.suffix == ".parquet":
+        return read_table(path)
+    return pd.read_csv(path, encoding="utf-8-sig")
+
+
+# ---------- MERGE ----------
+def merge_store(store, raw_dir, out=None, full=False, fmt="csv", index=None):
+    """index: ruta del índice de productos; con él cada producto sale una sola vez (product_id)."""
+    raw_dir = Path(raw_dir)
+    conf = STORES[store]
+    # CSV: un fichero; Parquet: un directorio con part-*.parquet
+    out = Path(out) if out else raw_dir / (conf["out"] + (".csv" if fmt == "csv" else ".parquet"))
+    manifest_path = out.with_name(out.name + ".manifest.json")
+    clean, finalize = CLEANERS[store]
+
+    manifest = load_manifest(manifest_path)
+    # Sin manifiesto (o sin dataset limpio) no sabemos qué contiene la salida: desde cero
+    fresh = full or not clean_exists(out) or not manifest["files"]
+    if fresh:
+        manifest["files"] = {}
+
+    files = raw_files(raw_dir, conf, out)
+    todo, unchanged = pending_files(files, manifest, raw_dir)
+    print(f"📂 {store}: {len(files)} ficheros | nuevos/modificados={len(todo)} | sin cambios={unchanged}")
+    if not todo:
+        save_manifest(manifest_path, manifest)
+        print(f"✅ Nada que hacer: {out} ya está al día.")
+        return out
+
+    modified = {key for _, key, _ in todo if key in manifest["files"]}
+    frames = []
+    for p, key, entry in todo:
+        df = clean(read_raw(p))
+        if df is None:
+            print(f"⚠️  Saltando {key}: columnas clave no encontradas.")
+        else:
+            frames.append(df.assign(source=key))
+        manifest["files"][key] = entry
+    if not frames and not modified and not fresh:
+        save_manifest(manifest_path, manifest)
+        print(f"✅ Sin filas nuevas: {out} ya está al día.")
+        return out
+    new = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+    conn = product_index.connect(index) if index else None
+    if conn is not None and len(new):
+        new = with_ids(conn, store, new)
+    if fmt == "parquet":
+        new = typed_clean(new, store=store)
+
+    append = store == "bonpreu" and not fresh and not modified and clean_columns(out) == list(new.columns)
+    if append and "product_id" in new:
+        # un producto que ya está en la salida hay que sustituirlo (precio nuevo), no
+        # añadirlo: entonces se reescribe. Solo se lee la columna de ids.
+        old_ids = read_table(out, columns=["product_id"])["product_id"]
+        append = not new["product_id"].isin(set(old_ids.dropna().astype(int))).any()
+    if append:
+        # Solo hay ficheros nuevos: se añaden al final (CSV) o como part nuevo (Parquet)
+        new = finalize(dedupe_ids(new))
+        write_clean(new, out, fmt, append=True)
+        total = None
+    else:
+        old = pd.DataFrame() if fresh else _read_clean(out)
+        if len(old) and "source" in old:
+            old = old[~old["source"].isin(modified)]  # ficheros re-ingeridos
+        if conn is not None and len(old) and "product_id" not in old:
+            old = with_ids(conn, store, old)  # salida de un merge sin índice
+        merged = finalize(dedupe_ids(pd.concat([old, new], ignore_index=True)))
+        if fmt == "parquet":
+            merged = typed_clean(merged)
+        write_clean(merged, out, fmt)
+        total = len(merged)
+
+    if conn is not None:
+        conn.close()
+    save_manifest(manifest_path, manifest)
+    print(f"✅ Guardado: {out}  |  filas nuevas={len(new)}" + (f" | total={total}" if total is not None else ""))
+    return out
+
+
+def _read_clean(path):
+    df = read_table(path)
+    for c in ("price (€)", "price_per_kg"):
+        if c in df:
+            df[c] = df[c].astype(np.float32)
+    return df
+
+
+def build_parser():
+    p = argparse.ArgumentParser(description="Merge incremental de los crudos en el dataset limpio.")
+    p.add_argument("store", choices=sorted(STORES), help="Tienda.")
+    p.add_argument("raw_dir", help="Carpeta con los crudos del scraper (CSV y/o dataset Parquet).")
+    p.add_argument("-o", "--out", help="Dataset limpio de salida (por defecto en la carpeta de crudos).")
+    p.add_argument("--full", action="store_true", help="Ignora el manifiesto y reconstruye desde cero.")
+    p.add_argument(
+        "--index",
+        metavar="DB",
+        help="Índice de productos (product_index.py): dedupe por id estable, compartido con los scrapers.",
+    )
+    p.add_argument(
+        "--format",
+        choices=FORMATS,
+        default="csv",
+        help="Formato del dataset limpio: 'csv' o 'parquet' (directorio de part-*.parquet).",
+    )
+    return p
+
+
+def main():
+    args = build_parser().parse_args()
+    if not Path(args.raw_dir).is_dir():
+        print(f"❌ No existe la carpeta {args.raw_dir}", file=sys.stderr)
+        sys.exit(2)
+    merge_store(args.store, args.raw_dir, out=args.out, full=args.full, fmt=args.format, index=args.index)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,299 @@
+# price_history.py
+# Histórico de precios por producto en SQLite guardando solo los cambios
+# (run-length: una fila cuando el precio cambia, no una foto por scrape).
+#
+#   python price_history.py ingest bonpreu Data/Bonpreu       # CSV/Parquet crudos
+#   python price_history.py changes --days 7
+#   python price_history.py lowest arros
+#   python price_history.py history "https://www.compraonline.bonpreuesclat.cat/products/..."
+#
+# Clave de producto: href (Bonpreu/DIA); si falta, el nombre.
+# Los scrapers con --history apuntan en `ingested` el fichero que escribieron:
+# un `ingest` posterior de la misma carpeta no lo vuelve a contar.
+
+import argparse
+import re
+import sqlite3
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_DB = "price_history.sqlite"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS products (
+    id INTEGER PRIMARY KEY,
+    store TEXT NOT NULL,
+    key TEXT NOT NULL,
+    name TEXT,
+    first_seen TEXT,
+    last_seen TEXT,
+    last_price REAL,
+    last_ppk REAL,
+    min_price REAL,
+    min_price_ts TEXT,
+    UNIQUE (store, key)
+);
+CREATE TABLE IF NOT EXISTS price_changes (
+    product_id INTEGER NOT NULL REFERENCES products(id),
+    ts TEXT NOT NULL,
+    price REAL,
+    price_per_kg REAL,
+    PRIMARY KEY (product_id, ts)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_price_changes_ts ON price_changes (ts);
+CREATE TABLE IF NOT EXISTS ingested (
+    source TEXT PRIMARY KEY,
+    store TEXT,
+    ts TEXT
+);
+"""
+
+TS_RE = re.compile(r"(\d{8}-\d{6})")
+
+
+def connect(path=DEFAULT_DB):
+    conn = sqlite3.connect(path, timeout=30)
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def _iso(ts):
+    return pd.Timestamp(ts).isoformat(timespec="seconds")
+
+
+def _same(a, b):
+    """Igualdad a céntimos tratando NaN == NaN."""
+    a, b = np.round(a.astype(float), 2), np.round(b.astype(float), 2)
+    return (a == b) | (np.isnan(a) & np.isnan(b))
+
+
+# ---------- ESCRITURA ----------
+def record(conn, store, df, ts=None):
+    """
+    Registra una observación (un scrape) de `store` en el instante `ts`.
+    df: key, name, price, price_per_kg. Solo se insertan los precios que cambian
+    respecto al último conocido de cada producto. -> nº de cambios guardados.
+    """
+    ts = _iso(ts or datetime.now())
+    df = df.dropna(subset=["key"]).drop_duplicates("key")
+    if df.empty:
+        return 0
+    with conn:
+        conn.executemany(
+            """
+            INSERT INTO products (store, key, name, first_seen, last_seen) VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (store, key) DO UPDATE SET
+                name = excluded.name,
+                last_seen = MAX(COALESCE(products.last_seen, ''), excluded.last_seen)
+            """,
+            [(store, k, n, ts, ts) for k, n in zip(df["key"], df["name"])],
+        )
+        known = pd.read_sql_query(
+            "SELECT id, key, first_seen, last_price, last_ppk FROM products WHERE store = ?",
+            conn,
+            params=(store,),
+        )
+        cur = df.merge(known, on="key", how="left")
+        new = cur["first_seen"] == ts
+        changed = new | ~_same(cur["price"], cur["last_price"]) | ~_same(cur["price_per_kg"], cur["last_ppk"])
+        cur = cur[changed.to_numpy()]
+        rows = [
+            (int(i), ts, None if pd.isna(p) else float(p), None if pd.isna(k) else float(k))
+            for i, p, k in zip(cur["id"], cur["price"], cur["price_per_kg"])
+        ]
+        conn.executemany(
+            "INSERT OR REPLACE INTO price_changes (product_id, ts, price, price_per_kg) VALUES (?, ?, ?, ?)",
+            rows,
+        )
+        conn.executemany(
+            """
+            UPDATE products SET
+                last_price = ?3,
+                last_ppk = ?4,
+                min_price_ts = CASE WHEN ?3 < min_price OR min_price IS NULL THEN ?2 ELSE min_price_ts END,
+                min_price = CASE WHEN ?3 < min_price OR min_price IS NULL THEN ?3 ELSE min_price END
+            WHERE id = ?1
+            """,
+            rows,
+        )
+    return len(rows)
+
+
+def rows_to_frame(store, rows):
+    """Filas crudas del scraper -> key, name, price, price_per_kg (limpieza de merge.py)."""
+    from merge import CLEANERS
+
+    clean = CLEANERS[store][0](pd.DataFrame(rows) if not isinstance(rows, pd.DataFrame) else rows)
+    if clean is None or clean.empty:
+        return pd.DataFrame(columns=["key", "name", "price", "price_per_kg"])
+    href = clean["href"] if "href" in clean else pd.Series(None, index=clean.index, dtype=object)
+    return pd.DataFrame(
+        {
+            "key": href.where(href.notna() & (href.astype(str) != ""), clean["name"]),
+            "name": clean["name"],
+            "price": clean["price (€)"],
+            "price_per_kg": clean["price_per_kg"],
+        }
+    )
+
+
+def record_scrape(db_path, store, rows, ts=None, source=None):
+    """
+    Atajo para los scrapers: limpia las filas y las registra. -> nº de cambios.
+    source: fichero crudo escrito con esas filas; se marca como ingerido.
+    """
+    ts = ts or datetime.now()
+    conn = connect(db_path)
+    try:
+        n = record(conn, store, rows_to_frame(store, rows), ts)
+        if source:
+            with conn:
+                conn.execute(
+                    "INSERT OR IGNORE INTO ingested (source, store, ts) VALUES (?, ?, ?)",
+                    (str(Path(source).resolve()), store, _iso(ts)),
+                )
+        return n
+    finally:
+        conn.close()
+
+
+def source_ts(path, df=None):
+    """Instante del scrape: timestamp del nombre, columna scraped_at o mtime."""
+    m = TS_RE.search(Path(path).name)
+    if m:
+        return datetime.strptime(m.group(1), "%Y%m%d-%H%M%S")
+    if df is not None and "scraped_at" in df and len(df):
+        return pd.Timestamp(df["scraped_at"].iloc[0]).to_pydatetime()
+    return datetime.fromtimestamp(Path(path).stat().st_mtime)
+
+
+def ingest(conn, store, raw_dir):
+    """Registra los crudos de `raw_dir` aún no ingeridos, en orden cronológico."""
+    from merge import STORES, raw_files, read_raw
+
+    raw_dir = Path(raw_dir)
+    done = {s for (s,) in conn.execute("SELECT source FROM ingested")}
+    last = conn.execute("SELECT MAX(ts) FROM ingested WHERE store = ?", (store,)).fetchone()[0]
+    todo = []
+    for p in raw_files(raw_dir, STORES[store]):
+        src = p.relative_to(raw_dir).as_posix()
+        if src in done or str(p.resolve()) in done:  # ruta absoluta: lo registró el scraper
+            continue
+        df = read_raw(p)
+        todo.append((source_ts(p, df), src, df))
+    todo.sort(key=lambda t: t[0])
+
+    total = 0
+    for ts, src, df in todo:
+        if last and _iso(ts) < last:
+            # los cambios se guardan en orden: un crudo más antiguo que lo ya ingerido no encaja
+            print(f"⚠️  Saltando {src}: es anterior al último scrape ingerido ({last}).")
+            continue
+        n = record(conn, store, rows_to_frame(store, df), ts)
+        with conn:
+            conn.execute("INSERT INTO ingested (source, store, ts) VALUES (?, ?, ?)", (src, store, _iso(ts)))
+        total += n
+        print(f"📥 {src}: {len(df)} filas | cambios={n}")
+    return total
+
+
+# ---------- CONSULTAS ----------
+def changes(conn, days=7, store=None, now=None):
+    """Cambios de precio en los últimos `days` días (sin contar la primera observación)."""
+    since = _iso((now or datetime.now()) - timedelta(days=days))
+    q = """
+        SELECT p.store, p.name, p.key, c.ts, c.price,
+               (SELECT c2.price FROM price_changes c2
+                 WHERE c2.product_id = c.product_id AND c2.ts < c.ts
+                 ORDER BY c2.ts DESC LIMIT 1) AS prev_price
+        FROM price_changes c JOIN products p ON p.id = c.product_id
+        WHERE c.ts >= ?
+    """
+    params = [since]
+    if store:
+        q += " AND p.store = ?"
+        params.append(store)
+    df = pd.read_sql_query(q, conn, params=params)
+    df = df.dropna(subset=["prev_price"])
+    df = df[~_same(df["price"], df["prev_price"])]
+    df["delta"] = (df["price"] - df["prev_price"]).round(2)
+    return df.sort_values("ts", ascending=False).reset_index(drop=True)
+
+
+def lowest_ever(conn, term=None, store=None, limit=20):
+    """Precio mínimo histórico por producto (columna mantenida al registrar)."""
+    q = "SELECT store, name, key, min_price, min_price_ts, last_price FROM products WHERE min_price IS NOT NULL"
+    params = []
+    if term:
+        q += " AND name LIKE ?"
+        params.append(f"%{term}%")
+    if store:
+        q += " AND store = ?"
+        params.append(store)
+    q += " ORDER BY min_price LIMIT ?"
+    params.append(limit)
+    return pd.read_sql_query(q, conn, params=params)
+
+
+def history(conn, key, store=None):
+    """Serie de cambios de un producto."""
+    q = """
+        SELECT p.store, p.name, c.ts, c.price, c.price_per_kg
+        FROM price_changes c JOIN products p ON p.id = c.product_id
+        WHERE p.key = ?
+    """
+    params = [key]
+    if store:
+        q += " AND p.store = ?"
+        params.append(store)
+    return pd.read_sql_query(q + " ORDER BY c.ts", conn, params=params)
+
+
+def build_parser():
+    p = argparse.ArgumentParser(description="Histórico de precios (solo cambios) en SQLite.")
+    p.add_argument("--db", default=DEFAULT_DB, help=f"Base de datos SQLite (por defecto: {DEFAULT_DB}).")
+    sub = p.add_subparsers(dest="cmd", required=True)
+
+    s = sub.add_parser("ingest", help="Registra los crudos nuevos de una carpeta.")
+    s.add_argument("store", choices=("bonpreu", "dia"))
+    s.add_argument("raw_dir")
+
+    s = sub.add_parser("changes", help="Cambios de precio recientes.")
+    s.add_argument("--days", type=float, default=7)
+    s.add_argument("--store")
+
+    s = sub.add_parser("lowest", help="Precio más bajo registrado.")
+    s.add_argument("term", nargs="?")
+    s.add_argument("--store")
+    s.add_argument("--limit", type=int, default=20)
+
+    s = sub.add_parser("history", help="Serie de precios de un producto (href o nombre).")
+    s.add_argument("key")
+    s.add_argument("--store")
+    return p
+
+
+def main():
+    args = build_parser().parse_args()
+    conn = connect(args.db)
+    try:
+        if args.cmd == "ingest":
+            n = ingest(conn, args.store, args.raw_dir)
+            print(f"✅ {n} cambios de precio registrados en {args.db}")
+            return
+        if args.cmd == "changes":
+            df = changes(conn, days=args.days, store=args.store)
+        elif args.cmd == "lowest":
+            df = lowest_ever(conn, term=args.term, store=args.store, limit=args.limit)
+        else:
+            df = history(conn, args.key, store=args.store)
+        print(df.to_string(index=False) if len(df) else "ℹ️ Sin resultados.")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+# price_parsing.py
+# Parseo vectorizado de precios y tamaños (columnas enteras con .str.extract +
+# aritmética NumPy) compartido por los merges de Bonpreu y DIA.
+
+import numpy as np
+import pandas as pd
+
+# ---------- UNIDADES ----------
+# alias -> (unidad base, factor a la unidad base)
+UNITS = {
+    "kg": ("kg", 1.0),
+    "kgs": ("kg", 1.0),
+    "kilo": ("kg", 1.0),
+    "kilos": ("kg", 1.0),
+    "quilo": ("kg", 1.0),
+    "quilos": ("kg", 1.0),
+    "g": ("kg", 0.001),
+    "gr": ("kg", 0.001),
+    "grs": ("kg", 0.001),
+    "mg": ("kg", 0.000001),
+    "l": ("l", 1.0),
+    "lt": ("l", 1.0),
+    "litre": ("l", 1.0),
+    "litro": ("l", 1.0),
+    "cl": ("l", 0.01),
+    "ml": ("l", 0.001),
+    "ud": ("ud", 1.0),
+    "uds": ("ud", 1.0),
+    "u": ("ud", 1.0),
+    "unitat": ("ud", 1.0),
+    "unitats": ("ud", 1.0),
+    "unidad": ("ud", 1.0),
+    "unidades": ("ud", 1.0),
+}
+
+# alternativas ordenadas de más larga a más corta para que 'kg' gane a 'g', 'ml' a 'l'...
+_UNIT_RE = "|".join(sorted(UNITS, key=len, reverse=True))
+_NUM = r"\d+(?:[.,]\d+)?"
+PACK_RE = rf"(?P<n>\d+)\s*x\s*(?P<qty>{_NUM})\s*(?P<unit>{_UNIT_RE})\b"
+SIZE_RE = rf"(?P<qty>{_NUM})\s*(?P<unit>{_UNIT_RE})\b"
+
+_UNIT_BASE = {k: v[0] for k, v in UNITS.items()}
+_UNIT_FACTOR = {k: v[1] for k, v in UNITS.items()}
+
+
+def _text(s):
+    """Serie de texto en minúsculas y sin NBSP (NaN/None quedan como <NA>)."""
+    return pd.Series(s).astype("string").str.lower().str.replace("\u00a0", " ", regex=False)
+
+
+def _align(s, index):
+    """Columna opcional (None si no existe en el CSV) -> Serie con el índice dado."""
+    return s if isinstance(s, pd.Series) else pd.Series(s, index=index, dtype=object)
+
+
+def _num(s):
+    """
+    '0,5' / '0.5' -> 0.5 (decimal con coma o punto). Un punto seguido de
+    exactamente tres cifras es separador de miles, como en parse_eur:
+    '1.000' -> 1000 ('0.500' sigue siendo 0.5).
+    """
+    s = s.str.replace(r"^([1-9]\d{0,2})\.(\d{3})$", r"\1\2", regex=True)
+    return pd.to_numeric(s.str.replace(",", ".", regex=False), errors="coerce")
+
+
+# ---------- PRECIOS ----------
+def parse_eur(s):
+    """
+    Primer número tipo europeo de cada valor -> float.
+    Ej: '1,95 €' -> 1.95 ; '(4,88 € per quilo)' -> 4.88 ; '1.234,50 €' -> 1234.5
+    """
+    t = _text(s)
+    m = t.str.extract(r"((?:\d{1,3}(?:\.\d{3})*|\d+)(?:[,\.]\d+)?)", expand=False)
+    # quita separador de miles y cambia coma por punto
+    m = m.str.replace(".", "", regex=False).str.replace(",", ".", regex=False)
+    return pd.to_numeric(m, errors="coerce").astype(float)
+
+
+def euro_to_float(s):
+    """Primer número con decimal opcional ('1,95', '1.95') -> float."""
+    m = _text(s).str.extract(rf"({_NUM})", expand=False)
+    return _num(m).astype(float)
+
+
+def ppu_to_float(s):
+    """Precio por kilo explícito ('4,88 €/kg', '4,88 € per quilo') -> float; NaN si no lo dice."""
+    t = _text(s)
+    m = t.str.extract(rf"({_NUM})\s*€\s*(?:/|per)\s*(?:kilo|kg|quilo)", expand=False)
+    return _num(m).astype(float)
+
+
+# ---------- TAMAÑOS ----------
+def parse_size(s):
+    """
+    Cantidad total en unidad base por valor: '2 x 125 g' -> (0.25, 'kg'),
+    '1,5 l' -> (1.5, 'l'), '6 ud' -> (6, 'ud'). DataFrame con columnas qty, unit.
+    """
+    t = _text(s)
+    pack = t.str.extract(PACK_RE)
+    single = t.str.extract(SIZE_RE)
+    is_pack = pack["qty"].notna()
+    n = pd.to_numeric(pack["n"], errors="coerce").where(is_pack, 1.0)
+    qty_raw = pack["qty"].where(is_pack, single["qty"])
+    unit_raw = pack["unit"].where(is_pack, single["unit"])
+    factor = unit_raw.map(_UNIT_FACTOR).astype(float)
+    qty = n.astype(float) * _num(qty_raw).astype(float) * factor
+    return pd.DataFrame({"qty": qty, "unit": unit_raw.map(_UNIT_BASE)}, index=t.index)
+
+
+def kg_from_size(s):
+    """Kg totales a partir del campo 'size' ('500 g', '2 x 0,125kg'); NaN si no es peso."""
+    size = parse_size(s)
+    return size["qty"].where(size["unit"] == "kg").astype(float)
+
+
+# ---------- €/KG ----------
+def price_per_kg_from_cols(price, ppu, size):
+    """
+    Bonpreu: primero el 'price_per_unit' si dice 'per quilo' o '/kg';
+    si no, price / kg_total (derivado de 'size').
+    """
+    price = pd.Series(price)
+    ppu, size = _align(ppu, price.index), _align(size, price.index)
+    ppu_t = _text(ppu)
+    says_kg = (ppu_t.str.contains("quilo", regex=False) | ppu_t.str.contains("/kg", regex=False))
+    from_ppu = parse_eur(ppu).where(says_kg.fillna(False).astype(bool))
+    kg = kg_from_size(size).to_numpy()
+    price_v = parse_eur(price).to_numpy()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        computed = np.where(kg > 0, price_v / kg, np.nan)
+    return from_ppu.fillna(pd.Series(computed, index=from_ppu.index)).astype(float)
+
+
+def price_per_kg_dia(price, ppu, size):
+    """DIA: €/kg explícito del texto; si falta, price / peso (solo si el peso es válido)."""
+    price = pd.Series(price)
+    ppu, size = _align(ppu, price.index), _align(size, price.index)
+    from_ppu = ppu_to_float(ppu)
+    kg = kg_from_size(size).to_numpy()
+    price_v = euro_to_float(price).to_numpy()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        computed = np.where(kg > 0, price_v / kg, np.nan)
+    return from_ppu.fillna(pd.Series(computed, index=from_ppu.index)).astype(float)
@@ -0,0 +1,222 @@
+# product_index.py
+# Índice persistente de productos (SQLite): cada clave de producto (href
+# normalizado y nombre+tamaño normalizados, hasheados a 64 bits) apunta a un id
+# estable que se comparte entre ejecuciones, categorías y pipelines.
+#
+# - Scrapers (--product-index DB): un producto que ya guardó otra categoría en el
+#   mismo crawl no se vuelve a recoger ni a escribir; las filas llevan product_id.
+# - merge.py (--index DB): dedupe en O(n) por product_id en lugar de por nombre.
+#
+#   python product_index.py stats
+#   python product_index.py lookup "https://www.compraonline.bonpreuesclat.cat/products/..."
+#
+# Las dos claves de un producto quedan enlazadas: una fila sin href (CSV antiguos,
+# cards a medio pintar) resuelve por nombre+tamaño al mismo id. Con href manda el
+# href: dos variantes con el mismo nombre y tamaño siguen siendo dos productos.
+
+import argparse
+import hashlib
+import re
+import sqlite3
+import threading
+import unicodedata
+from datetime import datetime
+from urllib.parse import unquote, urlparse
+
+DEFAULT_DB = "product_index.sqlite"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS product_ids (
+    id INTEGER PRIMARY KEY,
+    store TEXT NOT NULL,
+    name TEXT,
+    size TEXT,
+    href TEXT,
+    first_seen TEXT,
+    last_seen TEXT
+);
+CREATE TABLE IF NOT EXISTS product_keys (
+    key_hash INTEGER PRIMARY KEY,
+    product_id INTEGER NOT NULL REFERENCES product_ids(id)
+);
+"""
+
+# SQLite admite como mucho 999 parámetros por consulta en versiones antiguas
+_CHUNK = 900
+
+
+def connect(path=DEFAULT_DB):
+    conn = sqlite3.connect(path, timeout=30)
+    conn.executescript(SCHEMA)
+    return conn
+
+
+# ---------- CLAVES ----------
+def _text(s):
+    """minúsculas, sin acentos y con espacios simples."""
+    s = unicodedata.normalize("NFKD", str(s or ""))
+    s = "".join(c for c in s if not unicodedata.combining(c))
+    return re.sub(r"\s+", " ", s).strip().lower()
+
+
+def _missing(v):
+    return v is None or v != v or str(v).strip() in ("", "nan", "None")
+
+
+def _hash(s):
+    return int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "big", signed=True)
+
+
+def row_hashes(store, row):
+    """
+    Claves hasheadas de una fila: (href, nombre|tamaño); None donde falte el dato.
+    Van por tienda: el mismo producto en dos tiendas es cosa de product_matching.py.
+    """
+    href, name = row.get("href"), row.get("name")
+    h_href = h_name = None
+    if not _missing(href):
+        u = urlparse(str(href).strip())
+        h_href = _hash(f"{store}|href|{u.netloc.lower()}{unquote(u.path).rstrip('/').lower()}")
+    if not _missing(name):
+        size = "" if _missing(row.get("size")) else re.sub(r"\s+", "", _text(row["size"]))
+        h_name = _hash(f"{store}|name|{_text(name)}|{size}")
+    return h_href, h_name
+
+
+# ---------- IDS ----------
+def _lookup(conn, hashes):
+    out = {}
+    hashes = list(hashes)
+    for i in range(0, len(hashes), _CHUNK):
+        part = hashes[i : i + _CHUNK]
+        q = f"SELECT key_hash, product_id FROM product_keys WHERE key_hash IN ({','.join('?' * len(part))})"
+        out.update(conn.execute(q, part).fetchall())
+    return out
+
+
+def assign(conn, store, rows, ts=None):
+    """
+    Id estable de cada fila (dicts con href/name/size), creando los que falten.
+    Una consulta por bloque de claves y un diccionario en memoria: O(n).
+    -> lista de product_id (None si la fila no tiene ni href ni nombre)
+    """
+    ts = ts or datetime.now().isoformat(timespec="seconds")
+    keys = [row_hashes(store, r) for r in rows]
+    known = _lookup(conn, {h for pair in keys for h in pair if h is not None})
+    ids, new_keys = [], []
+    with conn:
+        for r, (h_href, h_name) in zip(rows, keys):
+            pid = known.get(h_href) if h_href is not None else known.get(h_name)
+            if pid is None and (h_href is not None or h_name is not None):
+                pid = conn.execute(
+                    "INSERT INTO product_ids (store, name, size, href, first_seen) VALUES (?, ?, ?, ?, ?)",
+                    (store, *(None if _missing(r.get(c)) else str(r[c]) for c in ("name", "size", "href")), ts),
+                ).lastrowid
+            for h in (h_href, h_name):
+                if h is not None and h not in known:
+                    known[h] = pid  # enlaza la otra clave al mismo id
+                    new_keys.append((h, pid))
+            ids.append(pid)
+        conn.executemany("INSERT OR IGNORE INTO product_keys (key_hash, product_id) VALUES (?, ?)", new_keys)
+        conn.executemany(
+            "UPDATE product_ids SET last_seen = ? WHERE id = ?", [(ts, i) for i in set(ids) if i is not None]
+        )
+    return ids
+
+
+def assign_frame(conn, store, df, ts=None):
+    """assign() para un DataFrame (columnas href, name, size). -> lista de ids alineada con df."""
+    cols = [c for c in ("href", "name", "size") if c in df]
+    return assign(conn, store, df[cols].to_dict("records"), ts)
+
+
+# ---------- DEDUPE DENTRO DE UN CRAWL ----------
+class CrawlIndex:
+    """
+    Productos ya guardados en este crawl (todas las categorías y workers del
+    proceso). known() es una consulta en memoria para el bucle de scroll;
+    claim() se llama al guardar una categoría, así un reintento no pierde filas.
+    """
+
+    def __init__(self, path, store):
+        self.path = path
+        self.store = store
+        self._hashes = set()
+        self._ids = set()
+        self._lock = threading.Lock()
+
+    def known(self, row):
+        h_href, h_name = row_hashes(self.store, row)
+        return (h_href if h_href is not None else h_name) in self._hashes
+
+    def claim(self, rows):
+        """
+        Asigna product_id a las filas y devuelve solo las de productos que aún no
+        guardó otra categoría de este crawl.
+        """
+        with self._lock:
+            conn = connect(self.path)
+            try:
+                ids = assign(conn, self.store, rows)
+            finally:
+                conn.close()
+            out = []
+            for r, pid in zip(rows, ids):
+                if pid is not None and pid in self._ids:
+                    continue
+                if pid is not None:
+                    self._ids.add(pid)
+                self._hashes.update(h for h in row_hashes(self.store, r) if h is not None)
+                out.append(dict(r, product_id=pid))
+            return out
+
+
+_crawls = {}
+_crawls_lock = threading.Lock()
+
+
+def crawl_index(path, store):
+    """El CrawlIndex del proceso para (path, store): lo comparten todos los workers."""
+    with _crawls_lock:
+        return _crawls.setdefault((str(path), store), CrawlIndex(path, store))
+
+
+# ---------- CLI ----------
+def build_parser():
+    p = argparse.ArgumentParser(description="Índice persistente de productos (ids estables).")
+    p.add_argument("--db", default=DEFAULT_DB)
+    sub = p.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("stats", help="Productos y claves por tienda.")
+    s = sub.add_parser("lookup", help="Id de un producto por href (o nombre con --size).")
+    s.add_argument("key", help="href o nombre del producto.")
+    s.add_argument("--store", choices=("bonpreu", "dia"), default="bonpreu")
+    s.add_argument("--size", help="Tamaño (si se busca por nombre).")
+    return p
+
+
+def main():
+    args = build_parser().parse_args()
+    conn = connect(args.db)
+    if args.cmd == "stats":
+        for store, n, first, last in conn.execute(
+            "SELECT store, COUNT(*), MIN(first_seen), MAX(last_seen) FROM product_ids GROUP BY store"
+        ):
+            print(f"📦 {store}: {n} productos (desde {first}, último {last})")
+        print(f"🔑 {conn.execute('SELECT COUNT(*) FROM product_keys').fetchone()[0]} claves")
+        return
+    is_url = args.key.startswith("http")
+    row = {"href": args.key} if is_url else {"name": args.key, "size": args.size}
+    h = row_hashes(args.store, row)[0 if is_url else 1]
+    hit = conn.execute(
+        "SELECT p.id, p.name, p.size, p.href, p.first_seen, p.last_seen FROM product_keys k "
+        "JOIN product_ids p ON p.id = k.product_id WHERE k.key_hash = ?",
+        (h,),
+    ).fetchone()
+    if not hit:
+        print("ℹ️ Producto desconocido.")
+        return
+    print(f"🆔 {hit[0]} | {hit[1]} ({hit[2]}) | {hit[3]} | visto {hit[4]} -> {hit[5]}")
+
+
+if __name__ == "__main__":
+    main()
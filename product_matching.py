@@ -0,0 +1,266 @@
+# product_matching.py
+# Emparejado de productos entre tiendas (Bonpreu <-> DIA): el "mismo producto en
+# la otra tienda" se resuelve una vez y se guarda en una tabla de matches, así
+# las comparaciones posteriores son un join y no una búsqueda difusa.
+#
+#   python product_matching.py Data/Bonpreu/bonpreu_merged_clean.csv Data/DIA/dia_merged_clean.csv
+#
+# - Marca normalizada: las palabras en mayúscula del nombre salvo la inicial
+#   ("Llet sencera PULEVA" -> 'puleva'); las marcas propias de las tiendas
+#   (Bonpreu, Esclat, Dia) cuentan como genéricas para poder compararlas.
+# - Blocking: solo se comparan productos que comparten tamaño y, o bien uno de sus
+#   tokens más raros, o bien la marca -> nada de 20k x 20k comparaciones. Un
+#   producto sin tamaño conocido se compara con los de cualquier tamaño.
+# - Similitud: Jaccard ponderado por IDF de los tokens del nombre (las marcas y
+#   variedades, que son raras, pesan más que "pasta" o "paquete"); dos marcas
+#   conocidas sin nada en común nunca son el mismo producto.
+# - Emparejado 1 a 1 voraz por puntuación.
+# - Incremental: los pares ya emparejados se conservan y salen del juego; los
+#   productos sin pareja se vuelven a evaluar en cada ejecución (un producto nuevo
+#   o un tamaño que antes faltaba puede darles pareja).
+
+import argparse
+import math
+import re
+from collections import Counter, defaultdict
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from price_parsing import parse_size
+from product_search import normalize_text
+from storage import read_table
+
+MATCH_COLUMNS = ["key_a", "key_b", "name_a", "name_b", "size", "score"]
+
+# palabras sin valor para distinguir productos (es/ca) y unidades
+STOPWORDS = {
+    "de", "del", "la", "el", "los", "las", "en", "con", "y", "sin", "para", "a",
+    "i", "amb", "per", "d", "les", "els", "x", "u", "ud", "uds",
+    "g", "gr", "kg", "ml", "cl", "l", "lt", "paquete", "paquet", "bolsa", "bossa", "pack",
+}
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# marcas propias: el producto equivalente de la otra tienda lleva la suya
+STORE_BRANDS = {"bonpreu", "esclat", "dia"}
+
+
+def tokens(name_norm):
+    """Tokens del nombre normalizado sin stopwords, marcas propias ni números sueltos."""
+    return frozenset(
+        t
+        for t in TOKEN_RE.findall(name_norm)
+        if t not in STOPWORDS and t not in STORE_BRANDS and not t.isdigit() and len(t) > 1
+    )
+
+
+def brand_key(name):
+    """
+    Marca normalizada a partir del nombre original: palabras con mayúscula inicial
+    salvo la primera (que suele ser mayúscula por ser la primera), o la primera si
+    va toda en mayúsculas. -> 'puleva' / 'la piara' o None
+    """
+    words = str(name or "").split()
+    caps = [w for k, w in enumerate(words) if w[:1].isupper() and (k > 0 or (w.isupper() and len(w) > 1))]
+    toks = [
+        t
+        for t in TOKEN_RE.findall(normalize_text(" ".join(caps)))
+        if t not in STOPWORDS and t not in STORE_BRANDS and not t.isdigit()
+    ]
+    return " ".join(toks) or None
+
+
+def _same_brand(ba, bb):
+    """Sin marca en algún lado no se descarta nada; con las dos, deben compartir alguna palabra."""
+    return pd.isna(ba) or pd.isna(bb) or bool(set(ba.split()) & set(bb.split()))
+
+
+def prepare(df, store):
+    """
+    Una fila por producto (clave = name_norm) con tokens y tamaño normalizado
+    ('0.5kg', '1l', '6ud'; del campo size si existe, si no del propio nombre).
+    """
+    df = df.copy()
+    if "name_norm" not in df:
+        df["name_norm"] = df["name"].map(normalize_text)
+    size = parse_size(df["name_norm"])
+    if "size" in df:
+        size = parse_size(df["size"]).fillna(size)
+    # solo las filas con tamaño: con el frame vacío (o todo NaN) la suma de columnas
+    # float + str revienta en pandas 3
+    known = size["qty"].notna()
+    df["size_key"] = pd.Series(None, index=df.index, dtype=object)
+    df.loc[known, "size_key"] = (
+        size.loc[known, "qty"].round(3).map("{:g}".format).astype(str) + size.loc[known, "unit"].astype(str)
+    )
+    if "price_per_kg" in df:
+        df = df.sort_values("price_per_kg", na_position="last")
+    df = df.drop_duplicates("name_norm").reset_index(drop=True)
+    return pd.DataFrame(
+        {
+            "store": store,
+            "key": df["name_norm"],
+            "name": df["name"],
+            "size": df["size_key"],
+            "brand": df["name"].map(brand_key),
+            "tokens": df["name_norm"].map(tokens),
+        }
+    )
+
+
+def _idf(*token_lists):
+    df_count = Counter(t for toks in token_lists for ts in toks for t in ts)
+    n = sum(len(toks) for toks in token_lists)
+    return {t: math.log(n / c) + 1.0 for t, c in df_count.items()}
+
+
+def _blocks(prod, idf, n_rare):
+    """
+    clave de bloque -> ids: (tamaño, token raro) para los n_rare tokens más raros
+    y (tamaño, '@marca') si se conoce la marca.
+    """
+    blocks = defaultdict(list)
+    for i, (toks, size, brand) in enumerate(zip(prod["tokens"], prod["size"], prod["brand"])):
+        size = "*" if pd.isna(size) else size
+        for t in sorted(toks, key=lambda t: -idf[t])[:n_rare]:
+            blocks[(size, t)].append(i)
+        if not pd.isna(brand):
+            blocks[(size, "@" + brand)].append(i)
+    return blocks
+
+
+def candidate_pairs(a, b, idf, n_rare=3, max_block=2500):
+    """
+    Pares (i, j) que comparten algún bloque. Se saltan los bloques enormes
+    (token poco discriminante).
+    """
+    ba, bb = _blocks(a, idf, n_rare), _blocks(b, idf, n_rare)
+    # "*" (tamaño desconocido) casa con cualquier tamaño del mismo token
+    b_by_token = defaultdict(list)
+    for (size, t), ids in bb.items():
+        b_by_token[t].extend(ids)
+    pairs = set()
+    for (size, t), ids_a in ba.items():
+        ids_b = b_by_token.get(t, []) if size == "*" else bb.get((size, t), []) + bb.get(("*", t), [])
+        if not ids_b or len(ids_a) * len(ids_b) > max_block:
+            continue
+        pairs.update((i, j) for i in ids_a for j in ids_b)
+    return pairs
+
+
+def similarity(ta, tb, idf):
+    """Jaccard ponderado por IDF."""
+    inter = ta & tb
+    if not inter:
+        return 0.0
+    w_inter = sum(idf[t] for t in inter)
+    return w_inter / (sum(idf[t] for t in ta | tb))
+
+
+def match(a, b, threshold=0.5, **block_kw):
+    """-> DataFrame MATCH_COLUMNS con los pares 1 a 1 (voraz por puntuación)."""
+    idf = _idf(a["tokens"], b["tokens"])
+    ta, tb = a["tokens"].to_numpy(), b["tokens"].to_numpy()
+    brand_a, brand_b = a["brand"].to_numpy(), b["brand"].to_numpy()
+    scored = []
+    for i, j in candidate_pairs(a, b, idf, **block_kw):
+        if not _same_brand(brand_a[i], brand_b[j]):
+            continue
+        s = similarity(ta[i], tb[j], idf)
+        if s >= threshold:
+            scored.append((s, i, j))
+    scored.sort(key=lambda x: (-x[0], x[1], x[2]))
+    used_a, used_b, rows = set(), set(), []
+    for s, i, j in scored:
+        if i in used_a or j in used_b:
+            continue
+        used_a.add(i)
+        used_b.add(j)
+        rows.append(
+            {
+                "key_a": a.at[i, "key"],
+                "key_b": b.at[j, "key"],
+                "name_a": a.at[i, "name"],
+                "name_b": b.at[j, "name"],
+                "size": a.at[i, "size"],
+                "score": round(s, 4),
+            }
+        )
+    return pd.DataFrame(rows, columns=MATCH_COLUMNS)
+
+
+# ---------- TABLA PERSISTIDA ----------
+def load_matches(path):
+    try:
+        return pd.read_csv(path, encoding="utf-8-sig", keep_default_na=False, na_values=[""])
+    except FileNotFoundError:
+        return pd.DataFrame(columns=MATCH_COLUMNS)
+
+
+def update_matches(df_a, df_b, path, store_a="bonpreu", store_b="dia", threshold=0.5, full=False):
+    """
+    Empareja df_a con df_b reutilizando la tabla de `path`: los pares ya resueltos
+    se conservan y solo se evalúan los productos que aún no tienen pareja.
+    Guarda y devuelve la tabla (solo parejas).
+    """
+    a, b = prepare(df_a, store_a), prepare(df_b, store_b)
+    old = pd.DataFrame(columns=MATCH_COLUMNS) if full else load_matches(path)
+    # tablas antiguas guardaban también filas sin pareja: no cuentan como resueltas
+    done = old.dropna(subset=["key_a", "key_b"])
+    matched_a, matched_b = set(done["key_a"]), set(done["key_b"])
+
+    # los ya emparejados salen del juego
+    a = a[~a["key"].isin(matched_a)].reset_index(drop=True)
+    b = b[~b["key"].isin(matched_b)].reset_index(drop=True)
+    found = match(a, b, threshold=threshold)
+    print(f"🔗 sin pareja: {store_a}={len(a)} {store_b}={len(b)} | matches nuevos={len(found)}")
+
+    table = pd.concat([done, found], ignore_index=True)[MATCH_COLUMNS]
+    table.to_csv(path, index=False, encoding="utf-8-sig")
+    return table
+
+
+def compare(df_all, matches, store_a="Bonpreu", store_b="DIA"):
+    """
+    Join de precios sobre la tabla de matches (df_all como en Notebook.ipynb:
+    store, name_norm, price (€), price_per_kg). Una fila por pareja.
+    """
+    pairs = matches.dropna(subset=["key_a", "key_b"])
+    cols = ["name_norm", "price (€)", "price_per_kg"]
+    side_a = df_all.loc[df_all["store"] == store_a, cols].drop_duplicates("name_norm")
+    side_b = df_all.loc[df_all["store"] == store_b, cols].drop_duplicates("name_norm")
+    out = pairs.merge(side_a, left_on="key_a", right_on="name_norm").merge(
+        side_b, left_on="key_b", right_on="name_norm", suffixes=(f" {store_a}", f" {store_b}")
+    )
+    pa, pb = out[f"price (€) {store_a}"], out[f"price (€) {store_b}"]
+    out["cheaper"] = np.where(pa < pb, store_a, np.where(pb < pa, store_b, "="))
+    return out.drop(columns=[f"name_norm {store_a}", f"name_norm {store_b}", "key_a", "key_b"])
+
+
+def build_parser():
+    p = argparse.ArgumentParser(description="Empareja productos entre Bonpreu y DIA y guarda la tabla.")
+    p.add_argument("clean_a", help="Dataset limpio de Bonpreu (CSV o Parquet).")
+    p.add_argument("clean_b", help="Dataset limpio de DIA (CSV o Parquet).")
+    p.add_argument("-o", "--out", default="product_matches.csv", help="Tabla de matches (CSV).")
+    p.add_argument("--threshold", type=float, default=0.5, help="Similitud mínima (0-1).")
+    p.add_argument("--full", action="store_true", help="Ignora la tabla existente y empareja desde cero.")
+    return p
+
+
+def main():
+    args = build_parser().parse_args()
+    cols = ["name", "size", "price_per_kg"]
+    table = update_matches(
+        read_table(args.clean_a, columns=cols),
+        read_table(args.clean_b, columns=cols),
+        Path(args.out),
+        threshold=args.threshold,
+        full=args.full,
+    )
+    n = table.dropna(subset=["key_a", "key_b"]).shape[0]
+    print(f"✅ {n} parejas en {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+# product_search.py
+# Índice invertido de trigramas sobre los nombres normalizados para responder
+# best_for() sin recorrer todo el DataFrame en cada consulta.
+#
+#   idx = ProductIndex(df_all)          # df con name_norm, price (€), price_per_kg
+#   idx.best_for("arroz basmati")
+#   idx.top_k("gnocchi", by="price_per_kg", k=5)
+#
+# Semántica igual que el antiguo str.contains(term): el término normalizado tiene
+# que aparecer tal cual dentro del nombre. Los trigramas solo acotan los candidatos
+# (intersección de posting lists) y después se verifica la subcadena.
+
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+N = 3  # tamaño del n-grama
+
+
+def normalize_text(s) -> str:
+    if pd.isna(s):
+        return ""
+    s = str(s).lower()
+    s = unicodedata.normalize("NFKD", s)
+    s = "".join(ch for ch in s if unicodedata.category(ch) != "Mn")  # quita acentos
+    return s
+
+
+def ngrams(s, n=N):
+    return {s[i : i + n] for i in range(len(s) - n + 1)}
+
+
+class ProductIndex:
+    """
+    Índice sobre los nombres únicos (muchas filas comparten nombre):
+    - postings: trigrama -> array ordenado de ids de nombre
+    - codes: id de nombre de cada fila; order/starts: filas de cada nombre (CSR)
+    - price / ppk / store_codes: arrays alineados con las filas (top-k, cestas)
+    """
+
+    CACHE_SIZE = 1024
+
+    def __init__(
+        self, df, name_col="name_norm", price_col="price (€)", ppk_col="price_per_kg", store_col="store"
+    ):
+        self.df = df.reset_index(drop=True)
+        codes, names = pd.factorize(self.df[name_col].fillna(""), sort=False)
+        self.codes = codes.astype(np.int32)
+        self.names = list(names)
+        self.order = np.argsort(self.codes, kind="stable").astype(np.int32)
+        self.starts = np.searchsorted(self.codes[self.order], np.arange(len(self.names) + 1))
+        self._cache = {}
+        self.price = pd.to_numeric(self.df[price_col], errors="coerce").to_numpy(dtype=float)
+        self.ppk = pd.to_numeric(self.df[ppk_col], errors="coerce").to_numpy(dtype=float)
+        self.display_names = self.df["name"].to_numpy(dtype=object)
+        store = pd.Categorical(self.df[store_col].astype(str))
+        self.stores = list(store.categories)
+        self.store_codes = store.codes.astype(np.int32)
+
+        post = {}
+        for j, name in enumerate(self.names):
+            for g in ngrams(name):
+                post.setdefault(g, []).append(j)
+        # ids añadidos en orden creciente -> arrays ya ordenados
+        self.postings = {g: np.asarray(ids, dtype=np.int32) for g, ids in post.items()}
+
+    def __len__(self):
+        return len(self.df)
+
+    # ---------- BÚSQUEDA ----------
+    def _name_ids(self, q):
+        """Ids de nombre que contienen la subcadena q."""
+        if len(q) < N:
+            # término corto: no hay trigramas, se recorre la lista de nombres únicos
+            return np.asarray([j for j, name in enumerate(self.names) if q in name], dtype=np.int32)
+        lists = []
+        for g in ngrams(q):
+            ids = self.postings.get(g)
+            if ids is None:
+                return np.empty(0, dtype=np.int32)
+            lists.append(ids)
+        lists.sort(key=len)
+        cand = lists[0]
+        for ids in lists[1:]:
+            if not len(cand):
+                break
+            cand = np.intersect1d(cand, ids, assume_unique=True)
+        # los trigramas no garantizan el orden/contigüidad: se verifica la subcadena
+        return np.asarray([j for j in cand if q in self.names[j]], dtype=np.int32)
+
+    def search(self, term, all_words=False):
+        """
+        Posiciones (ordenadas) de las filas cuyo nombre contiene `term`.
+        all_words=True: cada palabra por separado, en cualquier orden.
+        """
+        q = normalize_text(term)
+        key = (q, all_words)
+        if key in self._cache:
+            return self._cache[key]
+        if all_words and len(q.split()) > 1:
+            ids = None
+            for w in q.split():
+                w_ids = self._name_ids(w)
+                ids = w_ids if ids is None else np.intersect1d(ids, w_ids, assume_unique=True)
+        else:
+            ids = self._name_ids(q)
+        if len(ids) < 2048:
+            # pocos nombres: se juntan sus filas desde el CSR
+            parts = [self.order[self.starts[j] : self.starts[j + 1]] for j in ids]
+            rows = np.sort(np.concatenate(parts)).astype(np.intp) if parts else np.empty(0, dtype=np.intp)
+        else:
+            hit = np.zeros(len(self.names), dtype=bool)
+            hit[ids] = True
+            rows = np.flatnonzero(hit[self.codes])  # ya en orden de fila
+        if len(self._cache) >= self.CACHE_SIZE:
+            self._cache.clear()
+        self._cache[key] = rows
+        return rows
+
+    def top_k(self, term, by="price_per_kg", k=5, largest=False, all_words=False):
+        """Las k filas más baratas (o caras) de la búsqueda según precio o €/kg."""
+        rows = self.search(term, all_words=all_words)
+        vals = (self.ppk if by == "price_per_kg" else self.price)[rows]
+        ok = ~np.isnan(vals)
+        rows, vals = rows[ok], vals[ok]
+        if largest:
+            vals = -vals
+        if len(rows) > k:
+            part = np.argpartition(vals, k)[:k]
+            rows, vals = rows[part], vals[part]
+        return self.df.iloc[rows[np.argsort(vals, kind="stable")]]
+
+    # ---------- best_for ----------
+    def _row(self, criterio, i):
+        ppk = self.ppk[i]
+        return {
+            "criterio": criterio,
+            "store": self.df.at[i, "store"],
+            "name": self.df.at[i, "name"],
+            "price (€)": round(float(self.price[i]), 2),
+            "price_per_kg": None if np.isnan(ppk) else round(float(ppk), 2),
+        }
+
+    def best_for(self, term):
+        """Mínimo/máximo precio y €/kg entre los productos que contienen `term`."""
+        rows = self.search(term)
+        if not len(rows):
+            return pd.DataFrame([{"criterio": "sin coincidencias", "store": None, "name": "(ninguno)"}])
+
+        out = []
+        for criterio_min, criterio_max, vals in (
+            ("mínimo precio", "máximo precio", self.price[rows]),
+            ("mínimo €/kg", "máximo €/kg", self.ppk[rows]),
+        ):
+            if np.isnan(vals).all():
+                continue
+            # nanargmin/nanargmax devuelven la primera aparición, como idxmin/idxmax
+            out += [
+                self._row(criterio_min, rows[np.nanargmin(vals)]),
+                self._row(criterio_max, rows[np.nanargmax(vals)]),
+            ]
+
+        if not out:
+            return pd.DataFrame([{"criterio": "sin precios válidos", "store": None, "name": "(ninguno)"}])
+        return pd.DataFrame(out)
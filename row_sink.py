@@ -0,0 +1,140 @@
+# row_sink.py
+# Salida en streaming para scrapes largos: las filas se añaden a un fichero
+# append-only (JSONL o CSV) a medida que aparecen y un checkpoint guarda la
+# posición de scroll. Si el navegador se cae, la siguiente ejecución reabre el
+# mismo fichero, recupera las claves ya escritas y sigue desde el checkpoint.
+
+import csv
+import json
+import os
+import tempfile
+from datetime import datetime
+from pathlib import Path
+
+
+def row_key(r):
+    """Misma clave que usa el scraper para deduplicar cards."""
+    return r.get("href") or f"{r.get('name') or ''}|{r.get('size') or ''}"
+
+
+class RowSink:
+    """
+    Fichero append-only con las filas ya descubiertas.
+    - fmt: 'jsonl' o 'csv' (por defecto según la extensión)
+    - keys: claves ya escritas (se recuperan del fichero al reabrir)
+    En memoria solo quedan las claves, no las filas.
+    """
+
+    def __init__(self, path, fmt=None, fields=None):
+        self.path = Path(path)
+        self.fmt = fmt or ("csv" if self.path.suffix == ".csv" else "jsonl")
+        self.fields = list(fields) if fields else None
+        self.keys = set()
+        self.resumed = 0
+        if self.path.exists():
+            for r in self._read():
+                self.keys.add(row_key(r))
+            self.resumed = len(self.keys)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._f = open(self.path, "a", encoding="utf-8", newline="")
+        self._writer = None
+        if self.fmt == "jsonl" and self.path.stat().st_size and not self._ends_with_newline():
+            self._f.write("\n")  # cierra la línea cortada para no pegarle la siguiente fila
+
+    def _ends_with_newline(self):
+        with open(self.path, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b"\n"
+
+    def _read(self):
+        with open(self.path, encoding="utf-8", newline="") as f:
+            if self.fmt == "csv":
+                reader = csv.DictReader(f)
+                self.fields = self.fields or reader.fieldnames
+                yield from reader
+                return
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    # última línea a medio escribir si el proceso murió: se descarta
+                    continue
+
+    def add(self, rows):
+        """Escribe las filas nuevas (por clave). -> nº de filas nuevas."""
+        n = 0
+        for r in rows:
+            k = row_key(r)
+            if not k or k in self.keys:
+                continue
+            self.keys.add(k)
+            if self.fmt == "csv":
+                if self._writer is None:
+                    self.fields = self.fields or list(r)
+                    self._writer = csv.DictWriter(self._f, fieldnames=self.fields, extrasaction="ignore")
+                    if self._f.tell() == 0:
+                        self._writer.writeheader()
+                self._writer.writerow(r)
+            else:
+                self._f.write(json.dumps(r, ensure_ascii=False) + "\n")
+            n += 1
+        if n:
+            self._f.flush()
+        return n
+
+    def sync(self):
+        """Fuerza a disco lo escrito (se llama en cada checkpoint)."""
+        self._f.flush()
+        os.fsync(self._f.fileno())
+
+    def rows(self):
+        """Relee todas las filas del fichero (al final del scrape)."""
+        self._f.flush()
+        return list(self._read())
+
+    def __len__(self):
+        return len(self.keys)
+
+    def close(self):
+        if not self._f.closed:
+            self._f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# ---------- CHECKPOINTS ----------
+def checkpoint_path(sink_path):
+    return Path(str(sink_path) + ".ckpt.json")
+
+
+def load_checkpoint(path):
+    try:
+        return json.loads(Path(path).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+
+def save_checkpoint(path, state):
+    """Guarda el estado (loop, posición de scroll...) de forma atómica (tmp + rename)."""
+    path = Path(path)
+    state = dict(state, ts=datetime.now().isoformat(timespec="seconds"))
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=path.name, suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def clear(sink_path):
+    """Borra el fichero parcial y su checkpoint tras un scrape completo."""
+    for p in (Path(sink_path), checkpoint_path(sink_path)):
+        try:
+            p.unlink()
+        except FileNotFoundError:
+            pass
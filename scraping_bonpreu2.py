@@ -1,21 +1,45 @@
 # scraping_bonpreu.py
-# pip install undetected-chromedriver==3.5.5 selenium==4.23.1 pandas
+# pip install undetected-chromedriver==3.5.5 selenium==4.23.1 pandas requests
+# (opcional) pip install pyarrow   # --format parquet
 
 import argparse
+import hashlib
+import json
 import random
 import re
 import sys
+import threading
 import time
 from datetime import datetime
+from pathlib import Path
 from urllib.parse import unquote, urlparse
 
-import pandas as pd
 import undetected_chromedriver as uc
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.ui import WebDriverWait as W
 
+import bonpreu_http
+import browser_daemon
+import category_discovery
+import consent
+import crawl_metrics
+import lean_browser
+import price_history
+import product_index
+import row_sink
+from crawl_pool import TAB_ARGS, read_urls, run_pool, run_tabs
+from scroll_policy import FixedPolicy, make_policy, read_expected_total
+from site_profile import load_profile, save_profile
+from storage import FORMATS, write_raw
+
 BASE = "https://www.compraonline.bonpreuesclat.cat"
+# localhost/127.0.0.1 se aceptan para probar contra páginas de fixture servidas en local
+ALLOWED_HOSTS = ("compraonline.bonpreuesclat.cat", "localhost", "127.0.0.1")
+# Huellas de cada categoría (última ejecución completa) para --skip-unchanged
+FINGERPRINTS = Path(__file__).with_name("bonpreu_fingerprints.json")
+# Estrategia de banner y cookies de consentimiento aprendidas por host
+CONSENT_PROFILE = Path(__file__).with_name(consent.CONSENT_PROFILE)
 
 
 # ---------- CLI ----------
@@ -25,16 +49,112 @@ def build_parser():
     )
     p.add_argument(
         "url",
-        help="URL de la categoría (pega aquí la URL con %XX o acentos, da igual).",
+        nargs="*",
+        help="URL(s) de la categoría (pega aquí la URL con %%XX o acentos, da igual).",
     )
     p.add_argument(
         "-o",
         "--out",
-        help="Ruta del CSV de salida. Si no se indica, se genera automáticamente.",
+        help="Ruta del CSV de salida (solo con una URL). Si no se indica, se genera automáticamente.",
+    )
+    p.add_argument(
+        "--urls-file",
+        action="append",
+        default=[],
+        help="Fichero con URLs de categorías (una por línea, # para comentarios). Repetible.",
+    )
+    p.add_argument(
+        "--out-dir",
+        default=".",
+        help="Carpeta donde guardar los CSV en modo batch, o raíz del dataset Parquet (por defecto: actual).",
+    )
+    p.add_argument(
+        "--format",
+        choices=FORMATS,
+        default="csv",
+        help="Formato de salida: 'csv' o 'parquet' (particionado por tienda/categoría/fecha).",
+    )
+    p.add_argument(
+        "--history",
+        metavar="DB",
+        help="Registra además los precios en el histórico SQLite (price_history.py), solo los cambios.",
+    )
+    p.add_argument(
+        "--product-index",
+        metavar="DB",
+        help="Índice SQLite de productos (product_index.py): ids estables y sin repetir productos entre categorías.",
+    )
+    p.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Nº de navegadores en paralelo; cada uno reutiliza su sesión entre categorías (por defecto: 1).",
+    )
+    p.add_argument(
+        "--discover",
+        action="store_true",
+        help="Añade todas las categorías hoja de la tienda (árbol de category_discovery.py, en caché).",
+    )
+    p.add_argument(
+        "--discover-match",
+        metavar="REGEX",
+        help="Con --discover, solo las categorías cuya ruta casa con REGEX (p.ej. '^frescos/').",
+    )
+    p.add_argument(
+        "--discover-max-age",
+        type=float,
+        default=24,
+        help="Horas de validez del árbol de categorías en caché (por defecto: 24).",
+    )
+    p.add_argument(
+        "--tabs",
+        type=int,
+        default=0,
+        metavar="N",
+        help="[browser] Un solo Chrome con una pestaña por categoría y N pestañas precargándose por delante (ignora --workers).",
+    )
+    p.add_argument(
+        "--retries",
+        type=int,
+        default=2,
+        help="Reintentos por categoría si falla el scraping (por defecto: 2).",
+    )
+    p.add_argument(
+        "--engine",
+        choices=("browser", "http"),
+        default="browser",
+        help="Motor: 'browser' (Chrome + scroll) o 'http' (sin navegador, pide los listados directamente).",
+    )
+    p.add_argument(
+        "--api-template",
+        help="[http] Plantilla del endpoint JSON del front-end ({url}, {path}, {page}). Por defecto pagina la URL con ?page=N.",
+    )
+    p.add_argument(
+        "--max-pages",
+        type=int,
+        default=100,
+        help="[http] Máximo de páginas por categoría (por defecto: 100).",
     )
     p.add_argument(
         "--headless", action="store_true", help="Ejecutar Chrome en modo headless."
     )
+    p.add_argument(
+        "--attach",
+        nargs="?",
+        const=str(browser_daemon.DEFAULT_STATE),
+        metavar="STATE",
+        help="[browser] Usa un Chrome ya caliente de browser_daemon.py en lugar de lanzar uno (STATE: su fichero de estado).",
+    )
+    p.add_argument(
+        "--lean",
+        action="store_true",
+        help="[browser] Chrome ligero: bloquea imágenes, vídeo, fuentes y trackers (CDP) y muestra el tráfico por categoría.",
+    )
+    p.add_argument(
+        "--net-report",
+        action="store_true",
+        help="[browser] Muestra el tráfico de red por categoría sin bloquear nada (para comparar con --lean).",
+    )
     p.add_argument(
         "--max-loops",
         type=int,
@@ -47,6 +167,70 @@ def build_parser():
         default=100,  # ↓ paso más fino por defecto
         help="Paso de scroll en píxeles (por defecto: 100).",
     )
+    p.add_argument(
+        "--capture",
+        choices=("poll", "observer"),
+        default="poll",
+        help="[browser] Captura: 'poll' (re-parsea el DOM en cada paso) u 'observer' (MutationObserver, solo el delta).",
+    )
+    p.add_argument(
+        "--policy",
+        choices=("fixed", "adaptive"),
+        default="fixed",
+        help="[browser] Política de scroll: 'fixed' (heurística clásica) o 'adaptive' (paso/espera según latencia y corte al total declarado).",
+    )
+    p.add_argument(
+        "--trace-dir",
+        help="[browser] Guarda la traza de scroll de cada categoría (JSON) para scroll_sim.py.",
+    )
+    p.add_argument(
+        "--skip-unchanged",
+        action="store_true",
+        help="[browser] Si la huella de la categoría (total, primeras cards, contenido del primer viewport) no ha cambiado desde la última ejecución, no la re-scrollea.",
+    )
+    p.add_argument(
+        "--fingerprints",
+        default=str(FINGERPRINTS),
+        help="[browser] Fichero JSON con las huellas por categoría (por defecto junto al script).",
+    )
+    p.add_argument(
+        "--consent-profile",
+        default=str(CONSENT_PROFILE),
+        help="[browser] JSON con la estrategia de cookies y las cookies de consentimiento por host.",
+    )
+    p.add_argument(
+        "--consent-budget",
+        type=float,
+        default=3.0,
+        help="[browser] Segundos máximos esperando el banner de cookies (por defecto: 3).",
+    )
+    p.add_argument(
+        "--max-age",
+        type=float,
+        default=168,
+        help="[browser] Horas tras las que se re-scrapea completa aunque la huella no cambie (por defecto: 168).",
+    )
+    p.add_argument(
+        "--stream",
+        action="store_true",
+        help="[browser] Escribe las filas en un .partial.jsonl a medida que aparecen, con checkpoints de scroll; si se cae el navegador, el reintento continúa donde se quedó.",
+    )
+    p.add_argument(
+        "--checkpoint-every",
+        type=int,
+        default=10,
+        help="[browser] Con --stream, loops entre checkpoints (por defecto: 10).",
+    )
+    p.add_argument(
+        "--report",
+        metavar="PATH.json",
+        help="Guarda un informe JSON de la ejecución (tiempo por fase, llamadas WebDriver, contadores).",
+    )
+    p.add_argument(
+        "--prom",
+        metavar="PATH",
+        help="Vuelca las mismas métricas en formato de texto Prometheus (textfile collector).",
+    )
     p.add_argument(
         "--passes",
         type=int,
@@ -56,9 +240,9 @@ def build_parser():
     return p
 
 
-def safe_slug_from_url(url: str) -> str:
+def category_label_from_url(url: str) -> str:
     """
-    Intenta crear un nombre legible para el CSV a partir de la URL de la categoría.
+    Etiqueta legible de la categoría a partir de su URL (p.ej. 'arros', 'pasta-seca').
     """
     path = unquote(urlparse(url).path)  # decodifica %XX
     # Tomamos el último segmento "no-uuid" como etiqueta (p.ej. 'arròs' o 'pasta-seca')
@@ -77,12 +261,23 @@ def safe_slug_from_url(url: str) -> str:
     label = re.sub(r"\s+", "-", label.lower())
     label = re.sub(r"[^a-z0-9\-]+", "-", label)  # quita acentos/símbolos
     label = re.sub(r"-+", "-", label).strip("-")
+    return label
+
+
+def safe_slug_from_url(url: str) -> str:
+    """
+    Intenta crear un nombre legible para el CSV a partir de la URL de la categoría.
+    El hash corto de la URL evita que dos categorías con la misma etiqueta que
+    acaban en el mismo segundo se pisen el fichero.
+    """
+    label = category_label_from_url(url)
     ts = datetime.now().strftime("%Y%m%d-%H%M%S")
-    return f"bonpreu_{label}_{ts}.csv"
+    return f"bonpreu_{label}_{ts}_{category_discovery.url_hash(url)}.csv"
 
 
 # ---------- DRIVER ----------
-def setup_driver(headless=False):
+def setup_driver(headless=False, lean=False, net_report=False, user_data_dir=None):
+    """user_data_dir: perfil persistente (lo usa browser_daemon.py); None = perfil temporal."""
     opts = uc.ChromeOptions()
     if headless:
         opts.add_argument("--headless=new")
@@ -94,7 +289,21 @@ def setup_driver(headless=False):
     opts.add_argument(
         "user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/127.0 Safari/537.36"
     )
-    d = uc.Chrome(options=opts)
+    for a in TAB_ARGS:  # pestañas en segundo plano sin throttling (modo --tabs)
+        opts.add_argument(a)
+    if lean:
+        lean_browser.apply_lean_options(opts)
+    elif net_report:
+        opts.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+    d = uc.Chrome(options=opts, user_data_dir=user_data_dir)
+    prepare_tab(d, lean)
+    return d
+
+
+def prepare_tab(d, lean=False):
+    """Ajustes CDP que van por pestaña: bloqueo de recursos (lean) y navigator.webdriver."""
+    if lean:
+        lean_browser.enable_blocking(d)
     try:
         d.execute_cdp_cmd(
             "Page.addScriptToEvaluateOnNewDocument",
@@ -104,49 +313,6 @@ def setup_driver(headless=False):
         )
     except Exception:
         pass
-    return d
-
-
-# ---------- COOKIES ----------
-def accept_cookies(d, timeout=15):
-    w = W(d, timeout)
-    xpaths = [
-        '//*[@id="onetrust-accept-btn-handler"]',
-        '//*[@data-testid="uc-accept-all-button"]',
-        '//button[contains(.,"Acceptar-ho tot")]',
-        '//button[contains(.,"Acceptar")]',
-        '//button[contains(.,"Accept all")]',
-    ]
-    for xp in xpaths:
-        try:
-            w.until(EC.element_to_be_clickable((By.XPATH, xp))).click()
-            time.sleep(1)
-            print("✅ Cookies aceptadas.")
-            return
-        except Exception:
-            pass
-    # iframes
-    try:
-        ifs = d.find_elements(
-            By.CSS_SELECTOR,
-            'iframe[src*="consent"],iframe[id*="consent"],iframe[src*="cmp"],iframe[id*="ot-"],iframe[src*="didomi"]',
-        )
-        for fr in ifs:
-            d.switch_to.frame(fr)
-            for xp in xpaths:
-                try:
-                    btn = d.find_element(By.XPATH, xp)
-                    btn.click()
-                    time.sleep(1)
-                    d.switch_to.default_content()
-                    print("✅ Cookies aceptadas (iframe).")
-                    return
-                except Exception:
-                    pass
-            d.switch_to.default_content()
-    except Exception:
-        d.switch_to.default_content()
-    print("ℹ️ Sin banner de cookies (seguimos).")
 
 
 # ---------- HELPERS ----------
@@ -154,30 +320,32 @@ def get_base_url(d):
     return d.execute_script("return location.origin;")
 
 
+@crawl_metrics.timed("settle")
 def wait_skeletons_settle(d, timeout=8.0, poll=0.25):
+    """Espera a que no queden skeletons (o dejen de cambiar). -> (segundos, skeletons)"""
     t0 = time.time()
     last = -1
     stable = 0
+    sk = 0
     while time.time() - t0 < timeout:
         sk = len(d.find_elements(By.CSS_SELECTOR, '[data-test="fop-skeleton"]'))
         if sk == 0:
-            return
+            break
         if sk == last:
             stable += 1
         else:
             stable = 0
             last = sk
         if stable >= 3:
-            return
+            break
         time.sleep(poll)
+    return time.time() - t0, sk
 
 
-def parse_cards_in_dom(d, BASE):
-    js = r"""
-      const BASE = arguments[0];
-      const cards = Array.from(document.querySelectorAll('[data-retailer-anchor="fop"]'));
+# JS compartido: convierte una card [data-retailer-anchor="fop"] en fila
+CARD_ROW_JS = r"""
       const norm = s => s ? s.trim().replace(/\u00A0/g,' ') : null;
-      return cards.map(c=>{
+      const cardRow = (c, BASE) => {
         const A = c.querySelector('a[data-test="fop-product-link"][aria-hidden="false"]')
               || c.querySelector('a[data-test="fop-product-link"]');
         const hrefRaw = A ? A.getAttribute('href') : null;
@@ -193,14 +361,157 @@ def parse_cards_in_dom(d, BASE):
           size: norm(size && size.textContent),
           href: link
         };
-      }).filter(x => x.name || x.price);
+      };
+"""
+
+
+@crawl_metrics.timed("parse")
+def parse_cards_in_dom(d, BASE):
+    js = (
+        r"""
+      const BASE = arguments[0];
+      const cards = Array.from(document.querySelectorAll('[data-retailer-anchor="fop"]'));
+"""
+        + CARD_ROW_JS
+        + r"""
+      return cards.map(c => cardRow(c, BASE)).filter(x => x.name || x.price);
     """
+    )
     try:
         return d.execute_script(js, BASE) or []
     except Exception:
         return []
 
 
+@crawl_metrics.timed("parse")
+def parse_new_cards_in_dom(d, BASE, reset=False):
+    """
+    Como parse_cards_in_dom, pero la página guarda un set de claves ya enviadas
+    (window.__bpSeen) y solo devuelve las cards nuevas: el payload por loop es
+    proporcional a lo nuevo y no a todo lo visible.
+    -> (filas_nuevas, total_cards_en_dom)
+    """
+    js = (
+        r"""
+      const BASE = arguments[0];
+      if (arguments[1] || !window.__bpSeen) window.__bpSeen = new Set();
+      const seen = window.__bpSeen;
+      const cards = Array.from(document.querySelectorAll('[data-retailer-anchor="fop"]'));
+"""
+        + CARD_ROW_JS
+        + r"""
+      const rows = [];
+      for (const c of cards) {
+        const r = cardRow(c, BASE);
+        if (!(r.name || r.price)) continue;
+        const k = r.href || `${r.name || ''}|${r.size || ''}`;
+        if (seen.has(k)) continue;
+        seen.add(k);
+        rows.push(r);
+      }
+      return { rows, total: cards.length };
+    """
+    )
+    try:
+        res = d.execute_script(js, BASE, reset) or {}
+        return res.get("rows") or [], res.get("total") or 0
+    except Exception:
+        return [], 0
+
+
+# ---------- CAPTURA POR EVENTOS ----------
+# Un MutationObserver va acumulando en window.__bpCap las cards que se renderizan;
+# Python solo recoge el delta (una llamada por paso) en vez de re-parsear todo el DOM.
+OBSERVER_INSTALL_JS = (
+    r"""
+      const BASE = arguments[0];
+"""
+    + CARD_ROW_JS
+    + r"""
+      if (window.__bpCap) { window.__bpCap.obs.disconnect(); }
+      const cap = { buf: [], seen: new Set(), pending: new Map(), lastMut: Date.now(), obs: null };
+      const keyOf = r => r.href || `${r.name || ''}|${r.size || ''}`;
+      const take = c => {
+        const r = cardRow(c, BASE);
+        if (!(r.name || r.price)) return;
+        const k = keyOf(r);
+        if (cap.seen.has(k)) return;
+        // Card a medio pintar (sin precio): esperamos a que se complete
+        if (!(r.name && r.price)) { cap.pending.set(k, r); return; }
+        cap.pending.delete(k);
+        cap.seen.add(k);
+        cap.buf.push(r);
+      };
+      const SEL = '[data-retailer-anchor="fop"]';
+      const scan = n => {
+        if (n.nodeType !== 1) n = n.parentElement;
+        if (!n) return;
+        const own = n.closest(SEL);
+        if (own) { take(own); return; }
+        n.querySelectorAll(SEL).forEach(take);
+      };
+      cap.obs = new MutationObserver(muts => {
+        cap.lastMut = Date.now();
+        for (const m of muts) {
+          scan(m.target);
+          m.addedNodes.forEach(scan);
+        }
+      });
+      cap.obs.observe(document.body, { childList: true, subtree: true, characterData: true });
+      document.querySelectorAll(SEL).forEach(take);
+      window.__bpCap = cap;
+      return true;
+    """
+)
+
+OBSERVER_STEP_JS = r"""
+      const [mode, px, quietMs, maxWaitMs, final] = Array.prototype.slice.call(arguments, 0, 5);
+      const done = arguments[arguments.length - 1];
+      const cap = window.__bpCap;
+      const grid = document.querySelector('[data-retailer-anchor="product-list"]');
+      const el = grid || document.scrollingElement || document.documentElement;
+      if (mode === 'top') { el.scrollTo(0, 0); }
+      else if (mode === 'bottom') { el.scrollTo(0, el.scrollHeight); }
+      else if (px) { el.scrollBy(0, px); if (px > 0) el.scrollBy(0, -40); }  // rebote
+      if (px || mode !== 'by') cap.lastMut = Date.now();
+      const t0 = Date.now();
+      const skeletons = () => document.querySelectorAll('[data-test="fop-skeleton"]').length;
+      const tick = () => {
+        const now = Date.now();
+        const quiet = now - cap.lastMut;
+        const sk = skeletons();
+        // Listo si no hay skeletons y el DOM está quieto; o si lleva 3×quiet sin cambios
+        if ((sk === 0 && quiet >= quietMs) || quiet >= 3 * quietMs || now - t0 >= maxWaitMs) {
+          if (final) { cap.pending.forEach((r, k) => { cap.seen.add(k); cap.buf.push(r); }); cap.pending.clear(); }
+          const atBottom = grid
+            ? Math.ceil(grid.scrollTop + grid.clientHeight) >= grid.scrollHeight
+            : Math.ceil(window.scrollY + window.innerHeight) >= document.body.scrollHeight;
+          done({ rows: cap.buf.splice(0), total: cap.seen.size, skeletons: sk, atBottom, waited: now - t0 });
+          return;
+        }
+        setTimeout(tick, 50);
+      };
+      tick();
+"""
+
+
+def install_card_observer(d, BASE):
+    d.execute_script(OBSERVER_INSTALL_JS, BASE)
+
+
+@crawl_metrics.timed("observer_step")
+def observer_step(d, mode="by", px=0, quiet_ms=300, max_wait_ms=4000, final=False):
+    """
+    Un único round-trip: scroll (by/top/bottom), espera en la página a que el DOM
+    se asiente y devuelve solo las cards nuevas.
+    -> {rows, total, skeletons, atBottom, waited}
+    """
+    try:
+        return d.execute_async_script(OBSERVER_STEP_JS, mode, px, quiet_ms, max_wait_ms, final)
+    except Exception:
+        return {"rows": [], "total": 0, "skeletons": 0, "atBottom": False, "waited": 0}
+
+
 def micro_scroll(d, container, step=180):
     d.execute_script("arguments[0].scrollBy(0, arguments[1]);", container, step)
     d.execute_script("arguments[0].scrollBy(0, -40);", container)
@@ -219,9 +530,9 @@ def scroll_products(d, passes=3):
                 "arguments[0].scrollTop = arguments[0].scrollHeight;", grid
             )
         d.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-        time.sleep(random.uniform(1.0, 1.6))
+        crawl_metrics.sleep(random.uniform(1.0, 1.6))
         d.execute_script("window.scrollBy(0, -200);")
-        time.sleep(random.uniform(0.2, 0.5))
+        crawl_metrics.sleep(random.uniform(0.2, 0.5))
         n = len(d.find_elements(By.CSS_SELECTOR, '[data-retailer-anchor="fop"]'))
         print(f"🧮 Scroll {i}: {n} productos visibles")
         if n == last:
@@ -229,6 +540,7 @@ def scroll_products(d, passes=3):
         last = n
 
 
+@crawl_metrics.timed("scroll")
 def robust_scroll_and_collect(
     d,
     step_px=140,
@@ -236,6 +548,14 @@ def robust_scroll_and_collect(
     max_total_loops=1200,
     no_growth_rounds=6,
     bottom_passes=3,
+    capture="poll",
+    policy=None,
+    expected_total=None,
+    trace=None,
+    sink=None,
+    checkpoint=None,
+    checkpoint_every=10,
+    known=None,
 ):
     """
     Scroller robusto para listas virtualizadas.
@@ -244,16 +564,27 @@ def robust_scroll_and_collect(
     - max_total_loops: tope duro de seguridad
     - no_growth_rounds: cuántas rondas seguidas sin crecer para cortar
     - bottom_passes: nº de “barridos de fondo” para forzar la última carga
+    - capture: "poll" (sleep + re-parseo del DOM en cada paso) u "observer"
+      (MutationObserver en la página; cada paso es un único round-trip con el delta)
+    - policy: política de scroll (scroll_policy); por defecto FixedPolicy con los
+      parámetros anteriores
+    - expected_total: total de productos esperado; si no se da, se lee de la cabecera
+    - trace: lista opcional donde se anotan los pasos (para scroll_sim.py)
+    - sink: row_sink.RowSink; las filas se escriben a disco según aparecen y en
+      memoria solo quedan las claves
+    - checkpoint: ruta del checkpoint (loop y posición de scroll); si existe, se
+      avanza directamente a esa posición y se continúa desde ahí
+    - known: known(row) -> True si el producto ya lo guardó otra categoría del
+      crawl (product_index); no se recoge, pero cuenta como visto para cortar
     """
     BASE = get_base_url(d)
+    observer = capture == "observer"
+    if policy is None:
+        policy = FixedPolicy(step_px, idle_wait, no_growth_rounds, bottom_passes)
+    if expected_total is None:
+        expected_total = read_expected_total(d)
     collected = {}
-    last_unique = 0
-    rounds_no_growth = 0
-    touched_bottom = 0
-
-    # --- ventana de crecimiento para "meseta"
-    growth_window = 20
-    uniques_history = []
+    skipped = set()  # claves de productos que ya tiene el crawl (known)
 
     # Detecta contenedor scrolleable
     try:
@@ -285,107 +616,185 @@ def robust_scroll_and_collect(
             "return Math.ceil(window.scrollY + window.innerHeight) >= document.body.scrollHeight;"
         )
 
+    def collect(snap):
+        if known is not None:
+            fresh = []
+            for r in snap:
+                if known(r):
+                    skipped.add(row_sink.row_key(r))
+                else:
+                    fresh.append(r)
+            crawl_metrics.inc("known_skipped", len(snap) - len(fresh))
+            snap = fresh
+        if sink is not None:
+            crawl_metrics.inc("duplicates", len(snap) - sink.add(snap))
+            return
+        for r in snap:
+            key = r["href"] or f"{r.get('name', '')}|{r.get('size', '')}"
+            if key and key not in collected:
+                collected[key] = r
+            else:
+                crawl_metrics.inc("duplicates")
+
+    def n_uniques():
+        return (len(sink) if sink is not None else len(collected)) + len(skipped)
+
+    def scroll_pos():
+        if grid:
+            return d.execute_script("return arguments[0].scrollTop;", grid) or 0
+        return d.execute_script("return window.scrollY;") or 0
+
+    def scroll_to(y):
+        if grid:
+            d.execute_script("arguments[0].scrollTo(0, arguments[1]);", grid, y)
+        else:
+            d.execute_script("window.scrollTo(0, arguments[0]);", y)
+
+    last_step = {"atBottom": False}
+
+    def obs_step(mode="by", px=0, final=False):
+        # ms de DOM quieto que damos por "asentado"
+        quiet_ms = int(policy.wait_time() * 1000)
+        res = observer_step(d, mode, px, quiet_ms=quiet_ms, final=final)
+        collect(res["rows"])
+        last_step.update(res, quiet_ms=quiet_ms)
+        return res["rows"]
+
     # Arranca en el top y captura inicial
-    scroll_top()
-    time.sleep(0.8)
-    wait_skeletons_settle(d)
+    if observer:
+        install_card_observer(d, BASE)
+        snap = obs_step("top")
+    else:
+        scroll_top()
+        crawl_metrics.sleep(0.8)
+        wait_skeletons_settle(d)
+        snap, _ = parse_new_cards_in_dom(d, BASE, reset=True)
+        collect(snap)
+    print(f"📸 Inicial: viewport={len(snap)} | únicos={n_uniques()}")
+    if expected_total:
+        print(f"🎯 Total declarado por la categoría: {expected_total}")
+
+    # Reanudación: saltos grandes hasta la posición del checkpoint (la lista se va
+    # cargando por el camino), capturando lo que aparezca
+    first_loop = 1
+    state = row_sink.load_checkpoint(checkpoint) if checkpoint else None
+    if state and state.get("scroll_y"):
+        target = state["scroll_y"]
+        for _ in range(60):
+            scroll_to(target)
+            wait_skeletons_settle(d)
+            if observer:
+                obs_step("by", 0)
+            else:
+                collect(parse_new_cards_in_dom(d, BASE)[0])
+            if scroll_pos() >= target - 10:
+                break
+        first_loop = state.get("loop", 0) + 1
+        print(f"♻️ Reanudando en loop {first_loop} (y={target}) | únicos={n_uniques()}")
 
-    snap = parse_cards_in_dom(d, BASE)
-    for r in snap:
-        key = r["href"] or f"{r.get('name', '')}|{r.get('size', '')}"
-        if key and key not in collected:
-            collected[key] = r
-    print(f"📸 Inicial: viewport={len(snap)} | únicos={len(collected)}")
+    policy.start(uniques=n_uniques(), expected_total=expected_total)
+    t_start = time.time()
 
     # Bucle principal
-    for i in range(1, max_total_loops + 1):
-        # --- step adaptativo (fino si no crece o estamos al fondo)
+    for i in range(first_loop, max_total_loops + 1):
+        # --- step adaptativo (lo decide la política; fino si no crece o estamos al fondo)
         # evaluamos "al fondo" antes de movernos
-        at_bottom_flag = at_bottom()
-        effective_step = step_px
-        if rounds_no_growth >= 2:
-            effective_step = max(60, int(step_px * 0.7))  # afina si no crece
-        if at_bottom_flag:
-            effective_step = max(50, int(effective_step * 0.6))  # ultra-fino al fondo
-
-        # Paso corto
-        scroll_by(effective_step)
-        time.sleep(random.uniform(*idle_wait))
-        wait_skeletons_settle(d)
+        crawl_metrics.inc("loops")
+        at_bottom_flag = last_step["atBottom"] if observer else at_bottom()
+        effective_step = policy.next_step(at_bottom_flag)
 
-        # “Asegura” que la última card visible entra al viewport (dispara observers)
-        d.execute_script("""
-          const cards = document.querySelectorAll('[data-retailer-anchor="fop"]');
-          if (cards.length) { cards[cards.length-1].scrollIntoView({block:'center'}); }
-        """)
+        if observer:
+            # Paso + espera + captura del delta en un único round-trip
+            snap = obs_step("by", effective_step)
+            # latencia = lo que tardó la página más allá de la ventana de quietud pedida
+            # (waited nunca baja de quiet_ms: usarlo tal cual solo haría crecer la espera)
+            latency = max(0, last_step["waited"] - last_step["quiet_ms"]) / 1000
+            skeletons = last_step["skeletons"]
+        else:
+            # Paso corto
+            scroll_by(effective_step)
+            crawl_metrics.sleep(policy.wait_time())
+            latency, skeletons = wait_skeletons_settle(d)
 
-        # Captura
-        snap = parse_cards_in_dom(d, BASE)
-        for r in snap:
-            key = r["href"] or f"{r.get('name', '')}|{r.get('size', '')}"
-            if key and key not in collected:
-                collected[key] = r
+            # “Asegura” que la última card visible entra al viewport (dispara observers)
+            d.execute_script("""
+              const cards = document.querySelectorAll('[data-retailer-anchor="fop"]');
+              if (cards.length) { cards[cards.length-1].scrollIntoView({block:'center'}); }
+            """)
 
-        uniques = len(collected)
-        print(f"🐢 Loop {i}: únicos={uniques} (viewport={len(snap)})")
+            # Captura (solo las cards que la página aún no nos había enviado)
+            snap, in_dom = parse_new_cards_in_dom(d, BASE)
+            collect(snap)
 
-        # Gestión de crecimiento
-        if uniques == last_unique:
-            rounds_no_growth += 1
+        uniques = n_uniques()
+        if observer:
+            print(f"🐢 Loop {i}: únicos={uniques} (nuevos={len(snap)})")
         else:
-            rounds_no_growth = 0
-        last_unique = uniques
-
-        # Historial de crecimiento reciente (para meseta)
-        uniques_history.append(uniques)
-        if len(uniques_history) > growth_window:
-            uniques_history.pop(0)
-        recent_growth = (
-            (uniques - uniques_history[0])
-            if len(uniques_history) == growth_window
-            else 999
-        )
+            print(f"🐢 Loop {i}: únicos={uniques} (nuevos={len(snap)} | viewport={in_dom})")
+
+        # Gestión de crecimiento / meseta / fondo
+        policy.observe(len(snap), uniques, at_bottom_flag, latency=latency, skeletons=skeletons)
+        if trace is not None:
+            trace.append(
+                {
+                    "t": round(time.time() - t_start, 3),
+                    "step": effective_step,
+                    "new": len(snap),
+                    "uniques": uniques,
+                    "latency": round(latency, 3),
+                    "skeletons": skeletons,
+                    "at_bottom": bool(at_bottom_flag),
+                }
+            )
 
         # ¿Estamos en el fondo?
         if at_bottom_flag:
-            touched_bottom += 1
             # En el fondo hacemos pequeños “peines” para forzar la última carga
-            for _ in range(2):
-                scroll_by(80)
-                time.sleep(random.uniform(*idle_wait))
-                wait_skeletons_settle(d)
-            # Una micro-subida y re-entrada
-            if grid:
-                d.execute_script("arguments[0].scrollBy(0, -120);", grid)
+            if observer:
+                obs_step("by", 80)
+                obs_step("by", 80)
+                obs_step("by", -120)  # micro-subida y re-entrada
             else:
-                d.execute_script("window.scrollBy(0, -120);")
-            time.sleep(random.uniform(*idle_wait))
-            wait_skeletons_settle(d)
+                for _ in range(2):
+                    scroll_by(80)
+                    crawl_metrics.sleep(policy.wait_time())
+                    wait_skeletons_settle(d)
+                # Una micro-subida y re-entrada
+                if grid:
+                    d.execute_script("arguments[0].scrollBy(0, -120);", grid)
+                else:
+                    d.execute_script("window.scrollBy(0, -120);")
+                crawl_metrics.sleep(policy.wait_time())
+                wait_skeletons_settle(d)
 
-        # Corte por meseta: si ya tocamos fondo y no hay crecimiento significativo
-        if touched_bottom >= 2 and rounds_no_growth >= 2 and recent_growth <= 1:
-            print("🛑 Corte por meseta (sin crecimiento reciente).")
-            break
+        if checkpoint and i % checkpoint_every == 0:
+            sink.sync()
+            row_sink.save_checkpoint(checkpoint, {"loop": i, "scroll_y": scroll_pos(), "uniques": uniques})
 
-        # Criterio de salida clásico: varias rondas sin crecer y ya tocamos fondo X veces
-        if rounds_no_growth >= no_growth_rounds and touched_bottom >= bottom_passes:
+        # Corte (meseta, fondo sin crecer o total declarado alcanzado)
+        reason = policy.should_stop()
+        if reason:
+            print(reason)
             break
 
     # Barridos finales obligados en el fondo
-    for _ in range(bottom_passes):
+    for n in range(bottom_passes):
+        if observer:
+            # el último barrido vuelca también las cards que quedaron a medio pintar
+            obs_step("bottom", final=n == bottom_passes - 1)
+            continue
         if grid:
             d.execute_script(
                 "arguments[0].scrollTo(0, arguments[0].scrollHeight);", grid
             )
         else:
             d.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-        time.sleep(random.uniform(0.6, 0.9))
+        crawl_metrics.sleep(random.uniform(0.6, 0.9))
         wait_skeletons_settle(d)
-        snap = parse_cards_in_dom(d, BASE)
-        for r in snap:
-            key = r["href"] or f"{r.get('name', '')}|{r.get('size', '')}"
-            if key and key not in collected:
-                collected[key] = r
+        collect(parse_new_cards_in_dom(d, BASE)[0])
+
+    if observer:
+        d.execute_script("if (window.__bpCap) window.__bpCap.obs.disconnect();")
 
     # Auditoría rápida (qué hay en DOM ahora y no en nuestra lista)
     dom_now = (
@@ -404,61 +813,308 @@ def robust_scroll_and_collect(
         or []
     )
 
-    got = {r["href"] for r in collected.values() if r.get("href")}
+    if sink is not None:
+        got = {k for k in sink.keys if k.startswith("http")}
+    else:
+        got = {r["href"] for r in collected.values() if r.get("href")}
+    got |= skipped
     missing = [u for u in dom_now if u not in got]
+    crawl_metrics.inc("missing_in_dom", len(missing))
     print(
         f"🧪 DOM total={len(dom_now)} | recolectados(con href)={len(got)} | faltan(en DOM actual)={len(missing)}"
     )
     for u in missing[:5]:
         print("   • falta:", u)
 
-    return list(collected.values())
+    return sink.rows() if sink is not None else list(collected.values())
+
+
+# ---------- HUELLA DE CATEGORÍA ----------
+_fingerprint_lock = threading.Lock()
+
+
+@crawl_metrics.timed("fingerprint")
+def category_fingerprint(d, BASE, n=12):
+    """
+    Sonda barata al cargar la categoría (sin scroll): total declarado, primeras y
+    últimas hrefs del primer lote y hash del contenido visible (nombres, precios).
+    """
+    rows = parse_cards_in_dom(d, BASE)
+    hrefs = [r["href"] for r in rows if r.get("href")]
+    content = json.dumps(
+        [[r.get(k) for k in ("href", "name", "price", "price_per_unit", "size")] for r in rows],
+        ensure_ascii=False,
+    )
+    return {
+        "total": read_expected_total(d),
+        "count": len(rows),
+        "first": hrefs[:n],
+        "last": hrefs[-n:],
+        "hash": hashlib.sha1(content.encode("utf-8")).hexdigest(),
+    }
+
+
+def same_fingerprint(old, new, max_age_h):
+    """¿La categoría sigue igual que en la última ejecución completa (y no es demasiado antigua)?"""
+    if not old or not old.get("ts"):
+        return False
+    age_h = (datetime.now() - datetime.fromisoformat(old["ts"])).total_seconds() / 3600
+    if age_h > max_age_h:
+        return False
+    return all(old.get(k) == new[k] for k in ("total", "count", "first", "last", "hash"))
+
+
+def save_fingerprint(path, url, fp, n_rows):
+    with _fingerprint_lock:
+        save_profile(path, url, dict(fp, rows=n_rows, ts=datetime.now().isoformat(timespec="seconds")))
 
 
 # ---------- MAIN ----------
-def main():
-    parser = build_parser()
-    args = parser.parse_args()
+def valid_url(url):
+    host = urlparse(url).hostname or ""
+    return any(host == h or host.endswith("." + h) for h in ALLOWED_HOSTS)
 
-    # Validación básica del dominio
-    if "compraonline.bonpreuesclat.cat" not in urlparse(args.url).netloc:
-        print("❌ La URL debe ser de compraonline.bonpreuesclat.cat", file=sys.stderr)
-        sys.exit(2)
 
-    OUT = args.out or safe_slug_from_url(args.url)
+def scrape_category(d, url, args, session):
+    """
+    Scrapea una categoría con un driver ya abierto (reutilizable entre categorías).
+    Con --skip-unchanged devuelve None si la categoría no ha cambiado.
+    """
+    # Las cookies solo hay que aceptarlas una vez por navegador; si ya se
+    # aceptaron en otra sesión, se restauran antes de navegar y no sale el banner
+    first = not session.get("cookies")
+    restored = first and consent.restore(d, url, args.consent_profile)
+    # En modo --tabs la pestaña ya viene cargándose en segundo plano
+    if session.pop("preloaded", None) != url:
+        with crawl_metrics.phase("navigate"):
+            d.get(url)
+    if first:
+        consent.accept(d, url, args.consent_profile, budget=args.consent_budget, restored=restored)
+        session["cookies"] = True
 
-    d = setup_driver(headless=args.headless)
+    # Esperar a que haya al menos 1 card
     try:
-        d.get(args.url)
-        time.sleep(3)
-        accept_cookies(d)
-
-        # Esperar a que haya al menos 1 card
-        try:
+        with crawl_metrics.phase("wait_cards"):
             W(d, 25).until(
                 EC.presence_of_element_located(
                     (By.CSS_SELECTOR, '[data-retailer-anchor="fop"]')
                 )
             )
-        except Exception:
-            time.sleep(2)
+    except Exception:
+        crawl_metrics.sleep(2)
+
+    # Huella del primer viewport: si nada ha cambiado no hace falta recorrer la lista
+    fp = None
+    if args.skip_unchanged:
+        wait_skeletons_settle(d)
+        fp = category_fingerprint(d, get_base_url(d))
+        old = load_profile(args.fingerprints, url)
+        if same_fingerprint(old, fp, args.max_age):
+            print(f"⏭️  Sin cambios desde {old['ts']} ({old.get('rows')} productos): se salta {url}")
+            return None
 
-        # Scrolls rápidos opcionales
-        scroll_products(d, passes=args.passes)
+    # Scrolls rápidos opcionales
+    scroll_products(d, passes=args.passes)
 
+    policy = make_policy(
+        args.policy,
+        step_px=args.step,
+        idle_wait=(0.35, 0.55),
+        no_growth_rounds=3,  # ↓ corta antes si no crece
+        bottom_passes=3,  # peina el fondo 3 veces
+    )
+    trace = [] if args.trace_dir else None
+    sink = None
+    if args.stream:
+        part = partial_path(args, url)
+        sink = row_sink.RowSink(part)
+        if sink.resumed:
+            print(f"♻️ {sink.resumed} filas recuperadas de {part}")
+    try:
         rows = robust_scroll_and_collect(
             d,
-            step_px=args.step,
-            idle_wait=(0.35, 0.55),
             max_total_loops=args.max_loops,
-            no_growth_rounds=3,  # ↓ corta antes si no crece
-            bottom_passes=3,  # peina el fondo 3 veces
+            bottom_passes=3,
+            capture=args.capture,
+            policy=policy,
+            trace=trace,
+            sink=sink,
+            checkpoint=row_sink.checkpoint_path(sink.path) if sink else None,
+            checkpoint_every=args.checkpoint_every,
+            known=product_index.crawl_index(args.product_index, "bonpreu").known if args.product_index else None,
         )
-
-        pd.DataFrame(rows).to_csv(OUT, index=False, encoding="utf-8-sig")
-        print(f"✅ {len(rows)} productos guardados en {OUT}")
     finally:
-        d.quit()
+        if sink:
+            sink.close()
+    if trace is not None:
+        save_trace(trace, url, len(rows), policy, args.trace_dir)
+    if args.lean or args.net_report:
+        print(f"📶 Red: {lean_browser.format_report(lean_browser.transfer_report(d))}")
+    # solo tras una ejecución completa: un scrape a medias no puede dar por buena la huella
+    if fp is not None:
+        save_fingerprint(args.fingerprints, url, fp, len(rows))
+    return rows
+
+
+def partial_path(args, url):
+    """
+    Fichero parcial estable por categoría (sin timestamp) para poder reanudar.
+    Lleva un hash corto de la URL: dos categorías con el mismo último segmento
+    no comparten parcial ni checkpoint.
+    """
+    key = category_discovery.url_hash(url)
+    return Path(args.out_dir) / f"bonpreu_{category_label_from_url(url)}-{key}.partial.jsonl"
+
+
+def save_trace(trace, url, n_rows, policy, trace_dir):
+    out = Path(trace_dir) / safe_slug_from_url(url).replace(".csv", ".trace.json")
+    out.parent.mkdir(parents=True, exist_ok=True)
+    payload = {
+        "url": url,
+        "policy": policy.name,
+        "expected_total": policy.expected_total,
+        "rows": n_rows,
+        "steps": trace,
+    }
+    out.write_text(json.dumps(payload, ensure_ascii=False, indent=1), encoding="utf-8")
+    print(f"📝 Traza de scroll guardada en {out}")
+
+
+# ---------- UNA CATEGORÍA (también lo usa crawl_all.py) ----------
+def save_rows(rows, url, args):
+    out_dir = Path(args.out_dir)
+    if args.format == "parquet":
+        return write_raw(rows, "parquet", out_dir, store="bonpreu", category=category_label_from_url(url))
+    return write_raw(rows, "csv", args.out or str(out_dir / safe_slug_from_url(url)))
+
+
+def claim_rows(rows, db, store):
+    """Ids estables y fuera los productos que ya guardó otra categoría del crawl."""
+    with crawl_metrics.phase("product_index"):
+        kept = product_index.crawl_index(db, store).claim(rows)
+    if len(kept) < len(rows):
+        crawl_metrics.inc("known_skipped", len(rows) - len(kept))
+        print(f"🔁 {len(rows) - len(kept)} productos ya guardados en otra categoría de este crawl")
+    return kept
+
+
+def scrape_one(d, url, session, args):
+    """Scrapea y guarda una categoría. -> {rows, out[, skipped]}"""
+    if args.engine == "http":
+        rows = bonpreu_http.fetch_category(d, url, api_template=args.api_template, max_pages=args.max_pages)
+    else:
+        rows = scrape_category(d, url, args, session)
+        if rows is None:
+            return {"rows": 0, "out": None, "skipped": True}
+    if args.product_index:
+        rows = claim_rows(rows, args.product_index, "bonpreu")
+    with crawl_metrics.phase("write"):
+        out = save_rows(rows, url, args)
+    print(f"✅ {len(rows)} productos guardados en {out}")
+    crawl_metrics.inc("rows", len(rows))
+    if args.stream and args.engine == "browser":
+        row_sink.clear(partial_path(args, url))  # ya está en la salida definitiva
+    if args.history:
+        n = price_history.record_scrape(args.history, "bonpreu", rows, source=out)
+        print(f"📈 Histórico: {n} cambios de precio en {args.history}")
+    return {"rows": len(rows), "out": str(out)}
+
+
+def make_driver(args, restore_url=None):
+    """
+    Navegador (o sesión http) para un worker. restore_url: inyecta ya las cookies
+    de consentimiento de ese host (en --tabs las pestañas precargadas navegan antes
+    de que scrape_category pueda hacerlo).
+    """
+    # Con el motor http cada worker usa una sesión keep-alive en lugar de un Chrome
+    if args.engine == "http":
+        return bonpreu_http.make_session()
+    with crawl_metrics.phase("driver_start"):
+        if args.attach:
+            # Chrome del daemon: ya arrancado, en la tienda y con las cookies aceptadas
+            d = browser_daemon.attach("bonpreu", args.attach, net_log=args.lean or args.net_report)
+            prepare_tab(d, args.lean)
+        else:
+            d = setup_driver(headless=args.headless, lean=args.lean, net_report=args.net_report)
+    if restore_url:
+        consent.restore(d, restore_url, args.consent_profile)
+    return crawl_metrics.instrument_driver(d)
+
+
+def main():
+    parser = build_parser()
+    args = parser.parse_args()
+
+    urls = read_urls(args.url, args.urls_file)
+    if args.discover:
+        nodes = category_discovery.get_tree(
+            "bonpreu",
+            lambda: make_driver(args) if args.engine == "browser" else setup_driver(headless=args.headless),
+            max_age=args.discover_max_age,
+        )
+        found = read_urls(urls + category_discovery.leaf_urls(nodes, args.discover_match))
+        # Una categoría y sus subcategorías tienen los mismos productos: solo una vez.
+        # Se recortan las descubiertas; las URLs pedidas se scrapean siempre
+        urls = category_discovery.dedupe_overlaps(found, nodes, keep=urls)
+    if not urls:
+        parser.error("indica al menos una URL, --urls-file o --discover")
+    if args.out and len(urls) > 1:
+        parser.error("--out solo se puede usar con una única URL (usa --out-dir)")
+    if args.tabs and args.engine == "http":
+        parser.error("--tabs solo tiene sentido con --engine browser")
+
+    # Validación básica del dominio
+    bad = [u for u in urls if not valid_url(u)]
+    if bad:
+        for u in bad:
+            print(f"❌ La URL debe ser de compraonline.bonpreuesclat.cat: {u}", file=sys.stderr)
+        sys.exit(2)
+
+    Path(args.out_dir).mkdir(parents=True, exist_ok=True)
+
+    run = crawl_metrics.start_run("bonpreu", engine=args.engine, capture=args.capture)
+    if args.tabs:
+        results = run_tabs(
+            urls,
+            make_driver=lambda: make_driver(args, restore_url=urls[0]),
+            scrape_one=lambda d, url, session: scrape_one(d, url, session, args),
+            prefetch=args.tabs,
+            retries=args.retries,
+            prepare_tab=lambda d: prepare_tab(d, args.lean),
+        )
+    else:
+        results = run_pool(
+            urls,
+            make_driver=lambda: make_driver(args),
+            scrape_one=lambda d, url, session: scrape_one(d, url, session, args),
+            workers=args.workers,
+            retries=args.retries,
+        )
+
+    failed = [r for r in results if not r["ok"]]
+    for r in results:
+        res = r["result"] or {}
+        status = "skipped" if res.get("skipped") else ("ok" if r["ok"] else "failed")
+        crawl_metrics.inc(f"categories_{status}")
+        run.add_category(
+            url=r["url"], status=status, rows=res.get("rows", 0), attempts=r["attempts"],
+            seconds=r.get("seconds"), error=r["error"],
+        )
+    if args.report:
+        run.save_json(args.report)
+    if args.prom:
+        run.save_prometheus(args.prom)
+    if len(urls) > 1:
+        total = sum(r["result"]["rows"] for r in results if r["ok"])
+        skipped = sum(1 for r in results if r["ok"] and r["result"].get("skipped"))
+        print(
+            f"📦 Batch: {len(results) - len(failed)}/{len(results)} categorías OK | {total} productos"
+            + (f" | sin cambios={skipped}" if skipped else "")
+        )
+        for r in failed:
+            print(f"   • falló: {r['url']} ({r['error']})")
+    if failed:
+        sys.exit(1)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,173 @@
+# scroll_policy.py
+# Políticas de scroll para robust_scroll_and_collect: deciden el paso, la espera
+# entre pasos y cuándo cortar, a partir de lo que se observa en cada loop.
+
+import random
+import re
+
+
+class FixedPolicy:
+    """
+    Heurística original (ajustada a mano):
+    - paso fijo, 0.7× si no crece durante 2 rondas, 0.6× extra al fondo
+    - corte por meseta (ventana de 20 loops) o por rondas sin crecer tras tocar fondo
+    """
+
+    name = "fixed"
+
+    def __init__(self, step_px=140, idle_wait=(0.35, 0.55), no_growth_rounds=6, bottom_passes=3):
+        self.step_px = step_px
+        self.idle_wait = idle_wait
+        self.no_growth_rounds = no_growth_rounds
+        self.bottom_passes = bottom_passes
+        self.expected_total = None
+        self.growth_window = 20
+        self.uniques_history = []
+        self.rounds_no_growth = 0
+        self.touched_bottom = 0
+        self.last_unique = 0
+
+    def start(self, uniques=0, expected_total=None):
+        self.last_unique = uniques
+        self.expected_total = expected_total
+
+    def next_step(self, at_bottom):
+        step = self.step_px
+        if self.rounds_no_growth >= 2:
+            step = max(60, int(self.step_px * 0.7))  # afina si no crece
+        if at_bottom:
+            step = max(50, int(step * 0.6))  # ultra-fino al fondo
+        return step
+
+    def wait_time(self):
+        return random.uniform(*self.idle_wait)
+
+    def observe(self, new_cards, uniques, at_bottom, latency=None, skeletons=None):
+        """Registra el resultado de un paso (después de capturar)."""
+        if uniques == self.last_unique:
+            self.rounds_no_growth += 1
+        else:
+            self.rounds_no_growth = 0
+        self.last_unique = uniques
+
+        self.uniques_history.append(uniques)
+        if len(self.uniques_history) > self.growth_window:
+            self.uniques_history.pop(0)
+
+        if at_bottom:
+            self.touched_bottom += 1
+
+    def recent_growth(self):
+        if len(self.uniques_history) < self.growth_window:
+            return 999
+        return self.uniques_history[-1] - self.uniques_history[0]
+
+    def should_stop(self):
+        """-> motivo del corte (str) o None para seguir."""
+        # Corte por meseta: si ya tocamos fondo y no hay crecimiento significativo
+        if self.touched_bottom >= 2 and self.rounds_no_growth >= 2 and self.recent_growth() <= 1:
+            return "🛑 Corte por meseta (sin crecimiento reciente)."
+        # Criterio clásico: varias rondas sin crecer y ya tocamos fondo X veces
+        if self.rounds_no_growth >= self.no_growth_rounds and self.touched_bottom >= self.bottom_passes:
+            return "🛑 Corte: sin crecimiento y fondo alcanzado."
+        return None
+
+
+class AdaptivePolicy(FixedPolicy):
+    """
+    Ajusta paso y espera según la latencia de carga observada:
+    - espera = media móvil (EWMA) de lo que tardan en asentarse los skeletons
+    - paso crece si el paso trae muchas cards (o ninguna y nada cargando) y se
+      encoge si aparecen skeletons
+    - corta en cuanto se alcanza el total declarado por la categoría
+    """
+
+    name = "adaptive"
+
+    def __init__(
+        self,
+        step_px=140,
+        idle_wait=(0.35, 0.55),
+        no_growth_rounds=6,
+        bottom_passes=3,
+        min_step=60,
+        max_step=900,
+        min_wait=0.1,
+        max_wait=1.5,
+        alpha=0.3,
+    ):
+        super().__init__(step_px, idle_wait, no_growth_rounds, bottom_passes)
+        self.step = step_px
+        self.min_step = min_step
+        self.max_step = max_step
+        self.min_wait = min_wait
+        self.max_wait = max_wait
+        self.alpha = alpha
+        self.latency = sum(idle_wait) / 2
+
+    def next_step(self, at_bottom):
+        if at_bottom:
+            return max(50, int(self.step * 0.6))
+        return int(self.step)
+
+    def wait_time(self):
+        return min(self.max_wait, max(self.min_wait, self.latency))
+
+    def observe(self, new_cards, uniques, at_bottom, latency=None, skeletons=None):
+        super().observe(new_cards, uniques, at_bottom, latency, skeletons)
+        if latency is not None:
+            self.latency = (1 - self.alpha) * self.latency + self.alpha * latency
+        if skeletons:
+            # la página va por detrás: pasos más cortos y algo más de paciencia
+            self.step = max(self.min_step, self.step * 0.7)
+        elif new_cards == 0 and not at_bottom:
+            # nada nuevo y nada cargando: zona ya vista, avanzamos más rápido
+            self.step = min(self.max_step, self.step * 1.5)
+        elif new_cards >= 4:
+            self.step = min(self.max_step, self.step * 1.25)
+
+    def should_stop(self):
+        if self.expected_total and self.last_unique >= self.expected_total:
+            return f"🎯 Corte: alcanzado el total declarado ({self.expected_total})."
+        return super().should_stop()
+
+
+POLICIES = {p.name: p for p in (FixedPolicy, AdaptivePolicy)}
+
+
+def make_policy(name, **kw):
+    return POLICIES[name](**kw)
+
+
+# ---------- TOTAL DECLARADO ----------
+EXPECTED_TOTAL_JS = r"""
+  const sels = ['[data-test*="count"]', '[data-test*="total"]', '[class*="count"]',
+                '[class*="results"]', 'h1', 'header'];
+  const out = [];
+  for (const s of sels) {
+    document.querySelectorAll(s).forEach(e => { if (out.length < 40) out.push(e.textContent || ''); });
+  }
+  return out;
+"""
+
+COUNT_RE = re.compile(
+    r"(\d[\d.]*)\s*(?:productes|productos|products|resultats|resultados|results|articles|artículos)",
+    re.I,
+)
+
+
+def parse_expected_total(texts):
+    """Busca '123 productes' / '1.234 resultados' en los textos de cabecera."""
+    for t in texts or ():
+        m = COUNT_RE.search(t.replace("\u00a0", " "))
+        if m:
+            return int(m.group(1).replace(".", ""))
+    return None
+
+
+def read_expected_total(d):
+    """Total de productos que declara la categoría en la cabecera (o None)."""
+    try:
+        return parse_expected_total(d.execute_script(EXPECTED_TOTAL_JS))
+    except Exception:
+        return None
@@ -0,0 +1,240 @@
+# scroll_sim.py
+# Simulador offline de políticas de scroll: reproduce trazas de carga grabadas
+# (scraping_bonpreu2.py --trace-dir) sobre una lista virtualizada simulada y mide
+# loops/producto y segundos/producto para cada política, sin navegador ni red.
+#
+#   python scroll_sim.py Data/traces/*.trace.json --policies fixed adaptive
+#   python scroll_sim.py --synthetic 800 40 0.9
+
+import argparse
+import json
+import math
+import random
+import statistics
+from pathlib import Path
+
+from scroll_policy import make_policy
+
+
+class SimPage:
+    """
+    Lista virtualizada simulada:
+    - las cards cargan por lotes de `batch_size` cuando el viewport se acerca al final
+    - cada lote tarda la siguiente latencia de la traza (cíclica)
+    - solo existen en el DOM las cards cercanas al viewport (virtualización)
+    """
+
+    def __init__(
+        self,
+        total,
+        batch_size=40,
+        latencies=(0.8,),
+        card_px=320,
+        cols=4,
+        viewport_px=1080,
+        buffer_px=2000,
+        rtt=0.03,
+    ):
+        self.total = total
+        self.batch_size = batch_size
+        self.latencies = list(latencies) or [0.8]
+        self.card_px = card_px
+        self.cols = cols
+        self.viewport_px = viewport_px
+        self.buffer_px = buffer_px
+        self.rtt = rtt  # coste de un round-trip WebDriver
+        self.now = 0.0
+        self.y = 0
+        self.loaded = min(total, batch_size)
+        self.pending_until = None
+        self.n_loads = 1
+        self.seen = set()
+
+    # --- geometría
+    def height(self):
+        return math.ceil(self.loaded / self.cols) * self.card_px
+
+    def max_y(self):
+        return max(0, self.height() - self.viewport_px)
+
+    def at_bottom(self):
+        return self.y >= self.max_y()
+
+    def skeletons(self):
+        return self.batch_size if self.pending_until is not None else 0
+
+    # --- dinámica
+    def _tick(self):
+        if self.pending_until is not None and self.now >= self.pending_until:
+            self.loaded = min(self.total, self.loaded + self.batch_size)
+            self.pending_until = None
+        near_end = self.y + self.viewport_px >= self.height() - self.card_px
+        if self.pending_until is None and near_end and self.loaded < self.total:
+            lat = self.latencies[self.n_loads % len(self.latencies)]
+            self.n_loads += 1
+            self.pending_until = self.now + lat
+
+    def advance(self, seconds):
+        self.now += seconds
+        self._tick()
+
+    def scroll_by(self, px):
+        self.now += 2 * self.rtt  # scrollBy + rebote
+        self.y = min(self.max_y(), max(0, self.y + px - (40 if px > 0 else 0)))
+        self._tick()
+
+    def scroll_bottom(self):
+        self.now += self.rtt
+        self.y = self.max_y()
+        self._tick()
+
+    def scroll_last_into_view(self):
+        """scrollIntoView({block:'center'}) de la última card renderizada."""
+        self.now += self.rtt
+        last_row_y = (math.ceil(self.loaded / self.cols) - 1) * self.card_px
+        self.y = min(self.max_y(), max(0, last_row_y - self.viewport_px // 2))
+        self._tick()
+
+    def settle(self, timeout=8.0):
+        """Como wait_skeletons_settle: espera a que termine la carga en curso."""
+        t0 = self.now
+        if self.pending_until is not None:
+            self.advance(min(timeout, max(0.0, self.pending_until - self.now)))
+        self.now += self.rtt
+        return self.now - t0, self.skeletons()
+
+    def capture(self):
+        """Cards en el DOM ahora mismo; devuelve cuántas no se habían visto."""
+        self.now += self.rtt
+        top = max(0, self.y - self.buffer_px) // self.card_px * self.cols
+        bottom = (self.y + self.viewport_px + self.buffer_px) // self.card_px * self.cols + self.cols
+        new = 0
+        for i in range(int(top), int(min(bottom, self.loaded))):
+            if i not in self.seen:
+                self.seen.add(i)
+                new += 1
+        return new
+
+
+def simulate(page, policy, max_loops=400, bottom_passes=3, expected_total=None):
+    """Mismo esquema de bucle que robust_scroll_and_collect, en tiempo simulado."""
+    page.capture()
+    policy.start(uniques=len(page.seen), expected_total=expected_total)
+    loops = 0
+    for loops in range(1, max_loops + 1):
+        at_bottom = page.at_bottom()
+        page.now += page.rtt  # consulta de "al fondo"
+        page.scroll_by(policy.next_step(at_bottom))
+        page.advance(policy.wait_time())
+        latency, sk = page.settle()
+        page.scroll_last_into_view()
+        new = page.capture()
+        policy.observe(new, len(page.seen), at_bottom, latency=latency, skeletons=sk)
+        if at_bottom:
+            for _ in range(2):
+                page.scroll_by(80)
+                page.advance(policy.wait_time())
+                page.settle()
+            page.scroll_by(-120)
+            page.advance(policy.wait_time())
+            page.settle()
+        if policy.should_stop():
+            break
+    for _ in range(bottom_passes):
+        page.scroll_bottom()
+        page.advance(0.75)
+        page.settle()
+        page.capture()
+    found = len(page.seen)
+    return {
+        "loops": loops,
+        "seconds": round(page.now, 2),
+        "found": found,
+        "total": page.total,
+        "recall": round(found / page.total, 4) if page.total else 1.0,
+        "loops_per_product": round(loops / max(found, 1), 4),
+        "seconds_per_product": round(page.now / max(found, 1), 4),
+    }
+
+
+def model_from_trace(payload, batch_size=40):
+    """Parámetros del simulador a partir de una traza grabada por el scraper."""
+    steps = payload.get("steps") or []
+    lat = [s["latency"] for s in steps if s.get("skeletons") or s.get("latency", 0) > 0.3]
+    total = payload.get("expected_total") or payload.get("rows") or 0
+    return {
+        "total": int(total),
+        # lo que el scraper leyó de la cabecera (None si no la pudo leer), no el total real
+        "expected_total": payload.get("expected_total"),
+        "batch_size": int(payload.get("batch_size") or batch_size),
+        "latencies": lat or [0.8],
+    }
+
+
+def build_parser():
+    p = argparse.ArgumentParser(description="Benchmark offline de políticas de scroll.")
+    p.add_argument("traces", nargs="*", help="Trazas JSON grabadas con --trace-dir.")
+    p.add_argument(
+        "--synthetic",
+        nargs=3,
+        type=float,
+        metavar=("TOTAL", "BATCH", "LATENCY"),
+        help="Traza sintética: total de productos, tamaño de lote y latencia media (s).",
+    )
+    p.add_argument("--policies", nargs="+", default=["fixed", "adaptive"])
+    p.add_argument("--step", type=int, default=100, help="Paso inicial (px).")
+    p.add_argument("--max-loops", type=int, default=400)
+    p.add_argument("--batch-size", type=int, default=40, help="Cards por lote de carga.")
+    p.add_argument("--card-px", type=int, default=320, help="Alto de una fila de cards (px).")
+    p.add_argument("--cols", type=int, default=4, help="Cards por fila.")
+    p.add_argument(
+        "--buffer-px", type=int, default=2000, help="Margen renderizado fuera del viewport (virtualización)."
+    )
+    p.add_argument("--seed", type=int, default=0)
+    return p
+
+
+def main():
+    args = build_parser().parse_args()
+    models = []
+    for t in args.traces:
+        payload = json.loads(Path(t).read_text(encoding="utf-8"))
+        models.append((Path(t).name, model_from_trace(payload, args.batch_size)))
+    if args.synthetic:
+        total, batch, lat = args.synthetic
+        rng = random.Random(args.seed)
+        lats = [max(0.05, rng.gauss(lat, lat / 3)) for _ in range(64)]
+        models.append(
+            (
+                f"synthetic-{int(total)}",
+                {"total": int(total), "expected_total": None, "batch_size": int(batch), "latencies": lats},
+            )
+        )
+    if not models:
+        print("ℹ️ Indica trazas o --synthetic.")
+        return
+
+    print(f"{'traza':<40} {'política':<9} {'loops':>6} {'seg':>8} {'recall':>7} {'loops/prod':>10} {'s/prod':>8}")
+    for name, m in models:
+        for pol in args.policies:
+            random.seed(args.seed)
+            page = SimPage(
+                m["total"],
+                m["batch_size"],
+                m["latencies"],
+                card_px=args.card_px,
+                cols=args.cols,
+                buffer_px=args.buffer_px,
+            )
+            policy = make_policy(pol, step_px=args.step, no_growth_rounds=3, bottom_passes=3)
+            r = simulate(page, policy, max_loops=args.max_loops, expected_total=m["expected_total"])
+            print(
+                f"{name[:40]:<40} {pol:<9} {r['loops']:>6} {r['seconds']:>8} {r['recall']:>7} "
+                f"{r['loops_per_product']:>10} {r['seconds_per_product']:>8}"
+            )
+        if m["latencies"]:
+            print(f"{'':<40} (latencia mediana {statistics.median(m['latencies']):.2f}s)")
+
+
+if __name__ == "__main__":
+    main()
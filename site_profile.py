@@ -0,0 +1,33 @@
+# site_profile.py
+# Perfiles por sitio guardados en disco (JSON): lo que un scraper aprende de la
+# web (selectores que funcionan, estrategia de cookies...) para reutilizarlo en
+# las siguientes ejecuciones.
+
+import json
+import os
+import tempfile
+from pathlib import Path
+
+
+def load_profile(path, host):
+    """Perfil guardado para `host` (dict vacío si no hay)."""
+    try:
+        data = json.loads(Path(path).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    return data.get(host) or {}
+
+
+def save_profile(path, host, profile):
+    """Guarda/actualiza el perfil de `host` de forma atómica (tmp + rename)."""
+    path = Path(path)
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        data = {}
+    data[host] = profile
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=path.name, suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=1)
+    os.replace(tmp, path)
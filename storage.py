@@ -0,0 +1,142 @@
+# storage.py
+# Escritura/lectura de datasets en CSV o Parquet (columnar, tipado y particionado).
+#
+# Parquet crudo (scrapers), particionado por tienda / categoría / fecha:
+#   <root>/store=bonpreu/category=arros/date=2025-09-20/part-20250920-150513.parquet
+# Parquet limpio (merge): un directorio con uno o más part-*.parquet.
+
+import re
+import unicodedata
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+FORMATS = ("csv", "parquet")
+
+# Columnas tipadas del dataset limpio
+CLEAN_DTYPES = {"price (€)": np.float32, "price_per_kg": np.float32}
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+    except ImportError:
+        raise ImportError("El formato parquet necesita pyarrow: pip install pyarrow") from None
+    return pyarrow
+
+
+def _part_name(ts):
+    return f"part-{ts:%Y%m%d-%H%M%S}-{uuid.uuid4().hex[:8]}.parquet"
+
+
+def _slug(s):
+    s = unicodedata.normalize("NFKD", str(s).lower()).encode("ascii", "ignore").decode()
+    s = re.sub(r"[^a-z0-9\-]+", "-", s)
+    return re.sub(r"-+", "-", s).strip("-") or "na"
+
+
+# ---------- CRUDO (scrapers) ----------
+def raw_partition(root, store, category, scraped_at=None):
+    """Directorio de partición store=/category=/date= para un scrape."""
+    scraped_at = scraped_at or datetime.now()
+    return (
+        Path(root)
+        / f"store={_slug(store)}"
+        / f"category={_slug(category)}"
+        / f"date={scraped_at:%Y-%m-%d}"
+    )
+
+
+def write_raw(rows, fmt, out, store=None, category=None, scraped_at=None):
+    """
+    Guarda las filas de un scrape.
+    - csv: `out` es la ruta del CSV (como hasta ahora)
+    - parquet: `out` es la raíz del dataset; se escribe un part-*.parquet en su partición
+    Devuelve la ruta escrita.
+    """
+    df = pd.DataFrame(rows)
+    if fmt == "csv":
+        df.to_csv(out, index=False, encoding="utf-8-sig")
+        return Path(out)
+    _pyarrow()
+    scraped_at = scraped_at or datetime.now()
+    part = raw_partition(out, store, category, scraped_at)
+    part.mkdir(parents=True, exist_ok=True)
+    df = df.astype({c: "string" for c in df.columns})
+    df["scraped_at"] = pd.Timestamp(scraped_at)
+    path = part / _part_name(scraped_at)
+    df.to_parquet(path, index=False)
+    return path
+
+
+def partition_values(path):
+    """{'store': 'bonpreu', 'category': 'arros', 'date': '2025-09-20'} desde la ruta."""
+    return dict(p.split("=", 1) for p in Path(path).parts if "=" in p)
+
+
+# ---------- LIMPIO (merge) ----------
+def typed_clean(df, store=None):
+    """Tipos compactos: precios float32, tienda categórica."""
+    df = df.astype({c: t for c, t in CLEAN_DTYPES.items() if c in df})
+    if store is not None:
+        df["store"] = store
+    if "store" in df:
+        df["store"] = df["store"].astype("category")
+    return df
+
+
+def write_clean(df, path, fmt, append=False):
+    """
+    Dataset limpio: CSV (un fichero) o Parquet (directorio con part-*.parquet).
+    append=True en Parquet añade un part nuevo sin reescribir los anteriores.
+    """
+    path = Path(path)
+    if fmt == "csv":
+        if append:
+            df.to_csv(path, mode="a", header=False, index=False, encoding="utf-8")
+        else:
+            df.to_csv(path, index=False, encoding="utf-8-sig")
+        return path
+    _pyarrow()
+    path.mkdir(parents=True, exist_ok=True)
+    if not append:
+        for old in path.glob("part-*.parquet"):
+            old.unlink()
+    df.to_parquet(path / _part_name(datetime.now()), index=False)
+    return path
+
+
+def read_table(path, columns=None):
+    """
+    Lee un CSV o un Parquet (fichero o directorio de dataset) leyendo solo `columns`
+    si se indican (las que no existan se ignoran).
+    """
+    path = Path(path)
+    if path.is_dir() or path.suffix == ".parquet":
+        _pyarrow()
+        import pyarrow.dataset as ds
+
+        # exclude_invalid_files: ignora CSV/manifiestos que convivan con las particiones
+        dataset = ds.dataset(path, format="parquet", partitioning="hive", exclude_invalid_files=True)
+        cols = [c for c in columns if c in dataset.schema.names] if columns else None
+        return dataset.to_table(columns=cols).to_pandas()
+    usecols = (lambda c: c in set(columns)) if columns else None
+    return pd.read_csv(path, encoding="utf-8-sig", usecols=usecols)
+
+
+def clean_exists(path):
+    path = Path(path)
+    return path.is_file() or (path.is_dir() and any(path.glob("part-*.parquet")))
+
+
+def clean_columns(path):
+    """Nombres de columna del dataset limpio sin leer los datos."""
+    path = Path(path)
+    if path.is_dir():
+        import pyarrow.dataset as ds
+
+        return ds.dataset(path, format="parquet").schema.names
+    return list(pd.read_csv(path, encoding="utf-8-sig", nrows=0).columns)
@@ -0,0 +1,5 @@
+# Los módulos del repo son ficheros sueltos en la raíz: importables desde los tests
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
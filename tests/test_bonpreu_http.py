@@ -0,0 +1,199 @@
+# Motor http contra respuestas guardadas (tests/fixtures) servidas desde un
+# servidor local: pasa por la sesión real (keep-alive, reintentos, charset)
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+import requests
+
+import bonpreu_http
+
+FIXTURES = Path(__file__).with_name("fixtures")
+BASE = "https://www.compraonline.bonpreuesclat.cat"
+CATEGORY = f"{BASE}/categories/arros/abc"
+
+
+def fixture(name):
+    return (FIXTURES / name).read_text(encoding="utf-8")
+
+
+class StubServer:
+    """
+    Servidor HTTP local que reproduce respuestas capturadas: rutas (path?query) ->
+    lista de (status, cuerpo, content-type); se sirven en orden y la última se repite.
+    Apunta cada petición con el puerto del cliente (para ver el keep-alive).
+    """
+
+    def __init__(self, routes):
+        self.routes = {k: list(v) for k, v in routes.items()}
+        self.requests = []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive
+
+            def do_GET(self):
+                stub.requests.append((self.path, self.client_address[1]))
+                queue = stub.routes.get(self.path) or [(404, "", "text/plain")]
+                status, body, ctype = queue.pop(0) if len(queue) > 1 else queue[0]
+                data = body.encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", ctype)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self.server.serve_forever, args=(0.05,), daemon=True).start()
+        self.base = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    @property
+    def paths(self):
+        return [p for p, _ in self.requests]
+
+
+@pytest.fixture
+def stub():
+    servers = []
+
+    def start(routes):
+        servers.append(StubServer(routes))
+        return servers[-1]
+
+    yield start
+    for s in servers:
+        s.server.shutdown()
+        s.server.server_close()
+
+
+# text/html sin charset, como algunas respuestas reales: el motor debe leer UTF-8
+HTML = "text/html"
+JSON = "application/json"
+CAT = "/categories/arros/abc"
+
+
+def test_parse_listing_html_cards():
+    rows = bonpreu_http.parse_listing(fixture("bonpreu_page1.html"), BASE)
+    assert rows == [
+        {
+            "name": "Arròs bomba Bonpreu",
+            "price": "3,95 €",
+            "price_per_unit": "(3,95 € per quilo)",
+            "size": "1 kg",
+            "href": f"{BASE}/products/arr%C3%B2s-bomba-1kg/111",  # el enlace visible, como en el DOM
+        },
+        {
+            "name": "Arròs llarg",
+            "price": "1,20 €",
+            "price_per_unit": "(2,40 € per quilo)",
+            "size": "500 g",
+            "href": f"{BASE}/products/arros-llarg-500g/222",
+        },
+    ]
+
+
+def test_parse_listing_embedded_state():
+    rows = bonpreu_http.parse_listing(fixture("bonpreu_embedded.html"), BASE)
+    assert rows == [
+        {
+            "name": "Pasta espaguetis",
+            "price": "0,95 €",
+            "price_per_unit": "(1,90 € per quilo)",
+            "size": "500 g",
+            "href": f"{BASE}/products/444",
+        }
+    ]
+
+
+def test_parse_listing_json():
+    rows = bonpreu_http.parse_listing(fixture("bonpreu_api_page1.json"), BASE, "application/json")
+    assert [(r["name"], r["price"], r["price_per_unit"], r["size"]) for r in rows] == [
+        ("Llet sencera", "0,99 €", "(0,99 € per litre)", "1 l"),
+        ("Llet desnatada", "1,05 €", "(1,05 € per litre)", "1 l"),
+    ]
+    assert rows[1]["href"] == f"{BASE}/products/556"
+
+
+def test_page_url():
+    assert bonpreu_http.page_url(CATEGORY, 1) == CATEGORY
+    assert bonpreu_http.page_url(CATEGORY + "?sort=name&page=3", 2) == CATEGORY + "?sort=name&page=2"
+
+
+def test_fetch_category_paginates_until_no_new_rows(stub):
+    srv = stub(
+        {
+            CAT: [(200, fixture("bonpreu_page1.html"), HTML)],
+            f"{CAT}?page=2": [(200, fixture("bonpreu_page2.html"), HTML)],
+            f"{CAT}?page=3": [(200, fixture("bonpreu_page2.html"), HTML)],  # repite: ya no aporta
+            f"{CAT}?page=4": [(200, fixture("bonpreu_page1.html"), HTML)],
+        }
+    )
+    rows = bonpreu_http.fetch_category(bonpreu_http.make_session(), srv.base + CAT)
+    # sin charset en la cabecera se decodifica como UTF-8 (no latin-1)
+    assert [r["name"] for r in rows] == ["Arròs bomba Bonpreu", "Arròs llarg", "Arròs integral"]
+    assert rows[0]["href"] == f"{srv.base}/products/arr%C3%B2s-bomba-1kg/111"
+    assert srv.paths == [CAT, f"{CAT}?page=2", f"{CAT}?page=3"]
+    assert len({port for _, port in srv.requests}) == 1  # una sola conexión keep-alive
+
+
+def test_fetch_category_retries_5xx(stub):
+    srv = stub(
+        {
+            CAT: [(503, "busy", "text/plain"), (200, fixture("bonpreu_page1.html"), HTML)],
+            f"{CAT}?page=2": [(502, "bad gateway", "text/plain"), (200, fixture("bonpreu_page2.html"), HTML)],
+        }
+    )
+    rows = bonpreu_http.fetch_category(bonpreu_http.make_session(), srv.base + CAT)
+    assert [r["name"] for r in rows] == ["Arròs bomba Bonpreu", "Arròs llarg", "Arròs integral"]
+    assert srv.paths[:4] == [CAT, CAT, f"{CAT}?page=2", f"{CAT}?page=2"]
+
+
+def test_fetch_category_stops_on_404_after_first_page(stub):
+    srv = stub({CAT: [(200, fixture("bonpreu_page1.html"), HTML)]})
+    rows = bonpreu_http.fetch_category(bonpreu_http.make_session(), srv.base + CAT)
+    assert len(rows) == 2
+    assert srv.paths == [CAT, f"{CAT}?page=2"]
+
+
+def test_fetch_category_first_page_error_raises(stub):
+    srv = stub({CAT: [(500, "error", "text/plain")]})
+    with pytest.raises(requests.RequestException):
+        bonpreu_http.fetch_category(bonpreu_http.make_session(retries=1), srv.base + CAT)
+
+
+def test_fetch_category_api_template(stub):
+    srv = stub(
+        {
+            "/api/products?category=arros&page=1": [(200, fixture("bonpreu_api_page1.json"), JSON)],
+            "/api/products?category=arros&page=2": [(200, fixture("bonpreu_api_page2.json"), JSON)],
+        }
+    )
+    template = srv.base + "/api/products?category=arros&page={page}"
+    rows = bonpreu_http.fetch_category(bonpreu_http.make_session(), srv.base + CAT, api_template=template)
+    assert [r["name"] for r in rows] == ["Llet sencera", "Llet desnatada"]
+    assert rows[1]["href"] == f"{srv.base}/products/556"
+    assert len(srv.requests) == 2
+
+
+def test_fetch_category_respects_max_pages(stub):
+    srv = stub(
+        {
+            CAT: [(200, fixture("bonpreu_page1.html"), HTML)],
+            f"{CAT}?page=2": [(200, fixture("bonpreu_page2.html"), HTML)],
+        }
+    )
+    rows = bonpreu_http.fetch_category(bonpreu_http.make_session(), srv.base + CAT, max_pages=1)
+    assert len(rows) == 2
+    assert srv.paths == [CAT]
+
+
+def test_http_session_quacks_like_a_driver():
+    import crawl_pool
+
+    s = bonpreu_http.make_session()
+    assert crawl_pool._driver_alive(s)  # un error HTTP no es un navegador muerto
+    crawl_pool._quit(s)
@@ -0,0 +1,177 @@
+# run_pool / run_tabs con drivers falsos: reintentos y recreación del navegador
+import pytest
+
+import crawl_pool
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(crawl_pool.time, "sleep", lambda s: None)
+
+
+class FakeDriver:
+    """Lo mínimo de un WebDriver que usan los pools; `dead` simula un Chrome caído."""
+
+    created = []
+
+    def __init__(self):
+        self.dead = False
+        self.quitted = False
+        self.n_tabs = 0
+        self.handle = "home"
+        self.switch_to = _SwitchTo(self)
+        FakeDriver.created.append(self)
+
+    def _check(self):
+        if self.dead:
+            raise RuntimeError("chrome not reachable")
+
+    @property
+    def current_url(self):
+        self._check()
+        return "about:blank"
+
+    @property
+    def current_window_handle(self):
+        self._check()
+        return self.handle
+
+    def execute_script(self, *args):
+        self._check()
+
+    def close(self):
+        self._check()
+
+    def quit(self):
+        self.quitted = True
+
+
+class _SwitchTo:
+    def __init__(self, d):
+        self.d = d
+
+    def new_window(self, kind):
+        self.d._check()
+        self.d.n_tabs += 1
+        self.d.handle = f"tab{self.d.n_tabs}"
+
+    def window(self, handle):
+        self.d._check()
+        self.d.handle = handle
+
+
+@pytest.fixture(autouse=True)
+def reset_drivers():
+    FakeDriver.created = []
+
+
+def test_read_urls_dedupes_and_skips_comments(tmp_path):
+    f = tmp_path / "urls.txt"
+    f.write_text("# comentario\nhttps://a\n\nhttps://b\nhttps://a\n", encoding="utf-8")
+    assert crawl_pool.read_urls(["https://c", "https://b"], [f]) == ["https://c", "https://b", "https://a"]
+
+
+def test_run_pool_results_in_input_order():
+    urls = [f"https://x/{i}" for i in range(7)]
+    res = crawl_pool.run_pool(urls, FakeDriver, lambda d, url, session: url.upper(), workers=3)
+    assert [r["url"] for r in res] == urls
+    assert all(r["ok"] and r["attempts"] == 1 and r["result"] == r["url"].upper() for r in res)
+    assert 1 <= len(FakeDriver.created) <= 3  # como mucho un navegador por worker
+    assert all(d.quitted for d in FakeDriver.created)
+
+
+def test_run_pool_retries_on_the_same_live_driver():
+    calls = []
+
+    def scrape(d, url, session):
+        calls.append(d)
+        if len(calls) < 3:
+            raise ValueError("timeout")
+        return "ok"
+
+    res = crawl_pool.run_pool(["https://x/1"], FakeDriver, scrape, workers=1, retries=2)
+    assert res[0]["ok"] and res[0]["attempts"] == 3 and res[0]["error"] is None
+    assert len(FakeDriver.created) == 1  # el navegador seguía vivo: no se recrea
+    assert len(set(map(id, calls))) == 1
+
+
+def test_run_pool_recreates_dead_driver_with_fresh_session():
+    sessions = []
+
+    def scrape(d, url, session):
+        sessions.append(dict(session))
+        session["cookies"] = True
+        if url.endswith("/1") and len(FakeDriver.created) == 1:
+            d.dead = True
+            raise RuntimeError("chrome crashed")
+        return url
+
+    res = crawl_pool.run_pool(["https://x/0", "https://x/1", "https://x/2"], FakeDriver, scrape, workers=1)
+    assert [r["ok"] for r in res] == [True, True, True]
+    assert res[1]["attempts"] == 2
+    assert len(FakeDriver.created) == 2
+    assert FakeDriver.created[0].quitted and FakeDriver.created[1].quitted
+    assert sessions == [{}, {"cookies": True}, {}, {"cookies": True}]  # sesión nueva con el driver nuevo
+
+
+def test_run_pool_gives_up_after_retries():
+    def scrape(d, url, session):
+        raise ValueError("boom")
+
+    res = crawl_pool.run_pool(["https://x/1", "https://x/2"], FakeDriver, scrape, workers=1, retries=1)
+    assert [(r["ok"], r["attempts"], r["error"]) for r in res] == [(False, 2, "ValueError: boom")] * 2
+
+
+def test_run_pool_survives_make_driver_failure():
+    attempts = []
+
+    def make():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RuntimeError("no se pudo arrancar Chrome")
+        return FakeDriver()
+
+    res = crawl_pool.run_pool(["https://x/1"], make, lambda d, url, session: url, workers=1)
+    assert res[0]["ok"] and res[0]["attempts"] == 2
+
+
+def test_run_tabs_marks_prefetched_tabs():
+    seen = []
+
+    def scrape(d, url, session):
+        seen.append((url, session.get("preloaded")))
+        return url
+
+    urls = [f"https://x/{i}" for i in range(4)]
+    res = crawl_pool.run_tabs(urls, FakeDriver, scrape, prefetch=1)
+    assert [r["url"] for r in res] == urls and all(r["ok"] for r in res)
+    assert seen == [(u, u) for u in urls]
+    assert len(FakeDriver.created) == 1
+
+
+def test_run_tabs_restarts_when_chrome_dies_while_opening_tabs():
+    opened = {"n": 0}
+    orig = _SwitchTo.new_window
+
+    def flaky_new_window(self, kind):
+        opened["n"] += 1
+        if opened["n"] == 3:
+            self.d.dead = True
+        orig(self, kind)
+
+    _SwitchTo.new_window = flaky_new_window
+    try:
+        urls = [f"https://x/{i}" for i in range(5)]
+        res = crawl_pool.run_tabs(urls, FakeDriver, lambda d, url, session: url, prefetch=2)
+    finally:
+        _SwitchTo.new_window = orig
+    assert [r["url"] for r in res] == urls and all(r["ok"] for r in res)
+    assert len(FakeDriver.created) == 2
+
+
+def test_run_tabs_fails_urls_when_browser_never_starts():
+    def make():
+        raise RuntimeError("no chrome")
+
+    res = crawl_pool.run_tabs(["https://x/1", "https://x/2"], make, lambda d, url, session: url, retries=1)
+    assert [(r["ok"], r["attempts"]) for r in res] == [(False, 2), (False, 2)]
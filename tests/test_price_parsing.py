@@ -0,0 +1,62 @@
+# Parseo vectorizado de precios y tamaños (price_parsing.py): funciones puras
+import math
+
+import pandas as pd
+import pytest
+
+import price_parsing as pp
+
+
+def values(s):
+    return [None if pd.isna(v) else round(float(v), 6) for v in s]
+
+
+@pytest.mark.parametrize(
+    "raw, expected",
+    [
+        ("0,5", 0.5),
+        ("0.5", 0.5),
+        ("12.5", 12.5),
+        ("1.000", 1000.0),  # punto + tres cifras: separador de miles
+        ("1.250", 1250.0),
+        ("0.500", 0.5),  # empieza por 0: decimal
+        ("1.25", 1.25),
+        ("1.2500", 1.25),
+        ("abc", None),
+    ],
+)
+def test_num(raw, expected):
+    assert values(pp._num(pd.Series([raw], dtype="string"))) == [expected]
+
+
+def test_parse_eur():
+    s = ["1,95 €", "(4,88 € per quilo)", "1.234,50 €", "1.000 €", "12 €", None, "sense preu"]
+    assert values(pp.parse_eur(s)) == [1.95, 4.88, 1234.5, 1000.0, 12.0, None, None]
+
+
+def test_euro_and_ppu_to_float():
+    assert values(pp.euro_to_float(["1,95 €", "1.95", "1.250 €"])) == [1.95, 1.95, 1250.0]
+    assert values(pp.ppu_to_float(["4,88 €/kg", "4,88 € per quilo", "(1,20 €/l)", None])) == [4.88, 4.88, None, None]
+
+
+def test_kg_from_size():
+    s = ["500 g", "0.5kg", "0,5 kg", "2 x 125 g", "1.000 g", "1.250 kg", "12.5 g", "1 l", "6 ud", None]
+    assert values(pp.kg_from_size(s)) == [0.5, 0.5, 0.5, 0.25, 1.0, 1250.0, 0.0125, None, None, None]
+
+
+def test_parse_size_units():
+    out = pp.parse_size(["1,5 l", "6 ud", "330 ml"])
+    assert values(out["qty"]) == [1.5, 6.0, 0.33]
+    assert out["unit"].tolist() == ["l", "ud", "l"]
+
+
+def test_price_per_kg_from_cols():
+    price = ["1,95 €", "3,00 €", "2,00 €"]
+    ppu = ["(3,90 € per quilo)", None, "(2,00 € per unitat)"]
+    size = ["500 g", "1.000 g", "6 ud"]
+    assert values(pp.price_per_kg_from_cols(price, ppu, size)) == [3.9, 3.0, None]
+
+
+def test_price_per_kg_dia_without_columns():
+    out = pp.price_per_kg_dia(pd.Series(["1,00 €"]), None, None)
+    assert math.isnan(out.iloc[0])
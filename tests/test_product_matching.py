@@ -0,0 +1,56 @@
+# Emparejado entre tiendas sobre frames pequeños, sin ficheros de datos
+import pandas as pd
+
+import product_matching as pm
+
+
+def frame(names, sizes=None):
+    df = pd.DataFrame({"name": pd.Series(names, dtype=object)})
+    if sizes is not None:
+        df["size"] = pd.Series(sizes, dtype=object)
+    return df
+
+
+def test_prepare_empty_frame():
+    out = pm.prepare(frame([]), "bonpreu")
+    assert out.empty
+    assert list(out.columns) == ["store", "key", "name", "size", "brand", "tokens"]
+
+
+def test_prepare_size_from_column_or_name():
+    out = pm.prepare(frame(["Arròs bomba", "Sal marina 1 kg", "Oli"], ["500 g", None, None]), "bonpreu")
+    assert out["size"].tolist()[:2] == ["0.5kg", "1kg"]
+    assert pd.isna(out["size"].iloc[2])
+
+
+def test_update_matches_with_an_empty_store(tmp_path):
+    table = pm.update_matches(frame([]), frame(["Arroz redondo 1 kg"]), tmp_path / "m.csv")
+    assert table.empty
+    assert (tmp_path / "m.csv").exists()
+
+
+def test_update_matches_pairs_and_keeps_them(tmp_path):
+    path = tmp_path / "m.csv"
+    a = frame(["Pasta espaguetis Gallo 500 g", "Sal marina 1 kg"])
+    b = frame(["Espaguetis Gallo pasta 500 g", "Azúcar blanco 1 kg"])
+    table = pm.update_matches(a, b, path)
+    assert table[["key_a", "key_b"]].values.tolist() == [["pasta espaguetis gallo 500 g", "espaguetis gallo pasta 500 g"]]
+    # segunda ejecución: la pareja se conserva sin volver a evaluarla
+    again = pm.update_matches(a, b, path)
+    assert again[["key_a", "key_b"]].values.tolist() == table[["key_a", "key_b"]].values.tolist()
+
+
+def test_brand_key():
+    assert pm.brand_key("Llet sencera PULEVA 1 l") == "puleva"
+    assert pm.brand_key("Embotit La Piara 2x80 g") == "piara"  # "la" es stopword
+    assert pm.brand_key("CAMPOFRIO pernil cuit") == "campofrio"
+    assert pm.brand_key("Arròs bomba Bonpreu 1 kg") is None  # marca propia: genérica
+    assert pm.brand_key("Sal marina") is None
+
+
+def test_match_skips_different_brands(tmp_path):
+    a = frame(["Tomàquet fregit Orlando 400 g", "Tomàquet fregit Bonpreu 400 g"])
+    b = frame(["Tomàquet fregit Solis 400 g", "Tomàquet fregit Dia 400 g"])
+    table = pm.update_matches(a, b, tmp_path / "m.csv")
+    # Orlando != Solis; las marcas propias sí se emparejan entre sí
+    assert table[["key_a", "key_b"]].values.tolist() == [["tomaquet fregit bonpreu 400 g", "tomaquet fregit dia 400 g"]]